@@ -0,0 +1,182 @@
+"""
+Modelo de Carrito
+Líneas de un ticket (venta o compra) indexadas por producto_id, con los
+totales llevados como sumas corrientes y una pila para deshacer. Agregar,
+cambiar, quitar o deshacer una línea cuesta lo mismo con 5 líneas que con
+5.000: nada recorre el carrito salvo detalles().
+"""
+from collections import deque
+from typing import Iterator, List, Optional
+
+
+class Carrito:
+    """
+    Carrito con una línea por producto, en orden de llegada.
+
+    Cada línea es un dict con 'producto_id', 'nombre_producto', 'cantidad',
+    el precio unitario en `campo_precio` ('precio_unit_usd' en ventas,
+    'costo_unit_usd' en compras), 'total_linea_usd' y los datos extra dados
+    al agregarla; es el formato que esperan crear_venta y crear_compra.
+    """
+
+    def __init__(self, campo_precio: str = 'precio_unit_usd', iva_porcentaje: float = 0.0,
+                 max_deshacer: int = 100):
+        self.campo_precio = campo_precio
+        self.iva_porcentaje = iva_porcentaje
+
+        self._lineas = {}                     # producto_id -> línea (en orden de llegada)
+        self._orden = {}                      # producto_id -> posición de llegada (1, 2, ...)
+        self._siguiente_orden = 1
+        self._deshacer = deque(maxlen=max_deshacer)
+
+        # Acumuladores
+        self.subtotal_usd = 0.0
+        self.iva_usd = 0.0
+        self.unidades = 0
+
+    # ---------- Consulta ----------
+
+    def __len__(self) -> int:
+        return len(self._lineas)
+
+    def __contains__(self, producto_id: int) -> bool:
+        return producto_id in self._lineas
+
+    def __iter__(self) -> Iterator[dict]:
+        return iter(self._lineas.values())
+
+    @property
+    def total_usd(self) -> float:
+        """Subtotal más IVA."""
+        return self.subtotal_usd + self.iva_usd
+
+    def obtener(self, producto_id: int) -> Optional[dict]:
+        """Obtiene la línea de un producto (None si no está en el carrito)."""
+        return self._lineas.get(producto_id)
+
+    def posicion(self, producto_id: int) -> Optional[int]:
+        """
+        Posición de llegada de la línea (desde 1). No cambia al quitar otras
+        líneas y una línea restaurada con deshacer() recupera la suya.
+        """
+        return self._orden.get(producto_id)
+
+    def detalles(self) -> List[dict]:
+        """Copia de las líneas en orden de llegada, para registrar el ticket."""
+        orden = self._orden
+        return [dict(linea) for linea in sorted(self._lineas.values(),
+                                                 key=lambda l: orden[l['producto_id']])]
+
+    def puede_deshacer(self) -> bool:
+        return bool(self._deshacer)
+
+    # ---------- Operaciones ----------
+
+    def agregar(self, producto_id: int, nombre: str, cantidad: int, precio_unit: float,
+                **datos) -> dict:
+        """
+        Suma `cantidad` unidades de un producto. Si ya tiene línea se suma
+        a ella (conservando su precio); si no, se crea al final con `datos`.
+        Retorna la línea.
+        """
+        linea = self._lineas.get(producto_id)
+        if linea is not None:
+            self._deshacer.append(('cantidad', producto_id, linea['cantidad']))
+            self._fijar_cantidad(linea, linea['cantidad'] + cantidad)
+            return linea
+
+        linea = {
+            'producto_id': producto_id,
+            'nombre_producto': nombre,
+            'cantidad': cantidad,
+            self.campo_precio: precio_unit,
+            'total_linea_usd': cantidad * precio_unit,
+            **datos
+        }
+        self._insertar(linea, self._siguiente_orden)
+        self._siguiente_orden += 1
+        self._deshacer.append(('agregado', producto_id))
+        return linea
+
+    def cambiar_cantidad(self, producto_id: int, delta: int) -> Optional[dict]:
+        """
+        Suma `delta` a la cantidad de una línea; si queda en cero o menos, la
+        quita. Retorna la línea, o None si ya no está en el carrito.
+        """
+        linea = self._lineas.get(producto_id)
+        if linea is None:
+            return None
+        if linea['cantidad'] + delta <= 0:
+            self.eliminar(producto_id)
+            return None
+        self._deshacer.append(('cantidad', producto_id, linea['cantidad']))
+        self._fijar_cantidad(linea, linea['cantidad'] + delta)
+        return linea
+
+    def eliminar(self, producto_id: int) -> Optional[dict]:
+        """Quita la línea de un producto. Retorna la línea quitada (o None)."""
+        orden = self._orden.get(producto_id)
+        linea = self._quitar(producto_id)
+        if linea is not None:
+            self._deshacer.append(('eliminado', dict(linea), orden))
+        return linea
+
+    def deshacer(self) -> Optional[int]:
+        """
+        Revierte la última operación (agregar, cambiar cantidad o eliminar).
+        Retorna el producto_id de la línea afectada, o None si no había nada.
+        """
+        if not self._deshacer:
+            return None
+        operacion = self._deshacer.pop()
+        if operacion[0] == 'agregado':
+            producto_id = operacion[1]
+            self._quitar(producto_id)
+        elif operacion[0] == 'cantidad':
+            producto_id, cantidad = operacion[1], operacion[2]
+            self._fijar_cantidad(self._lineas[producto_id], cantidad)
+        else:
+            linea, orden = operacion[1], operacion[2]
+            producto_id = linea['producto_id']
+            self._insertar(linea, orden)
+        return producto_id
+
+    def limpiar(self):
+        """Vacía el carrito y su historial (ticket nuevo)."""
+        self._lineas.clear()
+        self._orden.clear()
+        self._siguiente_orden = 1
+        self._deshacer.clear()
+        self.subtotal_usd = 0.0
+        self.iva_usd = 0.0
+        self.unidades = 0
+
+    # ---------- Internos ----------
+
+    def _insertar(self, linea: dict, orden: int):
+        self._lineas[linea['producto_id']] = linea
+        self._orden[linea['producto_id']] = orden
+        self._acumular(linea['total_linea_usd'], linea['cantidad'])
+
+    def _quitar(self, producto_id: int) -> Optional[dict]:
+        linea = self._lineas.pop(producto_id, None)
+        if linea is None:
+            return None
+        del self._orden[producto_id]
+        self._acumular(-linea['total_linea_usd'], -linea['cantidad'])
+        if not self._lineas:
+            # Sin arrastre de redondeo de un ticket a otro
+            self.subtotal_usd = self.iva_usd = 0.0
+            self.unidades = 0
+        return linea
+
+    def _fijar_cantidad(self, linea: dict, cantidad: int):
+        anterior_total, anterior_cantidad = linea['total_linea_usd'], linea['cantidad']
+        linea['cantidad'] = cantidad
+        linea['total_linea_usd'] = cantidad * linea[self.campo_precio]
+        self._acumular(linea['total_linea_usd'] - anterior_total, cantidad - anterior_cantidad)
+
+    def _acumular(self, delta_usd: float, delta_unidades: int):
+        self.subtotal_usd += delta_usd
+        self.iva_usd += delta_usd * self.iva_porcentaje
+        self.unidades += delta_unidades
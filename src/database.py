@@ -4,8 +4,24 @@ Base de datos SQLite para el Sistema de Ventas e Inventario
 import sqlite3
 import os
 import sys
-from datetime import datetime
-from typing import Optional, List, Tuple, Any
+import gc
+import json
+import time
+import atexit
+import weakref
+import threading
+import re
+from datetime import datetime, date, timedelta
+from typing import Optional, List, Tuple, Any, Iterable
+
+# Igual que urllib.request.pathname2url, sin cargar http.client, ssl y email
+# (urllib.request sumaba ~40 ms al arranque)
+if os.name == 'nt':
+    from nturl2path import pathname2url
+else:
+    from urllib.parse import quote as pathname2url
+
+from utils.query_monitor import get_monitor, configurar_monitor, CursorMonitoreado
 
 def get_db_path() -> str:
     """Obtiene la ruta de la base de datos según el entorno de ejecución."""
@@ -24,23 +40,702 @@ def get_db_path() -> str:
 DB_PATH = get_db_path()
 
 
+def _leer_config_json() -> dict:
+    """Lee config.json empaquetado (vacío si no existe o es inválido)."""
+    try:
+        # En PyInstaller, los archivos empaquetados se extraen a sys._MEIPASS
+        if getattr(sys, 'frozen', False):
+            config_path = os.path.join(sys._MEIPASS, 'config.json')
+        else:
+            config_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'config.json')
+
+        with open(config_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def get_config_bd() -> dict:
+    """Obtiene la sección 'base_datos' de config.json (vacía si no existe)."""
+    return _leer_config_json().get('base_datos') or {}
+
+
+def get_config_facturacion() -> dict:
+    """Obtiene la sección 'facturacion' de config.json (vacía si no existe)."""
+    return _leer_config_json().get('facturacion') or {}
+
+
+# ============== PERFILES DE RENDIMIENTO ==============
+
+# Cada perfil define los PRAGMA que se aplican a toda conexión nueva.
+# cache_size negativo = KiB; mmap_size en bytes; busy_timeout en ms.
+PERFILES_RENDIMIENTO = {
+    'safe': {
+        'descripcion': 'Máxima durabilidad: diario clásico y fsync completo en cada venta',
+        'journal_mode': 'DELETE',
+        'synchronous': 'FULL',
+        'cache_size': -2000,
+        'mmap_size': 0,
+        'temp_store': 'DEFAULT',
+        'busy_timeout': 5000,
+    },
+    'balanced': {
+        'descripcion': 'WAL con fsync en checkpoints: reportes no bloquean la caja',
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -16000,
+        'mmap_size': 64 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+        'busy_timeout': 5000,
+    },
+    'throughput': {
+        'descripcion': 'WAL sin fsync: máximo rendimiento, puede perder las últimas ventas si se va la luz',
+        'journal_mode': 'WAL',
+        'synchronous': 'OFF',
+        'cache_size': -64000,
+        'mmap_size': 256 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+        'busy_timeout': 10000,
+    },
+}
+
+PERFIL_POR_DEFECTO = 'balanced'
+
+
+def get_perfil_rendimiento() -> str:
+    """Obtiene el nombre del perfil de rendimiento configurado en config.json."""
+    perfil = get_config_bd().get('perfil_rendimiento', PERFIL_POR_DEFECTO)
+    if perfil not in PERFILES_RENDIMIENTO:
+        print(f"⚠️ Perfil de rendimiento desconocido '{perfil}', usando '{PERFIL_POR_DEFECTO}'")
+        perfil = PERFIL_POR_DEFECTO
+    return perfil
+
+
+def aplicar_perfil(conn: sqlite3.Connection, perfil: str, solo_lectura: bool = False):
+    """
+    Aplica los PRAGMA de un perfil de rendimiento a una conexión.
+
+    Una conexión de sólo lectura no puede cambiar journal_mode: usa el que
+    dejaron las conexiones de escritura.
+    """
+    ajustes = PERFILES_RENDIMIENTO[perfil]
+    # busy_timeout primero, para que el cambio de journal_mode espere si hay otro escritor
+    conn.execute(f"PRAGMA busy_timeout = {int(ajustes['busy_timeout'])}")
+    if not solo_lectura:
+        conn.execute(f"PRAGMA journal_mode = {ajustes['journal_mode']}")
+    conn.execute(f"PRAGMA synchronous = {ajustes['synchronous']}")
+    conn.execute(f"PRAGMA cache_size = {int(ajustes['cache_size'])}")
+    conn.execute(f"PRAGMA mmap_size = {int(ajustes['mmap_size'])}")
+    conn.execute(f"PRAGMA temp_store = {ajustes['temp_store']}")
+
+
+_mediciones_perfil = {}
+
+
+def medir_commits_por_segundo(perfil: str = None, duracion: float = 1.0,
+                              max_commits: int = 2000) -> float:
+    """
+    Mide cuántas transacciones pequeñas por segundo soporta un perfil.
+
+    La prueba se hace sobre un archivo temporal junto a la base de datos
+    (mismo disco), nunca sobre la base de datos real.
+    """
+    import tempfile
+
+    perfil = perfil or get_perfil_rendimiento()
+    db_dir = os.path.dirname(DB_PATH)
+    os.makedirs(db_dir, exist_ok=True)
+    fd, ruta = tempfile.mkstemp(prefix='bench_', suffix='.db', dir=db_dir)
+    os.close(fd)
+
+    conn = sqlite3.connect(ruta)
+    try:
+        aplicar_perfil(conn, perfil)
+        conn.execute('CREATE TABLE prueba (id INTEGER PRIMARY KEY, valor REAL, texto TEXT)')
+        conn.commit()
+
+        commits = 0
+        inicio = time.perf_counter()
+        while commits < max_commits:
+            conn.execute('INSERT INTO prueba (valor, texto) VALUES (?, ?)', (commits * 1.5, 'venta'))
+            conn.commit()
+            commits += 1
+            if time.perf_counter() - inicio >= duracion:
+                break
+        transcurrido = time.perf_counter() - inicio
+    finally:
+        conn.close()
+        for sufijo in ('', '-wal', '-shm', '-journal'):
+            try:
+                os.remove(ruta + sufijo)
+            except OSError:
+                pass
+
+    resultado = commits / transcurrido if transcurrido > 0 else 0.0
+    _mediciones_perfil[perfil] = resultado
+    return resultado
+
+
+def get_medicion_perfil(perfil: str = None) -> Optional[float]:
+    """Obtiene la última medición de commits/s de un perfil (None si no se ha medido)."""
+    return _mediciones_perfil.get(perfil or get_perfil_rendimiento())
+
+
+# ============== POOL DE CONEXIONES ==============
+
+# Monitor de consultas (opcional): config.json base_datos.monitor_consultas
+_monitor = get_monitor()
+configurar_monitor(get_config_bd().get('monitor_consultas', False),
+                   get_config_bd().get('umbral_lento_ms', 50.0))
+
+
+class ConexionAgrupada(sqlite3.Connection):
+    """
+    Conexión SQLite que al cerrarse vuelve a su pool en lugar de destruirse.
+
+    Dentro de un lote de escritura (ver iniciar_lote) commit() y close() no
+    hacen nada y rollback() sólo deshace la operación actual del lote.
+    """
+
+    _en_lote = False
+
+    def cursor(self, factory=None):
+        """Crea un cursor (instrumentado si el monitor de consultas está activo)."""
+        if factory is None:
+            factory = CursorMonitoreado if _monitor.activo else sqlite3.Cursor
+        return super().cursor(factory)
+
+    def execute(self, sql, parametros=()):
+        """Ejecuta una sentencia pasando por cursor() para poder instrumentarla."""
+        if _monitor.activo:
+            return self.cursor().execute(sql, parametros)
+        return super().execute(sql, parametros)
+
+    def executemany(self, sql, secuencia):
+        """Ejecuta una sentencia por cada juego de parámetros (instrumentable)."""
+        if _monitor.activo:
+            return self.cursor().executemany(sql, secuencia)
+        return super().executemany(sql, secuencia)
+
+    def commit(self):
+        """Confirma la transacción (en un lote, la confirma terminar_lote)."""
+        if not self._en_lote:
+            super().commit()
+
+    def rollback(self):
+        """Revierte la transacción (en un lote, sólo la operación actual)."""
+        if self._en_lote:
+            self.execute(f'ROLLBACK TO {_SAVEPOINT_LOTE}')
+        else:
+            super().rollback()
+
+    def close(self):
+        """Devuelve la conexión al pool (o la cierra si no pertenece a uno)."""
+        if self._en_lote:
+            return
+        pool = getattr(self, '_pool', None)
+        if pool is None:
+            super().close()
+        else:
+            pool.liberar(self)
+
+    def cerrar_definitivamente(self):
+        """Cierra la conexión SQLite subyacente."""
+        finalizador = getattr(self, '_finalizador', None)
+        if finalizador is not None:
+            finalizador.detach()
+        self._pool = None
+        super().close()
+
+
+class PoolConexiones:
+    """
+    Pool de conexiones SQLite de larga vida.
+
+    Cada conexión recuerda el último hilo que la usó y se le entrega de nuevo
+    a ese hilo cuando está libre (afinidad por hilo). Las conexiones que
+    estuvieron inactivas más de `intervalo_salud` segundos se verifican con
+    un SELECT 1 antes de prestarlas.
+
+    Con solo_lectura las conexiones se abren con una URI mode=ro y
+    query_only: cualquier escritura falla en lugar de tomar el candado.
+    """
+
+    def __init__(self, ruta: str, tamano: int = 4, intervalo_salud: float = 30.0,
+                 timeout: float = 10.0, perfil: str = PERFIL_POR_DEFECTO,
+                 solo_lectura: bool = False):
+        self.ruta = ruta
+        self.perfil = perfil
+        self.solo_lectura = solo_lectura
+        self.tamano = max(1, int(tamano))
+        self.intervalo_salud = intervalo_salud
+        self.timeout = timeout
+
+        self._cond = threading.Condition()
+        self._libres: List[ConexionAgrupada] = []
+        self._total = 0
+        self._cerrado = False
+
+        self._aciertos = 0      # Conexión reutilizada del pool
+        self._afines = 0        # ...y además era la del mismo hilo
+        self._fallos = 0        # Hubo que abrir una conexión nueva
+        self._esperas = 0       # El pool estaba lleno y hubo que esperar
+        self._descartadas = 0   # Conexiones que no pasaron la verificación
+        self._fugas = 0         # Conexiones nunca devueltas (recolectadas)
+
+    def _crear_conexion(self) -> ConexionAgrupada:
+        """Abre y configura una conexión nueva para el pool."""
+        os.makedirs(os.path.dirname(self.ruta), exist_ok=True)
+
+        if self.solo_lectura:
+            uri = f"file:{pathname2url(os.path.abspath(self.ruta))}?mode=ro"
+            conn = sqlite3.connect(uri, uri=True, factory=ConexionAgrupada, check_same_thread=False)
+            conn.execute("PRAGMA query_only = ON")
+        else:
+            conn = sqlite3.connect(self.ruta, factory=ConexionAgrupada, check_same_thread=False)
+        conn.row_factory = sqlite3.Row  # Para acceder a columnas por nombre
+        conn.execute("PRAGMA foreign_keys = ON")  # Habilitar claves foráneas
+        aplicar_perfil(conn, self.perfil, self.solo_lectura)
+
+        conn._pool = self
+        conn._en_uso = False
+        conn._hilo = None
+        conn._ultimo_uso = time.monotonic()
+        # Si el llamador nunca la devuelve, liberar su cupo al ser recolectada
+        conn._finalizador = weakref.finalize(conn, self._recuperar_cupo)
+        return conn
+
+    def _recuperar_cupo(self):
+        """Libera el cupo de una conexión prestada que nunca se devolvió."""
+        with self._cond:
+            self._total -= 1
+            self._fugas += 1
+            self._cond.notify()
+
+    def _tomar_libre(self, hilo: int) -> Optional[ConexionAgrupada]:
+        """Toma una conexión libre, preferiblemente la del mismo hilo."""
+        for i in range(len(self._libres) - 1, -1, -1):
+            if self._libres[i]._hilo == hilo:
+                self._afines += 1
+                return self._libres.pop(i)
+        if self._libres:
+            return self._libres.pop()
+        return None
+
+    def _conexion_sana(self, conn: ConexionAgrupada) -> bool:
+        """Verifica una conexión que lleva tiempo inactiva."""
+        if time.monotonic() - conn._ultimo_uso < self.intervalo_salud:
+            return True
+        try:
+            conn.execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _descartar(self, conn: ConexionAgrupada):
+        """Cierra una conexión y libera su cupo en el pool."""
+        try:
+            conn.cerrar_definitivamente()
+        except sqlite3.Error:
+            pass
+        with self._cond:
+            self._total -= 1
+            self._cond.notify()
+
+    def obtener(self) -> ConexionAgrupada:
+        """Presta una conexión del pool, esperando si está lleno."""
+        hilo = threading.get_ident()
+        inicio_espera = None
+        recolectado = False
+
+        with self._cond:
+            while True:
+                if self._cerrado:
+                    raise sqlite3.ProgrammingError("El pool de conexiones está cerrado")
+
+                conn = self._tomar_libre(hilo)
+                if conn is not None:
+                    self._aciertos += 1
+                    break
+
+                if self._total < self.tamano:
+                    self._total += 1
+                    self._fallos += 1
+                    break
+
+                # Pool lleno: las conexiones olvidadas sin close() quedan en un
+                # ciclo de referencias; recolectarlas libera su cupo.
+                if not recolectado:
+                    recolectado = True
+                    gc.collect()
+                    continue
+
+                # Esperar a que alguien devuelva una conexión
+                if inicio_espera is None:
+                    inicio_espera = time.monotonic()
+                    self._esperas += 1
+                restante = self.timeout - (time.monotonic() - inicio_espera)
+                if restante <= 0:
+                    raise sqlite3.OperationalError(
+                        "Tiempo de espera agotado obteniendo una conexión del pool"
+                    )
+                self._cond.wait(restante)
+
+        if conn is not None and not self._conexion_sana(conn):
+            self._descartadas += 1
+            self._descartar(conn)
+            return self.obtener()
+
+        if conn is None:
+            try:
+                conn = self._crear_conexion()
+            except Exception:
+                with self._cond:
+                    self._total -= 1
+                    self._cond.notify()
+                raise
+
+        conn._hilo = hilo
+        conn._en_uso = True
+        return conn
+
+    def liberar(self, conn: ConexionAgrupada):
+        """Devuelve una conexión al pool."""
+        if not conn._en_uso:
+            return  # close() llamado dos veces
+        conn._en_uso = False
+
+        try:
+            # Descartar cualquier transacción que el llamador dejó abierta
+            if conn.in_transaction:
+                conn.rollback()
+            conn.row_factory = sqlite3.Row
+        except sqlite3.Error:
+            self._descartadas += 1
+            self._descartar(conn)
+            return
+
+        conn._ultimo_uso = time.monotonic()
+        with self._cond:
+            if self._cerrado:
+                self._total -= 1
+                conn.cerrar_definitivamente()
+            else:
+                self._libres.append(conn)
+            self._cond.notify()
+
+    def cerrar(self):
+        """Cierra las conexiones libres; las prestadas se cierran al devolverse."""
+        with self._cond:
+            self._cerrado = True
+            libres, self._libres = self._libres, []
+            self._total -= len(libres)
+            self._cond.notify_all()
+        for conn in libres:
+            try:
+                conn.cerrar_definitivamente()
+            except sqlite3.Error:
+                pass
+
+    def get_estadisticas(self) -> dict:
+        """Obtiene los contadores del pool."""
+        with self._cond:
+            return {
+                'perfil': self.perfil,
+                'solo_lectura': self.solo_lectura,
+                'tamano': self.tamano,
+                'abiertas': self._total,
+                'libres': len(self._libres),
+                'en_uso': self._total - len(self._libres),
+                'aciertos': self._aciertos,
+                'afines': self._afines,
+                'fallos': self._fallos,
+                'esperas': self._esperas,
+                'descartadas': self._descartadas,
+                'fugas': self._fugas,
+            }
+
+
+_pool: Optional[PoolConexiones] = None
+_pool_lectura: Optional[PoolConexiones] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> PoolConexiones:
+    """Obtiene el pool de la base de datos actual (lo crea si no existe)."""
+    global _pool
+    pool = _pool
+    if pool is not None and pool.ruta == DB_PATH:
+        return pool
+
+    with _pool_lock:
+        if _pool is None or _pool.ruta != DB_PATH:
+            if _pool is not None:
+                _pool.cerrar()
+            config = get_config_bd()
+            _pool = PoolConexiones(
+                DB_PATH,
+                tamano=config.get('pool_conexiones', 4),
+                intervalo_salud=config.get('pool_intervalo_salud', 30.0),
+                perfil=get_perfil_rendimiento()
+            )
+        return _pool
+
 
 def get_connection() -> sqlite3.Connection:
-    """Obtiene una conexión a la base de datos."""
-    # Asegurar que existe el directorio data
-    os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
-    
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row  # Para acceder a columnas por nombre
-    conn.execute("PRAGMA foreign_keys = ON")  # Habilitar claves foráneas
+    """Obtiene una conexión del pool. Al llamar a close() vuelve al pool."""
+    conn = getattr(_lote_local, 'conexion', None)
+    if conn is not None:
+        return conn
+    return _get_pool().obtener()
+
+
+# ============== CONEXIONES DE SÓLO LECTURA (REPORTES) ==============
+
+# Los reportes y el dashboard leen por un pool aparte de conexiones mode=ro:
+# no compiten por cupos con la caja y nunca pueden tomar el candado de
+# escritura. Con WAL (perfiles balanced/throughput) leen una instantánea
+# consistente sin demorar las ventas; con el diario clásico (safe) una
+# lectura larga sigue bloqueando el COMMIT de una venta mientras dura.
+
+def _get_pool_lectura() -> PoolConexiones:
+    """Obtiene el pool de sólo lectura de la base de datos actual (lo crea si no existe)."""
+    global _pool_lectura
+    pool = _pool_lectura
+    if pool is not None and pool.ruta == DB_PATH:
+        return pool
+
+    with _pool_lock:
+        if _pool_lectura is None or _pool_lectura.ruta != DB_PATH:
+            if _pool_lectura is not None:
+                _pool_lectura.cerrar()
+            config = get_config_bd()
+            _pool_lectura = PoolConexiones(
+                DB_PATH,
+                tamano=config.get('pool_lectura', 2),
+                intervalo_salud=config.get('pool_intervalo_salud', 30.0),
+                perfil=get_perfil_rendimiento(),
+                solo_lectura=True
+            )
+        return _pool_lectura
+
+
+def get_connection_lectura(instantanea: bool = False, historico: bool = False,
+                           desde=None, hasta=None) -> sqlite3.Connection:
+    """
+    Obtiene una conexión de sólo lectura para consultas analíticas.
+
+    Con instantanea=True abre una transacción de lectura: todas las
+    consultas hasta close() ven la base en el mismo momento, aunque la
+    caja registre ventas mientras tanto.
+
+    Con historico=True, si el período [desde, hasta] (None = sin límite)
+    incluye años archivados, la conexión los adjunta y las tablas
+    históricas (ventas, detalle_ventas, movimientos_inventario) muestran
+    también sus filas: las consultas no necesitan cambiar.
+    """
+    anios = _anios_archivados(desde, hasta) if historico else []
+    if anios:
+        conn = _abrir_conexion_historica(anios)
+    else:
+        conn = _get_pool_lectura().obtener()
+    if instantanea:
+        conn.execute('BEGIN')
     return conn
 
 
-def init_database():
-    """Inicializa la base de datos con todas las tablas necesarias."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
+# ============== HISTORIAL ARCHIVADO POR AÑO ==============
+
+# utils/archiver.py mueve los años cerrados a un archivo SQLite por año en
+# data/archivo/. Para leerlos se adjuntan (ATTACH) a una conexión aparte y
+# una vista TEMP con el mismo nombre de cada tabla une la base viva con los
+# años adjuntos; SQLite resuelve primero el esquema temp, así que el SQL de
+# los reportes no cambia.
+TABLAS_HISTORICAS = ('ventas', 'detalle_ventas', 'movimientos_inventario')
+
+
+def get_dir_archivo() -> str:
+    """Carpeta de los archivos históricos (junto a la base de datos)."""
+    return os.path.join(os.path.dirname(DB_PATH), 'archivo')
+
+
+def get_archivos_historicos() -> List[dict]:
+    """Obtiene los años archivados con sus conteos y la ruta de cada archivo."""
+    conn = _get_pool_lectura().obtener()
+    try:
+        rows = conn.execute('SELECT * FROM archivos_historicos ORDER BY anio').fetchall()
+    finally:
+        conn.close()
+    archivos = []
+    for row in rows:
+        archivo = dict(row)
+        archivo['ruta'] = os.path.join(get_dir_archivo(), archivo['archivo'])
+        archivos.append(archivo)
+    return archivos
+
+
+def _anios_archivados(desde=None, hasta=None) -> List[Tuple[int, str]]:
+    """Años archivados (anio, ruta) que se cruzan con el período dado."""
+    anio_desde = _como_fecha(desde).year if desde is not None else 0
+    anio_hasta = _como_fecha(hasta).year if hasta is not None else 9999
+    return [
+        (archivo['anio'], archivo['ruta']) for archivo in get_archivos_historicos()
+        if anio_desde <= archivo['anio'] <= anio_hasta and os.path.exists(archivo['ruta'])
+    ]
+
+
+def _abrir_conexion_historica(anios: List[Tuple[int, str]]) -> sqlite3.Connection:
+    """
+    Abre una conexión de sólo lectura (fuera del pool) con los años adjuntos.
+
+    Las tablas que el archivo de un año no tiene (columnas agregadas después
+    de archivarlo) se completan con NULL.
+    """
+    uri = f"file:{pathname2url(os.path.abspath(DB_PATH))}?mode=ro"
+    conn = sqlite3.connect(uri, uri=True, factory=ConexionAgrupada, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    aplicar_perfil(conn, get_perfil_rendimiento(), solo_lectura=True)
+
+    for anio, ruta in anios:
+        conn.execute(f"ATTACH DATABASE ? AS archivo_{int(anio)}",
+                     (f"file:{pathname2url(os.path.abspath(ruta))}?mode=ro",))
+
+    for tabla in TABLAS_HISTORICAS:
+        columnas = [row['name'] for row in conn.execute(f"PRAGMA main.table_info({tabla})")]
+        partes = [f"SELECT {', '.join(columnas)} FROM main.{tabla}"]
+        for anio, _ in anios:
+            esquema = f"archivo_{int(anio)}"
+            existentes = {row['name'] for row in conn.execute(f"PRAGMA {esquema}.table_info({tabla})")}
+            if not existentes:
+                continue
+            campos = ', '.join(c if c in existentes else f"NULL AS {c}" for c in columnas)
+            partes.append(f"SELECT {campos} FROM {esquema}.{tabla}")
+        conn.execute(f"CREATE TEMP VIEW {tabla} AS {' UNION ALL '.join(partes)}")
+
+    # Recién ahora: query_only también impediría crear las vistas temporales
+    conn.execute("PRAGMA query_only = ON")
+    return conn
+
+
+# ============== LOTES DE ESCRITURA (GROUP COMMIT) ==============
+
+# Mientras un hilo tiene un lote abierto, get_connection() le devuelve siempre
+# la conexión del lote; cada operación corre en un SAVEPOINT y el lote entero
+# se confirma con un único COMMIT (un solo fsync para toda la ráfaga).
+_SAVEPOINT_LOTE = 'operacion_lote'
+_lote_local = threading.local()
+
+
+def iniciar_lote() -> sqlite3.Connection:
+    """Abre un lote de escritura en el hilo actual y retorna su conexión."""
+    if getattr(_lote_local, 'conexion', None) is not None:
+        raise sqlite3.ProgrammingError("Ya hay un lote de escritura abierto en este hilo")
+
+    conn = _get_pool().obtener()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+    except Exception:
+        conn.close()
+        raise
+    conn._en_lote = True
+    _lote_local.conexion = conn
+    _lote_local.notificaciones = []
+    return conn
+
+
+def ejecutar_en_lote(funcion, *args, **kwargs) -> Any:
+    """
+    Ejecuta una operación dentro del lote abierto, aislada en un SAVEPOINT.
+
+    Si la operación falla (lanza una excepción o retorna False, como las
+    funciones que atrapan su propio error) sólo se deshacen sus cambios y
+    sus avisos a suscriptores; el resto del lote sigue adelante.
+    """
+    conn = _lote_local.conexion
+    avisos_previos = len(_lote_local.notificaciones)
+    conn.execute(f'SAVEPOINT {_SAVEPOINT_LOTE}')
+    try:
+        resultado = funcion(*args, **kwargs)
+    except Exception:
+        _deshacer_operacion_lote(conn, avisos_previos)
+        raise
+    if resultado is False:
+        _deshacer_operacion_lote(conn, avisos_previos)
+    else:
+        conn.execute(f'RELEASE {_SAVEPOINT_LOTE}')
+    return resultado
+
+
+def _deshacer_operacion_lote(conn: sqlite3.Connection, avisos_previos: int):
+    """Revierte el SAVEPOINT de la operación en curso y descarta sus avisos."""
+    conn.execute(f'ROLLBACK TO {_SAVEPOINT_LOTE}')
+    conn.execute(f'RELEASE {_SAVEPOINT_LOTE}')
+    del _lote_local.notificaciones[avisos_previos:]
+
+
+def terminar_lote(confirmar: bool = True):
+    """
+    Cierra el lote del hilo actual confirmando (o revirtiendo) todo su trabajo.
+
+    Los avisos de cambios en productos retenidos durante el lote se envían
+    recién después del COMMIT; si se revierte (o el COMMIT falla) se descartan.
+    """
+    conn = _lote_local.conexion
+    notificaciones = _lote_local.notificaciones
+    _lote_local.conexion = None
+    _lote_local.notificaciones = []
+    conn._en_lote = False
+    try:
+        if confirmar:
+            conn.commit()
+        else:
+            conn.rollback()
+            notificaciones = []
+    except Exception:
+        notificaciones = []
+        raise
+    finally:
+        conn.close()
+        for accion, producto_ids in notificaciones:
+            _notificar_cambio_productos(accion, producto_ids)
+
+
+def get_estadisticas_pool(lectura: bool = False) -> dict:
+    """Obtiene los contadores de aciertos/fallos/esperas del pool (o del de lectura)."""
+    return (_get_pool_lectura() if lectura else _get_pool()).get_estadisticas()
+
+
+def cerrar_pool():
+    """Cierra todas las conexiones de ambos pools (al salir de la aplicación)."""
+    global _pool, _pool_lectura, _config_conn, _config_cache
+    with _config_lock:
+        if _config_conn is not None:
+            _config_conn.close()
+            _config_conn = None
+        _config_cache = None
+    with _pool_lock:
+        if _pool is not None:
+            _pool.cerrar()
+            _pool = None
+        if _pool_lectura is not None:
+            _pool_lectura.cerrar()
+            _pool_lectura = None
+
+
+atexit.register(cerrar_pool)
+
+
+# ============== MIGRACIONES DEL ESQUEMA ==============
+
+def _agregar_columna_si_falta(cursor, tabla: str, columna: str, definicion: str):
+    """Agrega una columna a una tabla si todavía no existe (uso interno)."""
+    cursor.execute(f"PRAGMA table_info({tabla})")
+    if columna not in [col[1] for col in cursor.fetchall()]:
+        cursor.execute(f'ALTER TABLE {tabla} ADD COLUMN {columna} {definicion}')
+
+
+def _migracion_esquema_inicial(cursor):
+    """Tablas, columnas agregadas en versiones anteriores, índices y datos iniciales."""
     # Tabla de Configuración
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS configuracion (
@@ -100,12 +795,6 @@ def init_database():
         )
     ''')
     
-    # Migración: agregar columna activo a clientes si no existe
-    try:
-        cursor.execute('ALTER TABLE clientes ADD COLUMN activo INTEGER DEFAULT 1')
-    except sqlite3.OperationalError:
-        pass  # Columna ya existe
-    
     # Tabla de Ventas
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS ventas (
@@ -196,13 +885,18 @@ def init_database():
         )
     ''')
     
+    # Columnas agregadas después de la primera versión
+    _agregar_columna_si_falta(cursor, 'clientes', 'activo', 'INTEGER DEFAULT 1')
+    _agregar_columna_si_falta(cursor, 'configuracion', 'password_admin', 'TEXT')
+    _agregar_columna_si_falta(cursor, 'productos', 'porcentaje_ganancia', 'REAL DEFAULT 30')
+    
     # Crear índices para optimización
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_productos_codigo ON productos(codigo)')
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_productos_nombre ON productos(nombre)')
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_ventas_fecha ON ventas(fecha)')
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_ventas_numero ON ventas(numero_factura)')
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_compras_fecha ON compras(fecha)')
-    
+
     # Insertar configuración inicial si no existe
     cursor.execute('SELECT COUNT(*) FROM configuracion')
     if cursor.fetchone()[0] == 0:
@@ -211,18 +905,6 @@ def init_database():
             VALUES (?, ?, ?)
         ''', ('Mi Tienda', 45.50, 16.0))
     
-    # Migración: agregar columna password_admin si no existe
-    cursor.execute("PRAGMA table_info(configuracion)")
-    columnas = [col[1] for col in cursor.fetchall()]
-    if 'password_admin' not in columnas:
-        cursor.execute('ALTER TABLE configuracion ADD COLUMN password_admin TEXT')
-    
-    # Migración: agregar columna porcentaje_ganancia a productos si no existe
-    cursor.execute("PRAGMA table_info(productos)")
-    columnas_prod = [col[1] for col in cursor.fetchall()]
-    if 'porcentaje_ganancia' not in columnas_prod:
-        cursor.execute('ALTER TABLE productos ADD COLUMN porcentaje_ganancia REAL DEFAULT 30')
-    
     # Insertar categorías iniciales si no existen
     cursor.execute('SELECT COUNT(*) FROM categorias')
     if cursor.fetchone()[0] == 0:
@@ -237,25 +919,258 @@ def init_database():
             'INSERT INTO categorias (nombre, descripcion) VALUES (?, ?)',
             categorias_iniciales
         )
+
+
+def _migracion_busqueda(cursor):
+    """Índice FTS5 de productos (ver _crear_indice_busqueda)."""
+    _crear_indice_busqueda(cursor)
+
+
+def _migracion_secuencias(cursor):
+    """Tabla de secuencias para la numeración atómica de facturas."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS secuencias (
+            serie TEXT PRIMARY KEY,
+            ultimo INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+
+
+def _migracion_indices_recomendados(cursor):
+    """Índices sugeridos por tools/index_advisor.py para las consultas frecuentes."""
+    # Detalle de una venta (reportes, reimpresión): 15.6 ms -> 1.0 ms
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_detalle_ventas_venta ON detalle_ventas(venta_id)')
+    # Kardex de un producto, ordenado por fecha: 5.9 ms -> 0.06 ms
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_movimientos_producto_fecha '
+                   'ON movimientos_inventario(producto_id, fecha)')
+    # Últimos movimientos de todo el inventario: 165 ms -> 0.2 ms
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_movimientos_fecha ON movimientos_inventario(fecha)')
+    # Alerta de bajo stock: índice parcial, sólo contiene los productos en alerta
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_productos_bajo_stock ON productos(stock_actual)
+        WHERE activo = 1 AND stock_actual <= stock_minimo
+    ''')
+
+
+def _migracion_cortes_stock(cursor):
+    """Cortes mensuales de stock por producto (ver construir_corte_stock_pendiente)."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS cortes_stock (
+            fecha TEXT NOT NULL,
+            producto_id INTEGER NOT NULL,
+            stock INTEGER NOT NULL,
+            PRIMARY KEY (fecha, producto_id)
+        ) WITHOUT ROWID
+    ''')
+
+
+def _migracion_archivos_historicos(cursor):
+    """Registro de los años movidos a archivos históricos (ver utils/archiver.py)."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS archivos_historicos (
+            anio INTEGER PRIMARY KEY,
+            archivo TEXT NOT NULL,
+            ventas INTEGER NOT NULL DEFAULT 0,
+            detalles INTEGER NOT NULL DEFAULT 0,
+            movimientos INTEGER NOT NULL DEFAULT 0,
+            fecha_archivado DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+
+def _migracion_resumen_ventas(cursor):
+    """Resumen diario de ventas mantenido por triggers (ver reconstruir_resumen_ventas)."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS ventas_resumen_diario (
+            dia TEXT PRIMARY KEY,
+            cantidad INTEGER NOT NULL DEFAULT 0,
+            total_usd REAL NOT NULL DEFAULT 0,
+            total_bs REAL NOT NULL DEFAULT 0,
+            unidades INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS ventas_resumen_pago (
+            dia TEXT NOT NULL,
+            forma_pago TEXT NOT NULL,
+            cantidad INTEGER NOT NULL DEFAULT 0,
+            total_usd REAL NOT NULL DEFAULT 0,
+            total_bs REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (dia, forma_pago)
+        ) WITHOUT ROWID
+    ''')
+    _crear_triggers_resumen(cursor)
+    # Llenarlo con las ventas que ya existen
+    cursor.execute('DELETE FROM ventas_resumen_diario')
+    cursor.execute('DELETE FROM ventas_resumen_pago')
+    cursor.execute(f'INSERT INTO ventas_resumen_diario {_SQL_RESUMEN_DIARIO}')
+    cursor.execute(f'INSERT INTO ventas_resumen_pago {_SQL_RESUMEN_PAGO}')
+
+
+def _migracion_registro_cambios(cursor):
+    """Registro de cambios (CDC) llenado por triggers (ver get_cambios_desde)."""
+    # AUTOINCREMENT: un seq nunca se reutiliza aunque se compacte todo el registro
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS registro_cambios (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            tabla TEXT NOT NULL,
+            fila INTEGER NOT NULL,
+            op TEXT NOT NULL
+        )
+    ''')
+    # Hasta qué seq se descartó el registro: un cursor anterior debe releer todo
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS registro_cambios_estado (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            corte INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute('INSERT OR IGNORE INTO registro_cambios_estado (id, corte) VALUES (1, 0)')
+    _crear_triggers_registro(cursor)
+
+
+def _migracion_pausa_registro(cursor):
+    """Permite suspender el registro de cambios dentro de una transacción (ver pausar_registro_cambios)."""
+    columnas = {row[1] for row in cursor.execute('PRAGMA table_info(registro_cambios_estado)')}
+    if 'pausado' not in columnas:
+        cursor.execute(
+            'ALTER TABLE registro_cambios_estado ADD COLUMN pausado INTEGER NOT NULL DEFAULT 0'
+        )
+    for tabla in TABLAS_CON_REGISTRO:
+        for sufijo in ('ai', 'au', 'ad'):
+            cursor.execute(f'DROP TRIGGER IF EXISTS cdc_{tabla}_{sufijo}')
+    _crear_triggers_registro(cursor, pausable=True)
+
+
+# Pasos en orden: (versión, descripción, función). Cada paso debe ser
+# idempotente, porque una base anterior al versionado (user_version = 0)
+# puede tener ya parte del esquema. Nunca modificar un paso publicado:
+# agregar uno nuevo al final.
+MIGRACIONES = [
+    (1, 'esquema inicial', _migracion_esquema_inicial),
+    (2, 'índice de búsqueda FTS5 de productos', _migracion_busqueda),
+    (3, 'secuencias de facturación', _migracion_secuencias),
+    (4, 'índices recomendados', _migracion_indices_recomendados),
+    (5, 'cortes de stock del kardex', _migracion_cortes_stock),
+    (6, 'registro de archivos históricos', _migracion_archivos_historicos),
+    (7, 'resumen diario de ventas', _migracion_resumen_ventas),
+    (8, 'registro de cambios (CDC)', _migracion_registro_cambios),
+    (9, 'pausa del registro de cambios', _migracion_pausa_registro),
+]
+
+VERSION_ESQUEMA = MIGRACIONES[-1][0]
+
+
+def _aplicar_migraciones(conn: sqlite3.Connection, version_actual: int):
+    """Aplica en orden las migraciones pendientes, cada una en su transacción."""
+    for version, descripcion, migracion in MIGRACIONES:
+        if version <= version_actual:
+            continue
+        
+        inicio = time.perf_counter()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            # Otra instancia pudo migrar mientras esperábamos el bloqueo
+            if conn.execute('PRAGMA user_version').fetchone()[0] >= version:
+                conn.rollback()
+                continue
+            migracion(conn.cursor())
+            conn.execute(f'PRAGMA user_version = {int(version)}')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            print(f"❌ Error en la migración {version} ({descripcion})")
+            raise
+        print(f"🔧 Migración {version} ({descripcion}) aplicada en "
+              f"{(time.perf_counter() - inicio) * 1000:.1f} ms")
+
+
+def init_database():
+    """
+    Inicializa o actualiza el esquema de la base de datos.
     
-    conn.commit()
-    conn.close()
-    print("✅ Base de datos inicializada correctamente")
+    La versión del esquema se guarda en PRAGMA user_version: si ya está al
+    día, sólo se hace esa lectura.
+    """
+    inicio = time.perf_counter()
+    conn = get_connection()
+    try:
+        version = conn.execute('PRAGMA user_version').fetchone()[0]
+        if version >= VERSION_ESQUEMA:
+            print(f"✅ Base de datos al día (esquema v{version}, perfil '{_get_pool().perfil}', "
+                  f"{(time.perf_counter() - inicio) * 1000:.1f} ms)")
+            return
+        
+        _aplicar_migraciones(conn, version)
+        modo_diario = conn.execute('PRAGMA journal_mode').fetchone()[0]
+    finally:
+        conn.close()
+    _invalidar_configuracion()
+    print(f"✅ Base de datos inicializada correctamente (esquema v{VERSION_ESQUEMA}, "
+          f"perfil '{_get_pool().perfil}', journal_mode={modo_diario}, "
+          f"{(time.perf_counter() - inicio) * 1000:.1f} ms)")
 
 
 # ============== FUNCIONES DE CONFIGURACIÓN ==============
 
+# La fila de configuración se guarda en memoria. Las escrituras de este
+# proceso la invalidan con _invalidar_configuracion(); las de otros procesos
+# se detectan con PRAGMA data_version sobre una conexión propia que nunca
+# escribe (cambia cuando otra conexión confirma algo en la base). Esa
+# verificación se hace como mucho una vez cada _INTERVALO_VERSION_CONFIG
+# segundos: entre medias leer la configuración o la tasa no toca la base.
+_INTERVALO_VERSION_CONFIG = 2.0
+
+_config_lock = threading.Lock()
+_config_cache: Optional[dict] = None
+_config_version: Optional[int] = None
+_config_verificada = 0.0
+_config_conn: Optional[sqlite3.Connection] = None
+_config_ruta: Optional[str] = None
+
+
+def _conexion_version_config() -> sqlite3.Connection:
+    """Conexión de sólo lectura dedicada al caché (se reabre si cambió DB_PATH)."""
+    global _config_conn, _config_ruta
+    if _config_conn is None or _config_ruta != DB_PATH:
+        if _config_conn is not None:
+            _config_conn.close()
+        uri = f"file:{pathname2url(os.path.abspath(DB_PATH))}?mode=ro"
+        _config_conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        _config_conn.row_factory = sqlite3.Row
+        _config_ruta = DB_PATH
+    return _config_conn
+
+
+def _invalidar_configuracion():
+    """Descarta la configuración en memoria (llamar después de escribirla)."""
+    global _config_cache
+    with _config_lock:
+        _config_cache = None
+
+
+def _configuracion_en_cache() -> dict:
+    """Devuelve la fila en memoria, recargándola si fue invalidada o cambió la base."""
+    global _config_cache, _config_version, _config_verificada
+    with _config_lock:
+        ahora = time.monotonic()
+        if _config_cache is not None and ahora - _config_verificada < _INTERVALO_VERSION_CONFIG:
+            return _config_cache
+
+        conn = _conexion_version_config()
+        version = conn.execute('PRAGMA data_version').fetchone()[0]
+        if _config_cache is None or version != _config_version:
+            # La versión se lee antes que la fila: un cambio posterior se verá la próxima vez
+            row = conn.execute('SELECT * FROM configuracion WHERE id = 1').fetchone()
+            _config_cache = dict(row) if row else {}
+            _config_version = version
+        _config_verificada = ahora
+        return _config_cache
+
+
 def get_configuracion() -> dict:
-    """Obtiene la configuración actual del sistema."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute('SELECT * FROM configuracion WHERE id = 1')
-    row = cursor.fetchone()
-    conn.close()
-    
-    if row:
-        return dict(row)
-    return {}
+    """Obtiene la configuración actual del sistema (copia de la fila en memoria)."""
+    return dict(_configuracion_en_cache())
 
 
 def update_tasa_cambio(nueva_tasa: float) -> bool:
@@ -278,6 +1193,7 @@ def update_tasa_cambio(nueva_tasa: float) -> bool:
         
         conn.commit()
         conn.close()
+        _invalidar_configuracion()
         return True
     except Exception as e:
         print(f"Error actualizando tasa: {e}")
@@ -285,9 +1201,8 @@ def update_tasa_cambio(nueva_tasa: float) -> bool:
 
 
 def get_tasa_actual() -> float:
-    """Obtiene la tasa de cambio actual."""
-    config = get_configuracion()
-    return config.get('tasa_cambio', 1.0)
+    """Obtiene la tasa de cambio actual (desde la configuración en memoria)."""
+    return _configuracion_en_cache().get('tasa_cambio', 1.0)
 
 
 def get_historial_tasas(limite: int = 10) -> List[dict]:
@@ -303,6 +1218,47 @@ def get_historial_tasas(limite: int = 10) -> List[dict]:
     return [dict(row) for row in rows]
 
 
+# ============== NOTIFICACIÓN DE CAMBIOS DE PRODUCTOS ==============
+
+# Los índices y cachés en memoria se suscriben para actualizarse sin recargar
+# todo el catálogo. Las notificaciones se emiten desde el hilo que escribió.
+_suscriptores_productos = []
+
+
+def suscribir_cambios_productos(callback):
+    """
+    Registra callback(accion, producto_ids) para cambios en productos.
+
+    accion: 'creado', 'actualizado', 'eliminado' o 'stock'.
+    producto_ids es None cuando pudieron cambiar todos los productos.
+    """
+    if callback not in _suscriptores_productos:
+        _suscriptores_productos.append(callback)
+
+
+def desuscribir_cambios_productos(callback):
+    """Quita un callback registrado con suscribir_cambios_productos."""
+    if callback in _suscriptores_productos:
+        _suscriptores_productos.remove(callback)
+
+
+def _notificar_cambio_productos(accion: str, producto_ids: Optional[List[int]]):
+    """
+    Avisa a los suscriptores de un cambio en productos (uso interno).
+
+    Dentro de un lote el aviso se retiene hasta que terminar_lote confirme:
+    los suscriptores releen por get_connection() y verían datos sin confirmar.
+    """
+    if getattr(_lote_local, 'conexion', None) is not None:
+        _lote_local.notificaciones.append((accion, producto_ids))
+        return
+    for callback in list(_suscriptores_productos):
+        try:
+            callback(accion, producto_ids)
+        except Exception as e:
+            print(f"Error notificando cambio de productos: {e}")
+
+
 # ============== FUNCIONES DE PRODUCTOS ==============
 
 def crear_producto(codigo: str, nombre: str, precio_usd: float, 
@@ -322,6 +1278,7 @@ def crear_producto(codigo: str, nombre: str, precio_usd: float,
     producto_id = cursor.lastrowid
     conn.commit()
     conn.close()
+    _notificar_cambio_productos('creado', [producto_id])
     return producto_id
 
 
@@ -345,20 +1302,111 @@ def get_productos(activos_only: bool = True) -> List[dict]:
     return [dict(row) for row in rows]
 
 
-def buscar_productos(termino: str) -> List[dict]:
-    """Busca productos por código o nombre."""
+def _crear_indice_busqueda(cursor):
+    """
+    Crea la tabla FTS5 productos_fts y los triggers que la sincronizan (uso interno).
+
+    Es una tabla de contenido externo: sólo guarda el índice, el texto se lee
+    de productos. remove_diacritics 2 hace que "azucar" encuentre "Azúcar".
+    """
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'productos_fts'")
+    existia = cursor.fetchone() is not None
+
+    try:
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS productos_fts USING fts5(
+                codigo, nombre, marca,
+                content='productos', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2',
+                prefix='2 3'
+            )
+        ''')
+    except sqlite3.OperationalError as e:
+        # SQLite compilado sin FTS5: buscar_productos usa LIKE
+        print(f"⚠️ Búsqueda FTS5 no disponible: {e}")
+        return
+
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS productos_fts_ai AFTER INSERT ON productos BEGIN
+            INSERT INTO productos_fts(rowid, codigo, nombre, marca)
+            VALUES (new.id, new.codigo, new.nombre, new.marca);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS productos_fts_ad AFTER DELETE ON productos BEGIN
+            INSERT INTO productos_fts(productos_fts, rowid, codigo, nombre, marca)
+            VALUES ('delete', old.id, old.codigo, old.nombre, old.marca);
+        END
+    ''')
+    # Sólo reindexar si cambió el texto (no en cada movimiento de stock)
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS productos_fts_au AFTER UPDATE OF codigo, nombre, marca ON productos BEGIN
+            INSERT INTO productos_fts(productos_fts, rowid, codigo, nombre, marca)
+            VALUES ('delete', old.id, old.codigo, old.nombre, old.marca);
+            INSERT INTO productos_fts(rowid, codigo, nombre, marca)
+            VALUES (new.id, new.codigo, new.nombre, new.marca);
+        END
+    ''')
+
+    if not existia:
+        # Indexar los productos que ya existían antes de crear la tabla
+        cursor.execute("INSERT INTO productos_fts(productos_fts) VALUES ('rebuild')")
+        # bm25 ponderado: código > nombre > marca
+        cursor.execute("INSERT INTO productos_fts(productos_fts, rank) VALUES ('rank', 'bm25(10.0, 5.0, 1.0)')")
+
+
+def _consulta_fts(termino: str) -> Optional[str]:
+    """
+    Convierte el texto del usuario en una consulta FTS5 de prefijos (uso interno).
+
+    "azu refi" -> '"azu"* "refi"*' (todas las palabras, cada una como prefijo).
+    Retorna None si el término no tiene palabras indexables.
+    """
+    palabras = re.findall(r'\w+', termino)
+    if not palabras:
+        return None
+    return ' '.join(f'"{p}"*' for p in palabras)
+
+
+def buscar_productos(termino: str, limite: int = None) -> List[dict]:
+    """
+    Busca productos activos por código, nombre o marca.
+
+    Usa el índice FTS5 (prefijos, sin distinguir mayúsculas ni acentos,
+    ordenado por relevancia). Un código exacto siempre aparece primero.
+    """
+    consulta = _consulta_fts(termino)
     conn = get_connection()
     cursor = conn.cursor()
-    cursor.execute('''
-        SELECT p.*, c.nombre as categoria_nombre
-        FROM productos p
-        LEFT JOIN categorias c ON p.categoria_id = c.id
-        WHERE p.activo = 1 AND (p.codigo LIKE ? OR p.nombre LIKE ?)
-        ORDER BY p.nombre
-    ''', (f'%{termino}%', f'%{termino}%'))
-    rows = cursor.fetchall()
-    conn.close()
-    return [dict(row) for row in rows]
+    try:
+        if consulta is not None:
+            try:
+                cursor.execute('''
+                    SELECT p.*, c.nombre as categoria_nombre
+                    FROM productos_fts f
+                    JOIN productos p ON p.id = f.rowid
+                    LEFT JOIN categorias c ON p.categoria_id = c.id
+                    WHERE productos_fts MATCH ? AND p.activo = 1
+                    ORDER BY p.codigo = ? DESC, f.rank
+                    LIMIT ?
+                ''', (consulta, termino, limite if limite is not None else -1))
+                return [dict(row) for row in cursor.fetchall()]
+            except sqlite3.OperationalError as e:
+                if 'productos_fts' not in str(e):
+                    raise
+                # Sin índice FTS5: continuar con LIKE
+
+        cursor.execute('''
+            SELECT p.*, c.nombre as categoria_nombre
+            FROM productos p
+            LEFT JOIN categorias c ON p.categoria_id = c.id
+            WHERE p.activo = 1 AND (p.codigo LIKE ? OR p.nombre LIKE ?)
+            ORDER BY p.nombre
+            LIMIT ?
+        ''', (f'%{termino}%', f'%{termino}%', limite if limite is not None else -1))
+        return [dict(row) for row in cursor.fetchall()]
+    finally:
+        conn.close()
 
 
 def get_producto_por_codigo(codigo: str) -> Optional[dict]:
@@ -387,6 +1435,7 @@ def actualizar_stock(producto_id: int, cantidad: int, tipo: str,
         cursor.execute('SELECT stock_actual FROM productos WHERE id = ?', (producto_id,))
         row = cursor.fetchone()
         if not row:
+            conn.close()
             return False
         
         stock_anterior = row['stock_actual']
@@ -397,6 +1446,7 @@ def actualizar_stock(producto_id: int, cantidad: int, tipo: str,
         elif tipo in ['Salida', 'Ajuste-']:
             stock_nuevo = stock_anterior - cantidad
         else:
+            conn.close()
             return False
         
         # Actualizar stock del producto
@@ -413,6 +1463,7 @@ def actualizar_stock(producto_id: int, cantidad: int, tipo: str,
         
         conn.commit()
         conn.close()
+        _notificar_cambio_productos('stock', [producto_id])
         return True
     except Exception as e:
         print(f"Error actualizando stock: {e}")
@@ -472,8 +1523,13 @@ def actualizar_categoria(categoria_id: int, nombre: str, descripcion: str = None
         cursor.execute('''
             UPDATE categorias SET nombre = ?, descripcion = ? WHERE id = ?
         ''', (nombre, descripcion, categoria_id))
+        # Sus productos muestran categoria_nombre: avisar que cambiaron
+        producto_ids = [row[0] for row in cursor.execute(
+            'SELECT id FROM productos WHERE categoria_id = ?', (categoria_id,))]
         conn.commit()
         conn.close()
+        if producto_ids:
+            _notificar_cambio_productos('actualizado', producto_ids)
         return True
     except Exception as e:
         print(f"Error actualizando categoría: {e}")
@@ -516,41 +1572,28 @@ def actualizar_producto(producto_id: int, codigo: str = None, nombre: str = None
                         marca: str = None, unidad_medida: str = None,
                         costo_usd: float = None, porcentaje_ganancia: float = None,
                         stock_minimo: int = None) -> bool:
-    """Actualiza un producto existente."""
+    """Actualiza un producto existente (los campos en None conservan su valor)."""
     try:
         conn = get_connection()
         cursor = conn.cursor()
-        
-        # Obtener valores actuales
-        cursor.execute('SELECT * FROM productos WHERE id = ?', (producto_id,))
-        row = cursor.fetchone()
-        if not row:
-            return False
-        
-        producto_actual = dict(row)
-        
-        # Usar valores nuevos o mantener los actuales
-        nuevo_codigo = codigo if codigo is not None else producto_actual['codigo']
-        nuevo_nombre = nombre if nombre is not None else producto_actual['nombre']
-        nuevo_precio = precio_usd if precio_usd is not None else producto_actual['precio_usd']
-        nueva_categoria = categoria_id if categoria_id is not None else producto_actual['categoria_id']
-        nueva_marca = marca if marca is not None else producto_actual['marca']
-        nueva_unidad = unidad_medida if unidad_medida is not None else producto_actual['unidad_medida']
-        nuevo_costo = costo_usd if costo_usd is not None else producto_actual['costo_usd']
-        nuevo_porcentaje = porcentaje_ganancia if porcentaje_ganancia is not None else producto_actual.get('porcentaje_ganancia', 30)
-        nuevo_stock_min = stock_minimo if stock_minimo is not None else producto_actual['stock_minimo']
-        
         cursor.execute('''
             UPDATE productos SET
-                codigo = ?, nombre = ?, precio_usd = ?, categoria_id = ?,
-                marca = ?, unidad_medida = ?, costo_usd = ?, porcentaje_ganancia = ?, stock_minimo = ?
+                codigo = COALESCE(?, codigo), nombre = COALESCE(?, nombre),
+                precio_usd = COALESCE(?, precio_usd), categoria_id = COALESCE(?, categoria_id),
+                marca = COALESCE(?, marca), unidad_medida = COALESCE(?, unidad_medida),
+                costo_usd = COALESCE(?, costo_usd),
+                porcentaje_ganancia = COALESCE(?, porcentaje_ganancia, 30),
+                stock_minimo = COALESCE(?, stock_minimo)
             WHERE id = ?
-        ''', (nuevo_codigo, nuevo_nombre, nuevo_precio, nueva_categoria,
-              nueva_marca, nueva_unidad, nuevo_costo, nuevo_porcentaje, nuevo_stock_min, producto_id))
-        
+        ''', (codigo, nombre, precio_usd, categoria_id, marca, unidad_medida,
+              costo_usd, porcentaje_ganancia, stock_minimo, producto_id))
+        actualizado = cursor.rowcount > 0
+
         conn.commit()
         conn.close()
-        return True
+        if actualizado:
+            _notificar_cambio_productos('actualizado', [producto_id])
+        return actualizado
     except Exception as e:
         print(f"Error actualizando producto: {e}")
         return False
@@ -564,6 +1607,7 @@ def eliminar_producto(producto_id: int) -> bool:
         cursor.execute('UPDATE productos SET activo = 0 WHERE id = ?', (producto_id,))
         conn.commit()
         conn.close()
+        _notificar_cambio_productos('eliminado', [producto_id])
         return True
     except Exception as e:
         print(f"Error eliminando producto: {e}")
@@ -598,6 +1642,7 @@ def actualizar_configuracion(nombre_tienda: str = None, rif: str = None,
         cursor.execute('SELECT * FROM configuracion WHERE id = 1')
         row = cursor.fetchone()
         if not row:
+            conn.close()
             return False
         
         config_actual = dict(row)
@@ -616,12 +1661,181 @@ def actualizar_configuracion(nombre_tienda: str = None, rif: str = None,
         
         conn.commit()
         conn.close()
+        _invalidar_configuracion()
         return True
     except Exception as e:
         print(f"Error actualizando configuración: {e}")
         return False
 
 
+# ============== CARGA MASIVA DE PRODUCTOS ==============
+
+# Campos que aceptan las funciones *_productos_bulk. Los que faltan (o vienen
+# en None) conservan el valor actual del producto, o el default al crearlo.
+# stock_actual sólo se usa al crear: después cambia por movimientos de inventario.
+CAMPOS_PRODUCTO_BULK = ('codigo', 'nombre', 'precio_usd', 'categoria_id', 'marca',
+                        'unidad_medida', 'costo_usd', 'porcentaje_ganancia',
+                        'stock_actual', 'stock_minimo')
+
+_SAVEPOINT_BULK = 'bloque_productos'
+_SAVEPOINT_FILA = 'fila_producto'
+
+# El nombre va con COALESCE porque NOT NULL se verifica antes que el conflicto;
+# los productos nuevos sin nombre se rechazan antes de llegar aquí.
+_SQL_UPSERT_PRODUCTO = '''
+    INSERT INTO productos (codigo, nombre, precio_usd, categoria_id, marca, unidad_medida,
+                          costo_usd, porcentaje_ganancia, stock_actual, stock_minimo)
+    VALUES (:codigo, COALESCE(:nombre, ''), COALESCE(:precio_usd, 0), :categoria_id, :marca,
+            COALESCE(:unidad_medida, 'Unidad'), COALESCE(:costo_usd, 0),
+            COALESCE(:porcentaje_ganancia, 30), COALESCE(:stock_actual, 0),
+            COALESCE(:stock_minimo, 5))
+    ON CONFLICT(codigo) DO UPDATE SET
+        nombre = COALESCE(:nombre, nombre),
+        precio_usd = COALESCE(:precio_usd, precio_usd),
+        categoria_id = COALESCE(:categoria_id, categoria_id),
+        marca = COALESCE(:marca, marca),
+        unidad_medida = COALESCE(:unidad_medida, unidad_medida),
+        costo_usd = COALESCE(:costo_usd, costo_usd),
+        porcentaje_ganancia = COALESCE(:porcentaje_ganancia, porcentaje_ganancia),
+        stock_minimo = COALESCE(:stock_minimo, stock_minimo)
+'''
+
+
+def _ids_por_codigo(conn: sqlite3.Connection, codigos: List[str]) -> dict:
+    """Obtiene {codigo: id} de los productos existentes entre `codigos`."""
+    rows = conn.execute(
+        'SELECT codigo, id FROM productos WHERE codigo IN (SELECT value FROM json_each(?))',
+        (json.dumps(codigos),)
+    ).fetchall()
+    return {row['codigo']: row['id'] for row in rows}
+
+
+def _escribir_fila_por_fila(conn: sqlite3.Connection, registros: List[tuple]):
+    """Escribe un bloque que falló fila por fila, marcando con error sólo las culpables."""
+    for resultado, parametros in registros:
+        conn.execute(f'SAVEPOINT {_SAVEPOINT_FILA}')
+        try:
+            conn.execute(_SQL_UPSERT_PRODUCTO, parametros)
+        except sqlite3.Error as e:
+            conn.execute(f'ROLLBACK TO {_SAVEPOINT_FILA}')
+            resultado['resultado'] = 'error'
+            resultado['error'] = str(e)
+        conn.execute(f'RELEASE {_SAVEPOINT_FILA}')
+
+
+def _procesar_bloque_productos(bloque: List[tuple], modo: str) -> List[dict]:
+    """Clasifica, escribe y confirma un bloque de (fila, producto) (uso interno)."""
+    resultados = []
+    registros = []
+    for fila, producto in bloque:
+        parametros = {campo: producto.get(campo) for campo in CAMPOS_PRODUCTO_BULK}
+        codigo = str(parametros['codigo'] or '').strip()
+        resultado = {'fila': fila, 'codigo': codigo or None, 'id': None,
+                     'resultado': 'error', 'error': None}
+        resultados.append(resultado)
+        if not codigo:
+            resultado['error'] = 'El código es obligatorio'
+            continue
+        parametros['codigo'] = codigo
+        registros.append((resultado, parametros))
+
+    if not registros:
+        return resultados
+
+    conn = get_connection()
+    try:
+        conn.execute(f'SAVEPOINT {_SAVEPOINT_BULK}')
+        try:
+            # Una consulta por bloque decide qué filas crean y cuáles actualizan
+            existentes = _ids_por_codigo(conn, [p['codigo'] for _, p in registros])
+            vistos = set(existentes)
+            a_escribir = []
+            for resultado, parametros in registros:
+                if parametros['codigo'] in vistos:
+                    if modo == 'crear':
+                        resultado['resultado'] = 'existente'
+                        continue
+                    resultado['resultado'] = 'actualizado'
+                else:
+                    if modo == 'actualizar':
+                        resultado['resultado'] = 'no_encontrado'
+                        continue
+                    if not parametros['nombre']:
+                        resultado['error'] = 'El nombre es obligatorio para crear el producto'
+                        continue
+                    resultado['resultado'] = 'creado'
+                    vistos.add(parametros['codigo'])
+                a_escribir.append((resultado, parametros))
+
+            try:
+                conn.executemany(_SQL_UPSERT_PRODUCTO, [p for _, p in a_escribir])
+            except sqlite3.Error:
+                conn.execute(f'ROLLBACK TO {_SAVEPOINT_BULK}')
+                _escribir_fila_por_fila(conn, a_escribir)
+
+            ids = _ids_por_codigo(conn, [p['codigo'] for _, p in registros])
+            for resultado, parametros in registros:
+                if resultado['resultado'] in ('creado', 'actualizado', 'existente'):
+                    resultado['id'] = ids.get(parametros['codigo'])
+        except Exception:
+            conn.execute(f'ROLLBACK TO {_SAVEPOINT_BULK}')
+            conn.execute(f'RELEASE {_SAVEPOINT_BULK}')
+            raise
+        conn.execute(f'RELEASE {_SAVEPOINT_BULK}')
+        conn.commit()
+    finally:
+        conn.close()
+
+    for accion in ('creado', 'actualizado'):
+        producto_ids = [r['id'] for r in resultados if r['resultado'] == accion]
+        if producto_ids:
+            _notificar_cambio_productos(accion, producto_ids)
+    return resultados
+
+
+def upsert_productos_bulk(productos: Iterable[dict], modo: str = 'upsert',
+                          tamano_bloque: Optional[int] = 1000) -> List[dict]:
+    """
+    Crea y/o actualiza muchos productos identificados por su código.
+
+    modo: 'upsert' (crea o actualiza), 'crear' (deja los existentes como
+    están) o 'actualizar' (no crea). Los productos se leen a medida que se
+    procesan y se escriben con executemany en bloques de `tamano_bloque`,
+    cada uno en su propia transacción (None: todo en una sola). Si un bloque
+    falla se reintenta fila por fila, así sólo las filas culpables quedan
+    con error.
+
+    Retorna un dict por producto, en el orden recibido:
+    {'fila', 'codigo', 'id', 'resultado', 'error'}, donde resultado es
+    'creado', 'actualizado', 'existente', 'no_encontrado' o 'error'.
+    """
+    if modo not in ('upsert', 'crear', 'actualizar'):
+        raise ValueError(f"Modo de carga inválido: {modo}")
+
+    resultados = []
+    bloque = []
+    for fila, producto in enumerate(productos):
+        bloque.append((fila, producto))
+        if tamano_bloque and len(bloque) >= tamano_bloque:
+            resultados += _procesar_bloque_productos(bloque, modo)
+            bloque = []
+    if bloque:
+        resultados += _procesar_bloque_productos(bloque, modo)
+    return resultados
+
+
+def crear_productos_bulk(productos: Iterable[dict],
+                         tamano_bloque: Optional[int] = 1000) -> List[dict]:
+    """Crea muchos productos; los códigos ya registrados quedan como 'existente'."""
+    return upsert_productos_bulk(productos, 'crear', tamano_bloque)
+
+
+def actualizar_productos_bulk(productos: Iterable[dict],
+                              tamano_bloque: Optional[int] = 1000) -> List[dict]:
+    """Actualiza muchos productos por código; los que no existen quedan como 'no_encontrado'."""
+    return upsert_productos_bulk(productos, 'actualizar', tamano_bloque)
+
+
 # ============== FUNCIONES DE CLIENTES ==============
 
 def get_clientes(activos_only: bool = True) -> List[dict]:
@@ -651,17 +1865,152 @@ def get_cliente_por_id(cliente_id: int) -> Optional[dict]:
 
 # ============== FUNCIONES DE VENTAS ==============
 
+def _get_serie_factura(fecha: datetime = None) -> Tuple[str, str, str]:
+    """
+    Obtiene la serie de facturación según config.json (uso interno).
+
+    Retorna: (serie, base, dia). La serie es la clave en la tabla secuencias;
+    los números tienen la forma '{base}-{dia}-{numero:05d}'.
+    """
+    config = get_config_facturacion()
+    dia = (fecha or datetime.now()).strftime('%Y%m%d')
+    terminal = (config.get('terminal') or '').strip().upper()
+    base = f'FAC-{terminal}' if terminal else 'FAC'
+
+    if config.get('serie') == 'diaria':
+        return f'{base}-{dia}', base, dia
+    return base, base, dia
+
+
+def _patron_factura(base: str, dia: str = None) -> str:
+    """Patrón GLOB de los números de una base (y día) dados (uso interno)."""
+    return f"{base}-{dia or '[0-9]' * 8}-[0-9]*"
+
+
+def _periodo_factura(dia: str = None) -> Tuple[Optional[date], Optional[date]]:
+    """Período (desde, hasta) de ventas que puede tener números de un día dado (uso interno)."""
+    if not dia:
+        return None, None
+    fecha = datetime.strptime(dia, '%Y%m%d').date()
+    return fecha, fecha
+
+
+def _max_numero_emitido(cursor, base: str, dia: str = None) -> int:
+    """
+    Obtiene el mayor número ya emitido con una base (y día) dados (uso interno).
+
+    Incluye los años archivados: sus números siguen emitidos aunque ya no
+    estén en la base viva.
+    """
+    sql = '''
+        SELECT COALESCE(MAX(CAST(substr(numero_factura, ?) AS INTEGER)), 0)
+        FROM ventas WHERE numero_factura GLOB ?
+    '''
+    parametros = (len(base) + 11, _patron_factura(base, dia))
+    cursor.execute(sql, parametros)
+    maximo = cursor.fetchone()[0]
+
+    # La conexión de escritura no ve los archivos: se leen aparte
+    anios = _anios_archivados(*_periodo_factura(dia))
+    if anios:
+        conn = _abrir_conexion_historica(anios)
+        try:
+            maximo = max(maximo, conn.execute(sql, parametros).fetchone()[0])
+        finally:
+            conn.close()
+    return maximo
+
+
+def _siguiente_numero_serie(cursor, serie: str, base: str, dia: str = None) -> int:
+    """
+    Incrementa atómicamente la secuencia de una serie y retorna el nuevo número.
+
+    Debe llamarse dentro de la transacción que inserta la venta: el UPDATE
+    toma el bloqueo de escritura, así dos cajas nunca obtienen el mismo número
+    y si la venta se revierte el número no se consume.
+    """
+    cursor.execute(
+        'UPDATE secuencias SET ultimo = ultimo + 1 WHERE serie = ? RETURNING ultimo',
+        (serie,)
+    )
+    rows = cursor.fetchall()
+    if rows:
+        return rows[0][0]
+
+    # Primera factura de la serie: continuar desde el mayor número ya emitido
+    siguiente = _max_numero_emitido(cursor, base, dia) + 1
+    cursor.execute('INSERT INTO secuencias (serie, ultimo) VALUES (?, ?)', (serie, siguiente))
+    return siguiente
+
+
 def generar_numero_factura() -> str:
-    """Genera un número de factura único."""
+    """Obtiene el próximo número de factura (sin consumirlo)."""
+    serie, base, dia = _get_serie_factura()
+
     conn = get_connection()
     cursor = conn.cursor()
-    cursor.execute('SELECT COUNT(*) + 1 as num FROM ventas')
+    cursor.execute('SELECT ultimo FROM secuencias WHERE serie = ?', (serie,))
     row = cursor.fetchone()
+    if row:
+        numero = row['ultimo'] + 1
+    else:
+        numero = _max_numero_emitido(cursor, base, dia if serie != base else None) + 1
     conn.close()
-    
-    numero = row['num'] if row else 1
-    fecha = datetime.now().strftime('%Y%m%d')
-    return f'FAC-{fecha}-{numero:05d}'
+
+    return f'{base}-{dia}-{numero:05d}'
+
+
+def detectar_huecos_factura(serie: str = None) -> dict:
+    """
+    Detecta números asignados por una serie que no existen en ventas.
+
+    Retorna: {'serie', 'ultimo', 'emitidas', 'huecos': [(desde, hasta), ...]}
+    """
+    serie_actual, base, dia = _get_serie_factura()
+    serie = serie or serie_actual
+
+    # Deducir base y día de la clave ('FAC', 'FAC-T01', 'FAC-T01-20260118'...)
+    partes = serie.rsplit('-', 1)
+    if len(partes) == 2 and len(partes[1]) == 8 and partes[1].isdigit():
+        base, dia = partes
+    else:
+        base, dia = serie, None
+
+    # Los números de los años archivados también cuentan como emitidos
+    desde, hasta = _periodo_factura(dia)
+    conn = get_connection_lectura(instantanea=True, historico=True, desde=desde, hasta=hasta)
+    try:
+        cursor = conn.cursor()
+        cursor.execute('SELECT ultimo FROM secuencias WHERE serie = ?', (serie,))
+        row = cursor.fetchone()
+        ultimo = row['ultimo'] if row else 0
+
+        cursor.execute('''
+            SELECT CAST(substr(numero_factura, ?) AS INTEGER) AS numero
+            FROM ventas WHERE numero_factura GLOB ?
+        ''', (len(base) + 11, _patron_factura(base, dia)))
+        emitidos = {r['numero'] for r in cursor.fetchall()}
+    finally:
+        conn.close()
+
+    huecos = []
+    inicio = None
+    for numero in range(1, ultimo + 1):
+        if numero not in emitidos:
+            if inicio is None:
+                inicio = numero
+        elif inicio is not None:
+            huecos.append((inicio, numero - 1))
+            inicio = None
+    if inicio is not None:
+        huecos.append((inicio, ultimo))
+
+    return {
+        'serie': serie,
+        'ultimo': ultimo,
+        'emitidas': len(emitidos),
+        'huecos': huecos
+    }
 
 
 def crear_venta(subtotal_usd: float, iva_usd: float, total_usd: float,
@@ -674,7 +2023,9 @@ def crear_venta(subtotal_usd: float, iva_usd: float, total_usd: float,
     cursor = conn.cursor()
     
     try:
-        numero_factura = f'FAC-{datetime.now().strftime("%Y%m%d")}-{_get_next_factura_num(cursor):05d}'
+        serie, base, dia = _get_serie_factura()
+        numero = _siguiente_numero_serie(cursor, serie, base, dia if serie != base else None)
+        numero_factura = f'{base}-{dia}-{numero:05d}'
         
         # Insertar venta
         cursor.execute('''
@@ -687,104 +2038,86 @@ def crear_venta(subtotal_usd: float, iva_usd: float, total_usd: float,
         
         venta_id = cursor.lastrowid
         
-        # Insertar detalles y actualizar stock en la misma transacción
+        # Insertar todos los detalles con una sola sentencia preparada
+        cursor.executemany('''
+            INSERT INTO detalle_ventas (venta_id, producto_id, nombre_producto,
+                                        cantidad, precio_unit_usd, descuento, total_linea_usd)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', [(venta_id, detalle['producto_id'], detalle['nombre_producto'],
+               detalle['cantidad'], detalle['precio_unit_usd'],
+               detalle.get('descuento', 0), detalle['total_linea_usd'])
+              for detalle in detalles])
+        
+        # Cantidad total por producto (un producto puede venir en varias líneas)
+        cantidades = {}
         for detalle in detalles:
-            cursor.execute('''
-                INSERT INTO detalle_ventas (venta_id, producto_id, nombre_producto,
-                                            cantidad, precio_unit_usd, descuento, total_linea_usd)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (venta_id, detalle['producto_id'], detalle['nombre_producto'],
-                  detalle['cantidad'], detalle['precio_unit_usd'], 
-                  detalle.get('descuento', 0), detalle['total_linea_usd']))
-            
-            # Actualizar stock directamente en la misma transacción
-            cursor.execute('''
-                UPDATE productos SET stock_actual = stock_actual - ? WHERE id = ?
-            ''', (detalle['cantidad'], detalle['producto_id']))
-            
-            # Obtener stock anterior para el movimiento
-            cursor.execute('SELECT stock_actual FROM productos WHERE id = ?', (detalle['producto_id'],))
-            stock_nuevo = cursor.fetchone()['stock_actual']
-            stock_anterior = stock_nuevo + detalle['cantidad']
-            
-            # Registrar movimiento
-            cursor.execute('''
-                INSERT INTO movimientos_inventario 
-                (producto_id, tipo, cantidad, stock_anterior, stock_nuevo, referencia, observacion)
-                VALUES (?, 'Salida', ?, ?, ?, ?, 'Venta')
-            ''', (detalle['producto_id'], detalle['cantidad'], stock_anterior, stock_nuevo, numero_factura))
+            cantidades[detalle['producto_id']] = cantidades.get(detalle['producto_id'], 0) + detalle['cantidad']
+        
+        # Descontar el stock de todos los productos en una sola sentencia;
+        # RETURNING entrega el stock final sin volver a consultarlo
+        cursor.execute('''
+            UPDATE productos SET stock_actual = stock_actual - v.cantidad
+            FROM (
+                SELECT json_extract(value, '$[0]') AS producto_id,
+                       json_extract(value, '$[1]') AS cantidad
+                FROM json_each(?)
+            ) AS v
+            WHERE productos.id = v.producto_id
+            RETURNING id, stock_actual
+        ''', (json.dumps(list(cantidades.items())),))
+        stock_final = {row['id']: row['stock_actual'] for row in cursor.fetchall()}
+        
+        faltantes = set(cantidades) - set(stock_final)
+        if faltantes:
+            raise ValueError(f"Productos no encontrados: {sorted(faltantes)}")
+        
+        # Reconstruir stock anterior/nuevo de cada línea a partir del stock final
+        stock_corriente = {pid: stock_final[pid] + cant for pid, cant in cantidades.items()}
+        movimientos = []
+        for detalle in detalles:
+            stock_anterior = stock_corriente[detalle['producto_id']]
+            stock_nuevo = stock_anterior - detalle['cantidad']
+            stock_corriente[detalle['producto_id']] = stock_nuevo
+            movimientos.append((detalle['producto_id'], detalle['cantidad'],
+                                stock_anterior, stock_nuevo, numero_factura))
+        
+        # Registrar todos los movimientos con una sola sentencia preparada
+        cursor.executemany('''
+            INSERT INTO movimientos_inventario 
+            (producto_id, tipo, cantidad, stock_anterior, stock_nuevo, referencia, observacion)
+            VALUES (?, 'Salida', ?, ?, ?, ?, 'Venta')
+        ''', movimientos)
         
         conn.commit()
-        return venta_id
     except Exception as e:
         conn.rollback()
         raise e
     finally:
         conn.close()
-
-
-def _get_next_factura_num(cursor) -> int:
-    """Obtiene el siguiente número de factura (uso interno)."""
-    cursor.execute('SELECT COUNT(*) + 1 as num FROM ventas')
-    row = cursor.fetchone()
-    return row['num'] if row else 1
+    
+    _notificar_cambio_productos('stock', list(cantidades))
+    return venta_id
 
 
 def get_ventas_del_dia() -> dict:
-    """Obtiene resumen de ventas del día."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    # Usar fecha de hoy en formato local
-    from datetime import datetime, timedelta
+    """Obtiene resumen de ventas del día (desde ventas_resumen_diario)."""
     hoy = datetime.now().date()
-    fecha_ini = f"{hoy.isoformat()} 00:00:00"
-    # Agregar 1 día para capturar ventas con hora UTC
-    manana = hoy + timedelta(days=1)
-    fecha_fin = f"{manana.isoformat()} 23:59:59"
-    
-    cursor.execute('''
-        SELECT COUNT(*) as cantidad, 
-               COALESCE(SUM(total_usd), 0) as total_usd,
-               COALESCE(SUM(total_bs), 0) as total_bs
-        FROM ventas 
-        WHERE fecha BETWEEN ? AND ?
-    ''', (fecha_ini, fecha_fin))
-    row = cursor.fetchone()
-    conn.close()
-    
-    return dict(row) if row else {'cantidad': 0, 'total_usd': 0, 'total_bs': 0}
+    # Incluir el día siguiente para capturar ventas con hora UTC
+    resumen = get_resumen_ventas(hoy, hoy + timedelta(days=1))
+    return {k: resumen[k] for k in ('cantidad', 'total_usd', 'total_bs')}
 
 
 def get_ventas_del_mes() -> dict:
-    """Obtiene resumen de ventas del mes actual."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    from datetime import datetime, timedelta
+    """Obtiene resumen de ventas del mes actual (desde ventas_resumen_diario)."""
     hoy = datetime.now().date()
-    primer_dia_mes = hoy.replace(day=1)
-    fecha_ini = f"{primer_dia_mes.isoformat()} 00:00:00"
-    # Agregar 1 día para capturar ventas con hora UTC
-    manana = hoy + timedelta(days=1)
-    fecha_fin = f"{manana.isoformat()} 23:59:59"
-    
-    cursor.execute('''
-        SELECT COUNT(*) as cantidad, 
-               COALESCE(SUM(total_usd), 0) as total_usd,
-               COALESCE(SUM(total_bs), 0) as total_bs
-        FROM ventas 
-        WHERE fecha BETWEEN ? AND ?
-    ''', (fecha_ini, fecha_fin))
-    row = cursor.fetchone()
-    conn.close()
-    
-    return dict(row) if row else {'cantidad': 0, 'total_usd': 0, 'total_bs': 0}
+    # Incluir el día siguiente para capturar ventas con hora UTC
+    resumen = get_resumen_ventas(hoy.replace(day=1), hoy + timedelta(days=1))
+    return {k: resumen[k] for k in ('cantidad', 'total_usd', 'total_bs')}
 
 
 def get_productos_bajo_stock() -> List[dict]:
-    """Obtiene productos con stock bajo."""
-    conn = get_connection()
+    """Obtiene productos con stock bajo (conexión de sólo lectura)."""
+    conn = get_connection_lectura()
     cursor = conn.cursor()
     cursor.execute('''
         SELECT * FROM productos 
@@ -796,6 +2129,347 @@ def get_productos_bajo_stock() -> List[dict]:
     return [dict(row) for row in rows]
 
 
+# ============== RESUMEN DIARIO DE VENTAS ==============
+
+# ventas_resumen_diario (y su desglose por forma de pago) se mantiene con
+# triggers en la misma transacción que la venta: las tarjetas del dashboard
+# y de reportes suman días en lugar de recorrer ventas y detalle_ventas.
+# El día es date(fecha) tal como se guarda la venta. Al archivar un año sus
+# días se conservan, así que el resumen cubre también el historial archivado.
+
+_SQL_RESUMEN_DIARIO = '''
+    SELECT date(v.fecha) AS dia, COUNT(*), COALESCE(SUM(v.total_usd), 0),
+           COALESCE(SUM(v.total_bs), 0), COALESCE(SUM(u.unidades), 0)
+    FROM ventas v
+    LEFT JOIN (
+        SELECT venta_id, SUM(cantidad) AS unidades FROM detalle_ventas GROUP BY venta_id
+    ) u ON u.venta_id = v.id
+    GROUP BY dia
+'''
+
+_SQL_RESUMEN_PAGO = '''
+    SELECT date(fecha) AS dia, COALESCE(forma_pago, ''), COUNT(*),
+           COALESCE(SUM(total_usd), 0), COALESCE(SUM(total_bs), 0)
+    FROM ventas
+    GROUP BY dia, COALESCE(forma_pago, '')
+'''
+
+
+def _crear_triggers_resumen(cursor):
+    """Triggers que suman/restan cada venta y cada línea en el resumen diario."""
+    # Una venta entra (+1) o sale (-1) del resumen de su día
+    def aplicar(fila: str, signo: str) -> str:
+        return f'''
+            INSERT INTO ventas_resumen_diario (dia, cantidad, total_usd, total_bs, unidades)
+            VALUES (date({fila}.fecha), {signo}1, {signo}COALESCE({fila}.total_usd, 0),
+                    {signo}COALESCE({fila}.total_bs, 0), 0)
+            ON CONFLICT(dia) DO UPDATE SET
+                cantidad = cantidad + excluded.cantidad,
+                total_usd = total_usd + excluded.total_usd,
+                total_bs = total_bs + excluded.total_bs;
+            INSERT INTO ventas_resumen_pago (dia, forma_pago, cantidad, total_usd, total_bs)
+            VALUES (date({fila}.fecha), COALESCE({fila}.forma_pago, ''), {signo}1,
+                    {signo}COALESCE({fila}.total_usd, 0), {signo}COALESCE({fila}.total_bs, 0))
+            ON CONFLICT(dia, forma_pago) DO UPDATE SET
+                cantidad = cantidad + excluded.cantidad,
+                total_usd = total_usd + excluded.total_usd,
+                total_bs = total_bs + excluded.total_bs;
+        '''
+
+    # Unidades de una línea en el día de su venta
+    def unidades(fila: str, signo: str) -> str:
+        return f'''
+            UPDATE ventas_resumen_diario SET unidades = unidades {signo} COALESCE({fila}.cantidad, 0)
+            WHERE dia = (SELECT date(fecha) FROM ventas WHERE id = {fila}.venta_id);
+        '''
+
+    # Al cambiar la fecha de una venta, sus unidades cambian de día
+    unidades_venta = '''
+        UPDATE ventas_resumen_diario SET unidades = unidades {signo}
+            (SELECT COALESCE(SUM(cantidad), 0) FROM detalle_ventas WHERE venta_id = {fila}.id)
+        WHERE dia = date({fila}.fecha);
+    '''
+
+    triggers = {
+        'resumen_ventas_ai': f"AFTER INSERT ON ventas BEGIN {aplicar('NEW', '+')} END",
+        'resumen_ventas_ad': f"AFTER DELETE ON ventas BEGIN {aplicar('OLD', '-')} END",
+        'resumen_ventas_au': (
+            "AFTER UPDATE OF fecha, total_usd, total_bs, forma_pago ON ventas BEGIN "
+            f"{aplicar('OLD', '-')} {unidades_venta.format(fila='OLD', signo='-')} "
+            f"{aplicar('NEW', '+')} {unidades_venta.format(fila='NEW', signo='+')} END"
+        ),
+        'resumen_detalle_ai': f"AFTER INSERT ON detalle_ventas BEGIN {unidades('NEW', '+')} END",
+        'resumen_detalle_ad': f"AFTER DELETE ON detalle_ventas BEGIN {unidades('OLD', '-')} END",
+        'resumen_detalle_au': (
+            "AFTER UPDATE OF cantidad, venta_id ON detalle_ventas BEGIN "
+            f"{unidades('OLD', '-')} {unidades('NEW', '+')} END"
+        ),
+    }
+    for nombre, cuerpo in triggers.items():
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {nombre} {cuerpo}")
+
+
+def get_resumen_ventas(desde, hasta) -> dict:
+    """
+    Obtiene los totales de ventas entre dos días (inclusive) desde el resumen.
+
+    Retorna cantidad, total_usd, total_bs, unidades y por_forma_pago
+    ({forma_pago: {'cantidad', 'total_usd', 'total_bs'}}).
+    """
+    dias = (_como_fecha(desde).isoformat(), _como_fecha(hasta).isoformat())
+    conn = get_connection_lectura(instantanea=True)
+    try:
+        row = conn.execute('''
+            SELECT COALESCE(SUM(cantidad), 0) as cantidad,
+                   COALESCE(SUM(total_usd), 0) as total_usd,
+                   COALESCE(SUM(total_bs), 0) as total_bs,
+                   COALESCE(SUM(unidades), 0) as unidades
+            FROM ventas_resumen_diario
+            WHERE dia BETWEEN ? AND ?
+        ''', dias).fetchone()
+        pagos = conn.execute('''
+            SELECT forma_pago, SUM(cantidad) as cantidad, SUM(total_usd) as total_usd,
+                   SUM(total_bs) as total_bs
+            FROM ventas_resumen_pago
+            WHERE dia BETWEEN ? AND ?
+            GROUP BY forma_pago
+            HAVING SUM(cantidad) > 0
+        ''', dias).fetchall()
+    finally:
+        conn.close()
+    resumen = dict(row)
+    resumen['por_forma_pago'] = {
+        p['forma_pago']: {'cantidad': p['cantidad'], 'total_usd': p['total_usd'], 'total_bs': p['total_bs']}
+        for p in pagos
+    }
+    return resumen
+
+
+def _calcular_resumen_ventas() -> Tuple[list, list]:
+    """Recalcula el resumen desde las ventas (incluidos los años archivados)."""
+    conn = get_connection_lectura(instantanea=True, historico=True)
+    try:
+        diario = [tuple(row) for row in conn.execute(_SQL_RESUMEN_DIARIO).fetchall()]
+        pago = [tuple(row) for row in conn.execute(_SQL_RESUMEN_PAGO).fetchall()]
+    finally:
+        conn.close()
+    return diario, pago
+
+
+def verificar_resumen_ventas(tolerancia: float = 0.005) -> List[dict]:
+    """
+    Compara el resumen guardado con el recalculado desde las ventas.
+
+    Retorna una lista con los días que no coinciden (vacía si todo cuadra):
+    {'dia', 'guardado', 'calculado'} con (cantidad, total_usd, total_bs, unidades).
+    """
+    diario, _ = _calcular_resumen_ventas()
+    calculado = {fila[0]: tuple(fila[1:]) for fila in diario}
+
+    conn = get_connection_lectura()
+    try:
+        guardado = {
+            row['dia']: (row['cantidad'], row['total_usd'], row['total_bs'], row['unidades'])
+            for row in conn.execute('SELECT * FROM ventas_resumen_diario WHERE cantidad != 0')
+        }
+    finally:
+        conn.close()
+
+    diferencias = []
+    for dia in sorted(set(calculado) | set(guardado)):
+        a = guardado.get(dia, (0, 0, 0, 0))
+        b = calculado.get(dia, (0, 0, 0, 0))
+        if any(abs((x or 0) - (y or 0)) > tolerancia for x, y in zip(a, b)):
+            diferencias.append({'dia': dia, 'guardado': a, 'calculado': b})
+    return diferencias
+
+
+def reconstruir_resumen_ventas() -> int:
+    """
+    Reemplaza el resumen por uno recalculado desde las ventas.
+
+    Debe correr en el hilo escritor (utils/db_writer) para que ninguna venta
+    quede entre el cálculo y la escritura. Retorna los días escritos.
+    """
+    diario, pago = _calcular_resumen_ventas()
+    conn = get_connection()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        conn.execute('DELETE FROM ventas_resumen_diario')
+        conn.execute('DELETE FROM ventas_resumen_pago')
+        conn.executemany('INSERT INTO ventas_resumen_diario VALUES (?, ?, ?, ?, ?)', diario)
+        conn.executemany('INSERT INTO ventas_resumen_pago VALUES (?, ?, ?, ?, ?)', pago)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    return len(diario)
+
+
+# ============== REGISTRO DE CAMBIOS (CDC) ==============
+
+# Cada INSERT, UPDATE o DELETE en estas tablas agrega (seq, tabla, fila, op)
+# a registro_cambios, en la misma transacción que el cambio. Como SQLite
+# tiene un solo escritor, el orden de seq es el orden de los commits: un
+# consumidor guarda el último seq que procesó y pide sólo lo posterior.
+TABLAS_CON_REGISTRO = ('productos', 'categorias', 'clientes', 'ventas', 'configuracion')
+
+RETENCION_CAMBIOS_POR_DEFECTO = 100000
+
+
+def _crear_triggers_registro(cursor, pausable: bool = False):
+    """
+    Triggers que anotan cada cambio de TABLAS_CON_REGISTRO en registro_cambios.
+
+    Con pausable=True (esquema 9 en adelante) no anotan nada mientras
+    registro_cambios_estado.pausado valga 1.
+    """
+    condicion = ("WHEN (SELECT pausado FROM registro_cambios_estado WHERE id = 1) = 0"
+                 if pausable else "")
+    for tabla in TABLAS_CON_REGISTRO:
+        for sufijo, evento, fila, op in (('ai', 'INSERT', 'NEW', 'I'),
+                                         ('au', 'UPDATE', 'NEW', 'U'),
+                                         ('ad', 'DELETE', 'OLD', 'D')):
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS cdc_{tabla}_{sufijo} AFTER {evento} ON {tabla}
+                {condicion}
+                BEGIN
+                    INSERT INTO registro_cambios (tabla, fila, op)
+                    VALUES ('{tabla}', {fila}.rowid, '{op}');
+                END
+            ''')
+
+
+def pausar_registro_cambios(conn: sqlite3.Connection, pausado: bool = True):
+    """
+    Suspende (o reanuda) el registro de cambios en la transacción de `conn`.
+
+    Sólo para operaciones de mantenimiento que no cambian datos vivos, como
+    el archivado de un año: hay que reanudarlo antes del commit, así que
+    ninguna otra conexión llega a ver el registro pausado.
+    """
+    conn.execute("UPDATE registro_cambios_estado SET pausado = ? WHERE id = 1",
+                 (1 if pausado else 0,))
+
+
+def _seq_asignado(conn: sqlite3.Connection) -> int:
+    """Último seq entregado por AUTOINCREMENT (aunque el registro esté compactado)."""
+    row = conn.execute(
+        "SELECT seq FROM sqlite_sequence WHERE name = 'registro_cambios'"
+    ).fetchone()
+    return row[0] if row else 0
+
+
+def get_seq_cambios(conn: sqlite3.Connection = None) -> int:
+    """
+    Obtiene el último seq del registro (punto de partida tras una carga completa).
+
+    Con `conn` en una transacción de lectura, es el seq de la foto que ven
+    sus consultas.
+    """
+    if conn is not None:
+        return _seq_asignado(conn)
+    conn = get_connection_lectura()
+    try:
+        return _seq_asignado(conn)
+    finally:
+        conn.close()
+
+
+def get_cambios_desde(seq: int, tablas: Iterable[str] = None, limite: int = 1000) -> dict:
+    """
+    Obtiene los cambios posteriores a `seq`, en orden.
+
+    Retorna {'cambios': [{'seq', 'tabla', 'fila', 'op'}], 'seq': cursor
+    para la próxima llamada, 'hay_mas': quedaron cambios sin entregar,
+    'completo': False si `seq` es anterior a lo que conserva el registro}.
+    Con completo=False el consumidor debe releer sus tablas enteras y
+    seguir desde el 'seq' retornado.
+
+    op es 'I', 'U' o 'D', pero la compactación sólo conserva el último
+    cambio de cada fila: 'D' significa que la fila ya no existe y
+    cualquier otro valor que hay que volver a leerla.
+
+    Archivar un año (utils/archiver.py) no anota nada: sus ventas salen de
+    la base viva pero siguen existiendo en el archivo histórico.
+    """
+    conn = get_connection_lectura(instantanea=True)
+    try:
+        corte = conn.execute("SELECT corte FROM registro_cambios_estado WHERE id = 1").fetchone()
+        ultimo = _seq_asignado(conn)
+        if seq < (corte[0] if corte else 0):
+            return {'cambios': [], 'seq': ultimo, 'hay_mas': False, 'completo': False}
+
+        query = "SELECT seq, tabla, fila, op FROM registro_cambios WHERE seq > ?"
+        parametros = [seq]
+        if tablas is not None:
+            query += " AND tabla IN (SELECT value FROM json_each(?))"
+            parametros.append(json.dumps(list(tablas)))
+        query += " ORDER BY seq LIMIT ?"
+        parametros.append(limite + 1)
+        rows = conn.execute(query, parametros).fetchall()
+    finally:
+        conn.close()
+
+    hay_mas = len(rows) > limite
+    cambios = [dict(row) for row in rows[:limite]]
+    # Sin más pendientes el cursor salta al final aunque el filtro descartara filas
+    nuevo_seq = cambios[-1]['seq'] if hay_mas else max(seq, ultimo)
+    return {'cambios': cambios, 'seq': nuevo_seq, 'hay_mas': hay_mas, 'completo': True}
+
+
+def compactar_registro_cambios(conservar: int = None) -> dict:
+    """
+    Aplica la política de retención del registro de cambios.
+
+    1. Borra los cambios superados por otro posterior de la misma fila
+       (nunca rompe un cursor: el cambio más nuevo sigue ahí).
+    2. Si aún quedan más de `conservar` cambios (config base_datos.
+       retencion_cambios), descarta los más viejos y sube el corte: los
+       cursores anteriores recibirán completo=False.
+
+    Debe correr en el hilo escritor (utils/db_writer).
+    """
+    if conservar is None:
+        conservar = get_config_bd().get('retencion_cambios', RETENCION_CAMBIOS_POR_DEFECTO)
+    conservar = max(0, int(conservar))
+
+    conn = get_connection()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            superados = conn.execute('''
+                DELETE FROM registro_cambios WHERE seq NOT IN (
+                    SELECT MAX(seq) FROM registro_cambios GROUP BY tabla, fila
+                )
+            ''').rowcount
+            corte = conn.execute(
+                "SELECT seq FROM registro_cambios ORDER BY seq DESC LIMIT 1 OFFSET ?",
+                (conservar,)
+            ).fetchone()
+            descartados = 0
+            if corte is not None:
+                descartados = conn.execute(
+                    "DELETE FROM registro_cambios WHERE seq <= ?", (corte[0],)
+                ).rowcount
+                conn.execute(
+                    "UPDATE registro_cambios_estado SET corte = MAX(corte, ?) WHERE id = 1",
+                    (corte[0],)
+                )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    finally:
+        conn.close()
+
+    if superados or descartados:
+        print(f"🧹 Registro de cambios compactado: {superados} superados, {descartados} descartados")
+    return {'superados': superados, 'descartados': descartados}
+
+
 # ============== FUNCIONES DE MOVIMIENTOS ==============
 
 def get_movimientos_producto(producto_id: int, limite: int = 50) -> List[dict]:
@@ -831,6 +2505,152 @@ def get_todos_movimientos(limite: int = 100) -> List[dict]:
     return [dict(row) for row in rows]
 
 
+# ============== CORTES DE STOCK (KARDEX) ==============
+
+# movimientos_inventario guarda el stock resultante de cada movimiento, así
+# que el stock de un producto en una fecha es el stock_nuevo de su último
+# movimiento hasta ese día. Para no recorrer todo el historial, al cierre de
+# cada mes se guarda un corte con el stock de todos los productos: el stock
+# en cualquier fecha sale del corte anterior más los movimientos del tramo.
+
+def _como_fecha(fecha) -> date:
+    """Acepta date, datetime o 'YYYY-MM-DD'."""
+    if isinstance(fecha, datetime):
+        return fecha.date()
+    if isinstance(fecha, date):
+        return fecha
+    return datetime.strptime(str(fecha)[:10], '%Y-%m-%d').date()
+
+
+def _fin_de_mes(fecha: date) -> date:
+    """Último día del mes de una fecha."""
+    return (fecha.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+
+
+def _stock_a_fecha(conn: sqlite3.Connection, fecha: date) -> Tuple[dict, Optional[str]]:
+    """
+    Calcula {producto_id: stock} al cierre de `fecha` (uso interno).
+
+    Retorna también la fecha del corte usado (None si no había ninguno y
+    hubo que recorrer el historial completo).
+    """
+    limite = f"{fecha.isoformat()} 23:59:59"
+    corte = conn.execute(
+        'SELECT MAX(fecha) FROM cortes_stock WHERE fecha <= ?', (fecha.isoformat(),)
+    ).fetchone()[0]
+
+    if corte:
+        stock = dict(conn.execute(
+            'SELECT producto_id, stock FROM cortes_stock WHERE fecha = ?', (corte,)
+        ).fetchall())
+        desde = f"{corte} 23:59:59"
+    else:
+        stock = {}
+        desde = ''
+
+    # Último movimiento de cada producto dentro del tramo (corte, fecha]
+    stock.update(conn.execute('''
+        SELECT producto_id, stock_nuevo FROM (
+            SELECT producto_id, stock_nuevo,
+                   ROW_NUMBER() OVER (PARTITION BY producto_id ORDER BY fecha DESC, id DESC) AS orden
+            FROM movimientos_inventario
+            WHERE fecha > ? AND fecha <= ?
+        ) WHERE orden = 1
+    ''', (desde, limite)).fetchall())
+
+    # Productos ya registrados que no están en el corte ni se movieron en el
+    # tramo: su stock es el anterior a su primer movimiento posterior, o el
+    # actual si nunca se movieron
+    stock.update(conn.execute('''
+        SELECT p.id, COALESCE(
+            (SELECT m.stock_anterior FROM movimientos_inventario m
+             WHERE m.producto_id = p.id AND m.fecha > ?
+             ORDER BY m.fecha, m.id LIMIT 1),
+            p.stock_actual, 0)
+        FROM productos p
+        WHERE (p.fecha_registro IS NULL OR p.fecha_registro <= ?)
+          AND p.id NOT IN (SELECT value FROM json_each(?))
+    ''', (limite, limite, json.dumps(list(stock)))).fetchall())
+    return stock, corte
+
+
+def construir_corte_stock_pendiente() -> Optional[str]:
+    """
+    Guarda el siguiente corte mensual que falta, si el mes ya terminó.
+
+    Cada corte se calcula a partir del anterior y los movimientos de un
+    solo mes. Retorna la fecha del corte guardado o None si no faltaba
+    ninguno; para ponerse al día hay que llamarla hasta que retorne None.
+    """
+    conn = get_connection()
+    try:
+        ultimo = conn.execute('SELECT MAX(fecha) FROM cortes_stock').fetchone()[0]
+        if ultimo:
+            siguiente = _fin_de_mes(_como_fecha(ultimo) + timedelta(days=1))
+        else:
+            primero = conn.execute('SELECT MIN(fecha) FROM movimientos_inventario').fetchone()[0]
+            if not primero:
+                return None
+            siguiente = _fin_de_mes(_como_fecha(primero))
+
+        if siguiente >= datetime.now().date():
+            return None
+
+        stock, _ = _stock_a_fecha(conn, siguiente)
+        conn.executemany(
+            'INSERT OR REPLACE INTO cortes_stock (fecha, producto_id, stock) VALUES (?, ?, ?)',
+            [(siguiente.isoformat(), producto_id, valor) for producto_id, valor in stock.items()]
+        )
+        conn.commit()
+        return siguiente.isoformat()
+    finally:
+        conn.close()
+
+
+def get_stock_a_fecha(fecha, producto_id: int = None) -> List[dict]:
+    """
+    Obtiene el stock y su valoración (a costo actual) al cierre de una fecha.
+
+    Usa el corte mensual más cercano anterior a la fecha y sólo los
+    movimientos posteriores a él. Retorna un dict por producto con codigo,
+    nombre, categoria_nombre, costo_usd, stock y valor_usd, ordenado por nombre.
+    """
+    fecha = _como_fecha(fecha)
+
+    # Los cortes viven en la base viva: con el corte a mano sólo hace falta
+    # adjuntar los años archivados del tramo (corte, fecha], y ninguno si el
+    # corte es del mismo día
+    conn = get_connection_lectura()
+    try:
+        corte = conn.execute(
+            'SELECT MAX(fecha) FROM cortes_stock WHERE fecha <= ?', (fecha.isoformat(),)
+        ).fetchone()[0]
+    finally:
+        conn.close()
+    if corte == fecha.isoformat():
+        conn = get_connection_lectura(instantanea=True)
+    else:
+        conn = get_connection_lectura(instantanea=True, historico=True, desde=corte, hasta=fecha)
+    try:
+        stock, _ = _stock_a_fecha(conn, fecha)
+        cursor = conn.execute('''
+            SELECT p.id, p.codigo, p.nombre, p.activo, p.costo_usd, c.nombre as categoria_nombre
+            FROM productos p
+            LEFT JOIN categorias c ON p.categoria_id = c.id
+            WHERE p.id IN (SELECT value FROM json_each(?))
+            ORDER BY p.nombre
+        ''', (json.dumps([producto_id] if producto_id is not None else list(stock)),))
+        resultado = []
+        for row in cursor.fetchall():
+            producto = dict(row)
+            producto['stock'] = stock.get(producto['id'], 0)
+            producto['valor_usd'] = producto['stock'] * (producto['costo_usd'] or 0)
+            resultado.append(producto)
+        return resultado
+    finally:
+        conn.close()
+
+
 # ============== FUNCIONES DE SEGURIDAD ==============
 
 def guardar_password_admin(password: str) -> bool:
@@ -847,6 +2667,7 @@ def guardar_password_admin(password: str) -> bool:
         cursor.execute('INSERT INTO configuracion (id, password_admin) VALUES (1, ?)', (password_hash,))
     conn.commit()
     conn.close()
+    _invalidar_configuracion()
     return True
 
 
@@ -887,12 +2708,18 @@ def limpiar_base_datos() -> bool:
         cursor.execute('DELETE FROM detalle_ventas')
         cursor.execute('DELETE FROM ventas')
         cursor.execute('DELETE FROM movimientos_inventario')
+        cursor.execute('DELETE FROM cortes_stock')
+        # Los archivos por año quedan en disco, pero dejan de leerse
+        cursor.execute('DELETE FROM archivos_historicos')
+        cursor.execute('DELETE FROM ventas_resumen_diario')
+        cursor.execute('DELETE FROM ventas_resumen_pago')
         
         # Resetear stock de productos a 0
         cursor.execute('UPDATE productos SET stock_actual = 0')
         
         conn.commit()
         conn.close()
+        _notificar_cambio_productos('stock', None)
         return True
     except Exception as e:
         print(f"Error limpiando base de datos: {e}")
@@ -955,12 +2782,14 @@ def crear_compra(proveedor: str, observacion: str, detalles: List[dict],
             ''', (detalle['producto_id'], detalle['cantidad'], stock_anterior, stock_nuevo, numero_compra))
         
         conn.commit()
-        return compra_id
     except Exception as e:
         conn.rollback()
         raise e
     finally:
         conn.close()
+    
+    _notificar_cambio_productos('stock', [detalle['producto_id'] for detalle in detalles])
+    return compra_id
 
 
 def get_compras(limite: int = 100) -> List[dict]:
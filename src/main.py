@@ -8,23 +8,38 @@ import os
 # Agregar el directorio src al path
 sys.path.insert(0, os.path.dirname(__file__))
 
+# Perfil de arranque opcional (PDV_PERFIL_ARRANQUE=1); antes que cualquier otro import
+from utils import startup_profiler as perfil
+perfil.iniciar()
+
 # Inicializar la base de datos antes de importar las vistas
-from database import init_database
-init_database()
+with perfil.fase("base de datos"):
+    from database import init_database, compactar_registro_cambios
+    init_database()
+
+# Sólo lo que se usa antes del primer cuadro: el actualizador (requests) se
+# importa al buscar actualizaciones
+with perfil.fase("importar módulos"):
+    from utils.license_manager import validate_license, show_license_dialog
+    from utils.db_writer import get_escritor, detener_escritor
+    from utils.kardex import programar_cortes_stock
+    
+    # Importar la ventana principal
+    from views.main_window import MainWindow
 
-# Importar módulos de licencia y actualizaciones
-from utils.license_manager import validate_license, show_license_dialog
-from utils.updater import check_and_prompt_update
 
-# Importar la ventana principal
-from views.main_window import MainWindow
+def buscar_actualizaciones(app):
+    """Verifica si hay una versión nueva (carga el actualizador recién ahora)."""
+    from utils.updater import check_and_prompt_update
+    check_and_prompt_update(app)
 
 
 def main():
     """Función principal que inicia la aplicación."""
     
     # 1. Verificar licencia antes de iniciar
-    is_valid, message = validate_license()
+    with perfil.fase("validar licencia"):
+        is_valid, message = validate_license()
     
     if not is_valid:
         # Mostrar diálogo de activación
@@ -44,12 +59,24 @@ def main():
             return
     
     # 2. Iniciar aplicación principal
-    app = MainWindow()
+    with perfil.fase("crear ventana principal"):
+        app = MainWindow()
+    # El primer momento ocioso de mainloop llega con la ventana ya dibujada
+    app.after_idle(perfil.terminar)
     
     # 3. Verificar actualizaciones después de que la ventana esté lista
-    app.after(2000, lambda: check_and_prompt_update(app))
+    app.after(2000, lambda: buscar_actualizaciones(app))
+    
+    # 4. Poner al día los cortes de stock del kardex en segundo plano
+    app.after(5000, programar_cortes_stock)
+    
+    # 5. Aplicar la retención del registro de cambios (CDC)
+    app.after(8000, lambda: get_escritor().enviar(compactar_registro_cambios))
     
     app.mainloop()
+    
+    # 6. Guardar las escrituras que quedaron en cola antes de salir
+    detener_escritor()
 
 
 if __name__ == "__main__":
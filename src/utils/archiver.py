@@ -0,0 +1,175 @@
+"""
+Archivador de Historial por Año
+Mueve las ventas, sus detalles y los movimientos de inventario de los años
+cerrados a un archivo SQLite por año (data/archivo/historial_AAAA.db), para
+que la base viva y sus backups se mantengan pequeños. Los reportes los leen
+con database.get_connection_lectura(historico=True).
+"""
+import os
+import sys
+import time
+from datetime import datetime
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from database import (
+    get_connection, get_dir_archivo, get_archivos_historicos,
+    construir_corte_stock_pendiente, pausar_registro_cambios, TABLAS_HISTORICAS
+)
+
+# Índices de cada archivo: los que usan los reportes sobre las tablas unidas
+_INDICES_ARCHIVO = {
+    'ventas': ('id', 'fecha', 'numero_factura'),
+    'detalle_ventas': ('venta_id', 'producto_id'),
+    'movimientos_inventario': ('producto_id, fecha', 'fecha'),
+}
+
+
+def nombre_archivo(anio: int) -> str:
+    """Nombre del archivo histórico de un año."""
+    return f"historial_{int(anio)}.db"
+
+
+def get_anios_archivables() -> List[int]:
+    """Años cerrados con ventas o movimientos en la base viva, sin archivar."""
+    archivados = {a['anio'] for a in get_archivos_historicos()}
+    conn = get_connection()
+    try:
+        # MIN(fecha) usa los índices por fecha: no recorre las tablas
+        primera = conn.execute('''
+            SELECT MIN(fecha) FROM (
+                SELECT MIN(fecha) AS fecha FROM ventas
+                UNION ALL
+                SELECT MIN(fecha) FROM movimientos_inventario
+            )
+        ''').fetchone()[0]
+        if not primera:
+            return []
+        # Un EXISTS por año (también por índice) descarta los años sin filas
+        anios = []
+        for anio in range(int(str(primera)[:4]), datetime.now().year):
+            if anio in archivados:
+                continue
+            parametros = (f"{anio}-01-01", f"{anio + 1}-01-01") * 2
+            if conn.execute('''
+                SELECT EXISTS (SELECT 1 FROM ventas WHERE fecha >= ? AND fecha < ?)
+                    OR EXISTS (SELECT 1 FROM movimientos_inventario WHERE fecha >= ? AND fecha < ?)
+            ''', parametros).fetchone()[0]:
+                anios.append(anio)
+        return anios
+    finally:
+        conn.close()
+
+
+def _filtros_anio(anio: int) -> dict:
+    """Condición WHERE (sobre la base viva) de las filas de cada tabla para un año."""
+    rango = "fecha >= ? AND fecha < ?"
+    return {
+        'ventas': rango,
+        'detalle_ventas': f"venta_id IN (SELECT id FROM main.ventas WHERE {rango})",
+        'movimientos_inventario': rango,
+    }
+
+
+def archivar_anio(anio: int, compactar: bool = True) -> dict:
+    """
+    Mueve un año cerrado a su archivo histórico.
+
+    1. Completa los cortes de stock pendientes (el kardex de fechas
+       archivadas sale de ellos).
+    2. Copia las filas del año a un archivo nuevo con sus índices.
+    3. Verifica los conteos y, en una sola transacción, registra el
+       archivo y borra las filas de la base viva.
+
+    Si algo falla antes del paso 3, la base viva queda intacta. Con
+    compactar=True se ejecuta VACUUM para devolver el espacio liberado.
+    Debe correr en el hilo escritor (utils/db_writer) o con la caja cerrada.
+    """
+    anio = int(anio)
+    if anio >= datetime.now().year:
+        raise ValueError(f"El año {anio} todavía no está cerrado")
+    if any(a['anio'] == anio for a in get_archivos_historicos()):
+        raise ValueError(f"El año {anio} ya está archivado")
+
+    inicio = time.perf_counter()
+    while construir_corte_stock_pendiente():
+        pass
+
+    os.makedirs(get_dir_archivo(), exist_ok=True)
+    ruta = os.path.join(get_dir_archivo(), nombre_archivo(anio))
+    temporal = ruta + '.tmp'
+    if os.path.exists(temporal):
+        os.remove(temporal)
+
+    parametros = (f"{anio}-01-01", f"{anio + 1}-01-01")
+    filtros = _filtros_anio(anio)
+    conteos = {}
+
+    conn = get_connection()
+    try:
+        # 2. Copiar a un archivo temporal (se renombra sólo si quedó completo)
+        conn.execute("ATTACH DATABASE ? AS archivo_nuevo", (temporal,))
+        try:
+            for tabla in TABLAS_HISTORICAS:
+                conn.execute(f'''
+                    CREATE TABLE archivo_nuevo.{tabla} AS
+                    SELECT * FROM main.{tabla} WHERE {filtros[tabla]}
+                ''', parametros)
+                for i, columnas in enumerate(_INDICES_ARCHIVO[tabla]):
+                    conn.execute(f"CREATE INDEX archivo_nuevo.idx_{tabla}_{i} ON {tabla}({columnas})")
+                conteos[tabla] = conn.execute(
+                    f"SELECT COUNT(*) FROM archivo_nuevo.{tabla}"
+                ).fetchone()[0]
+            conn.commit()
+        finally:
+            conn.execute("DETACH DATABASE archivo_nuevo")
+        os.replace(temporal, ruta)
+
+        # 3. Registrar y borrar de la base viva, todo o nada
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            for tabla in TABLAS_HISTORICAS:
+                vivas = conn.execute(
+                    f"SELECT COUNT(*) FROM main.{tabla} WHERE {filtros[tabla]}", parametros
+                ).fetchone()[0]
+                if vivas != conteos[tabla]:
+                    raise RuntimeError(
+                        f"{tabla}: {vivas} filas en la base y {conteos[tabla]} en el archivo"
+                    )
+            # El resumen diario del año se conserva: los triggers lo vaciarían al borrar
+            resumen = {
+                tabla: conn.execute(f"SELECT * FROM {tabla} WHERE dia >= ? AND dia < ?",
+                                    parametros).fetchall()
+                for tabla in ('ventas_resumen_diario', 'ventas_resumen_pago')
+            }
+            conn.execute('''
+                INSERT INTO archivos_historicos (anio, archivo, ventas, detalles, movimientos)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (anio, nombre_archivo(anio), conteos['ventas'],
+                  conteos['detalle_ventas'], conteos['movimientos_inventario']))
+            # Los detalles primero (clave foránea hacia ventas). Sin registro
+            # de cambios: las ventas no se borran, se mudan al archivo
+            pausar_registro_cambios(conn)
+            for tabla in ('detalle_ventas', 'ventas', 'movimientos_inventario'):
+                conn.execute(f"DELETE FROM main.{tabla} WHERE {filtros[tabla]}", parametros)
+            pausar_registro_cambios(conn, False)
+            for tabla, filas in resumen.items():
+                if filas:
+                    marcas = ', '.join('?' * len(filas[0]))
+                    conn.executemany(f"INSERT OR REPLACE INTO {tabla} VALUES ({marcas})",
+                                     [tuple(fila) for fila in filas])
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        if compactar:
+            conn.execute('VACUUM')
+    finally:
+        conn.close()
+
+    segundos = time.perf_counter() - inicio
+    print(f"🗄️ Año {anio} archivado en {segundos:.1f}s: {conteos['ventas']} ventas, "
+          f"{conteos['movimientos_inventario']} movimientos")
+    return {'anio': anio, 'ruta': ruta, 'segundos': segundos, **conteos}
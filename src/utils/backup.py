@@ -3,17 +3,19 @@ Sistema de Backup Automático
 """
 import os
 import shutil
+import sqlite3
 from datetime import datetime
 from pathlib import Path
 
 
-def crear_backup(db_path: str, backup_dir: str = None) -> str:
+def crear_backup(db_path: str, backup_dir: str = None, incluir_archivo: bool = True) -> str:
     """
     Crea un backup de la base de datos.
     
     Args:
         db_path: Ruta de la base de datos
         backup_dir: Directorio de backup (por defecto 'backups/')
+        incluir_archivo: Copiar también los años archivados (ver copiar_archivo_historico)
     
     Returns:
         Ruta del archivo de backup creado
@@ -30,15 +32,56 @@ def crear_backup(db_path: str, backup_dir: str = None) -> str:
     backup_filename = f'backup_{timestamp}.db'
     backup_path = os.path.join(backup_dir, backup_filename)
     
-    # Copiar archivo
-    shutil.copy2(db_path, backup_path)
+    # Copiar con la API de backup de SQLite: en modo WAL las últimas
+    # transacciones pueden estar aún en el archivo -wal y no en el .db
+    origen = sqlite3.connect(db_path)
+    destino = sqlite3.connect(backup_path)
+    try:
+        origen.backup(destino)
+    finally:
+        destino.close()
+        origen.close()
     
     # Limpiar backups antiguos (mantener solo los últimos 10)
     limpiar_backups_antiguos(backup_dir, mantener=10)
     
+    if incluir_archivo:
+        copiar_archivo_historico(db_path, backup_dir)
+    
     return backup_path
 
 
+def copiar_archivo_historico(db_path: str, backup_dir: str) -> int:
+    """
+    Copia a backups/archivo/ los años archivados que todavía no tienen copia.
+    
+    Los archivos de años cerrados no cambian, así que se copian una sola
+    vez en lugar de repetirse en cada backup.
+    
+    Returns:
+        Cantidad de archivos copiados
+    """
+    origen_dir = os.path.join(os.path.dirname(db_path), 'archivo')
+    if not os.path.isdir(origen_dir):
+        return 0
+    
+    destino_dir = os.path.join(backup_dir, 'archivo')
+    Path(destino_dir).mkdir(parents=True, exist_ok=True)
+    
+    copiados = 0
+    for archivo in os.listdir(origen_dir):
+        if not (archivo.startswith('historial_') and archivo.endswith('.db')):
+            continue
+        origen = os.path.join(origen_dir, archivo)
+        destino = os.path.join(destino_dir, archivo)
+        if os.path.exists(destino) and os.path.getsize(destino) == os.path.getsize(origen):
+            continue
+        shutil.copy2(origen, destino)
+        copiados += 1
+    
+    return copiados
+
+
 def limpiar_backups_antiguos(backup_dir: str, mantener: int = 10):
     """
     Elimina los backups más antiguos, manteniendo solo los especificados.
@@ -0,0 +1,360 @@
+"""
+Catálogo de Productos en Memoria
+Copia única, compartida por todas las vistas, de la tabla de productos con
+búsqueda O(1) por id y por código, un número de versión que sólo crece y un
+feed de cambios al que las vistas se suscriben. Se mantiene al día de forma
+incremental con database.suscribir_cambios_productos: cada escritura relee
+sólo las filas que tocó. Los cambios hechos por otros procesos se toman del
+registro de cambios de la base (database.get_cambios_desde) con sincronizar().
+"""
+import sys
+import os
+import threading
+from collections import deque
+from typing import Callable, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from database import get_connection_lectura, get_cambios_desde, get_seq_cambios, suscribir_cambios_productos
+
+
+class CatalogoProductos:
+    """
+    Productos (activos e inactivos) indexados por id y por código.
+
+    Los dicts entregados se comparten entre vistas y no deben modificarse:
+    un cambio reemplaza el dict del producto, nunca lo edita, así que una
+    lista obtenida antes sigue siendo una foto consistente.
+    """
+
+    def __init__(self, max_cambios: int = 500):
+        self.cargado = False
+        self.version = 0
+
+        self._lock = threading.RLock()
+        self._lock_recarga = threading.RLock()  # Una recarga completa a la vez
+        self._recargando = False              # Hay una recarga completa leyendo la base
+        self._sucio = False                   # Durante la recarga cambió todo el catálogo
+        self._pendientes = set()              # ids escritos durante la recarga, a releer al final
+        self._seq_cambios = 0                 # Último seq del registro de cambios ya reflejado
+        self._seq_carga = 0                   # seq de la foto de la última carga completa
+        self._seq_fila = {}                   # id -> seq de su foto, si es posterior a la carga
+        self._por_id = {}                     # id -> dict del producto
+        self._por_codigo = {}                 # código -> id
+        self._ordenados: Optional[list] = None  # activos ordenados por nombre (se arma al pedirlos)
+        self._cambios = deque(maxlen=max_cambios)  # (versión, acción, ids)
+        self._suscriptores: List[Callable] = []
+
+    # ---------- Mantenimiento ----------
+
+    def recargar(self):
+        """
+        Lee todos los productos de la base de datos y reemplaza el catálogo.
+
+        Mientras lee, los cambios de productos sólo se anotan: sus filas se
+        releen después del reemplazo, para que la carga no pise datos más
+        nuevos que ella.
+        """
+        with self._lock_recarga:
+            with self._lock:
+                self._recargando = True
+                self._pendientes.clear()  # Ya confirmados: la lectura los incluye
+            try:
+                while True:
+                    with self._lock:
+                        self._sucio = False
+                    seq, productos = _leer_productos()
+                    with self._lock:
+                        # Cambió todo durante la lectura: leer de nuevo
+                        if not self._sucio:
+                            break
+                with self._lock:
+                    self._reemplazar(seq, productos)
+                    version = self._registrar_cambio('recargado', None)
+                    pendientes = list(self._pendientes)
+                    self._pendientes.clear()
+                    self._recargando = False
+            finally:
+                with self._lock:
+                    self._recargando = False
+        self._notificar(version, 'recargado', None)
+        if pendientes:
+            self._aplicar('actualizado', pendientes, *_leer_productos(pendientes))
+
+    def recargar_en_segundo_plano(self):
+        """Recarga en un hilo aparte (salvo que ya haya una en curso); avisa por el feed."""
+        with self._lock:
+            if self._recargando:
+                return
+            self._recargando = True
+
+        def recargar_thread():
+            try:
+                self.recargar()
+            except Exception as e:
+                print(f"Error recargando catálogo de productos: {e}")
+
+        threading.Thread(target=recargar_thread, daemon=True).start()
+
+    def _asegurar_cargado(self):
+        """Carga el catálogo la primera vez que se consulta."""
+        if not self.cargado:
+            with self._lock_recarga:
+                if not self.cargado:  # Otro hilo pudo cargarlo mientras esperábamos
+                    self.recargar()
+
+    def al_cambiar_productos(self, accion: str, producto_ids: Optional[List[int]]):
+        """Callback para database.suscribir_cambios_productos."""
+        with self._lock:
+            if self._recargando or not self.cargado:
+                # La recarga en curso (o la primera carga) las toma al terminar
+                if producto_ids is None:
+                    self._sucio = True
+                else:
+                    self._pendientes.update(producto_ids)
+                return
+        if producto_ids is None:
+            self.recargar()
+            return
+
+        self._aplicar(accion, producto_ids, *_leer_productos(producto_ids))
+
+    def sincronizar(self) -> int:
+        """
+        Aplica los cambios de productos y categorías anotados en el registro
+        de cambios desde la última lectura, incluidos los de otros procesos.
+
+        Sólo se releen las filas anotadas, y sólo se avisa de las que
+        difieren de lo que ya hay en memoria. Retorna cuántos productos
+        cambiaron. Si el registro ya no tiene todos los cambios, la recarga
+        completa corre en segundo plano (se avisa por el feed) y retorna 0.
+        """
+        if not self.cargado:
+            return 0
+        producto_ids, categoria_ids = set(), set()
+        seq = self._seq_cambios
+        while True:
+            lote = get_cambios_desde(seq, tablas=('productos', 'categorias'))
+            if not lote['completo']:
+                self.recargar_en_segundo_plano()
+                return 0
+            for cambio in lote['cambios']:
+                if cambio['tabla'] == 'productos':
+                    producto_ids.add(cambio['fila'])
+                else:
+                    categoria_ids.add(cambio['fila'])
+            seq = lote['seq']
+            if not lote['hay_mas']:
+                break
+
+        if categoria_ids:
+            # Un cambio de categoría toca el categoria_nombre de sus productos
+            with self._lock:
+                producto_ids.update(p['id'] for p in self._por_id.values()
+                                    if p['categoria_id'] in categoria_ids)
+        seq_foto, productos = _leer_productos(list(producto_ids)) if producto_ids else (seq, [])
+        with self._lock:
+            self._seq_cambios = max(self._seq_cambios, seq)
+            encontrados = {p['id'] for p in productos}
+            distintos = [p for p in productos if self._por_id.get(p['id']) != p]
+            borrados = [i for i in producto_ids - encontrados if i in self._por_id]
+        if not distintos and not borrados:
+            return 0
+        return self._aplicar('actualizado', [p['id'] for p in distintos] + borrados,
+                             seq_foto, distintos)
+
+    def _reemplazar(self, seq: int, productos: List[dict]):
+        """
+        Cambia el contenido por una carga completa leída en la foto `seq`
+        (con el lock tomado). Las filas que ya vienen de una foto posterior
+        se conservan.
+        """
+        por_id = {p['id']: p for p in productos}
+        seq_fila = {}
+        for producto_id, seq_producto in self._seq_fila.items():
+            if seq_producto > seq:
+                seq_fila[producto_id] = seq_producto
+                actual = self._por_id.get(producto_id)
+                if actual is None:
+                    por_id.pop(producto_id, None)
+                else:
+                    por_id[producto_id] = actual
+        self._por_id = por_id
+        self._por_codigo = {p['codigo']: producto_id for producto_id, p in por_id.items()}
+        self._ordenados = None
+        self._seq_carga = seq
+        self._seq_fila = seq_fila
+        self._seq_cambios = max(self._seq_cambios, seq)
+        self.cargado = True
+
+    def _aplicar(self, accion: str, producto_ids: List[int], seq: int, productos: List[dict]) -> int:
+        """
+        Reemplaza/quita los productos dados, leídos en la foto `seq`, sube la
+        versión y avisa (uso interno). Las filas que el catálogo ya tiene de
+        una foto posterior no se tocan: otro hilo leyó después. Retorna
+        cuántos productos se aplicaron.
+        """
+        with self._lock:
+            vigentes = [i for i in dict.fromkeys(producto_ids)
+                        if self._seq_fila.get(i, self._seq_carga) <= seq]
+            if not vigentes:
+                return 0
+            for producto_id in vigentes:
+                self._seq_fila[producto_id] = seq
+                anterior = self._por_id.pop(producto_id, None)
+                if anterior is not None:
+                    self._por_codigo.pop(anterior['codigo'], None)
+            aplicables = set(vigentes)
+            for producto in productos:
+                if producto['id'] in aplicables:
+                    self._por_id[producto['id']] = producto
+                    self._por_codigo[producto['codigo']] = producto['id']
+            self._ordenados = None
+            version = self._registrar_cambio(accion, vigentes)
+        self._notificar(version, accion, list(vigentes))
+        return len(vigentes)
+
+    def _registrar_cambio(self, accion: str, producto_ids: Optional[List[int]]) -> int:
+        """Sube la versión y guarda el cambio en el feed (con el lock tomado)."""
+        self.version += 1
+        self._cambios.append((self.version, accion, producto_ids))
+        return self.version
+
+    # ---------- Feed de cambios ----------
+
+    def suscribir(self, callback: Callable):
+        """
+        Registra callback(version, accion, producto_ids) para cada cambio.
+
+        accion es la de database ('creado', 'actualizado', 'eliminado',
+        'stock') o 'recargado'; producto_ids es None cuando pudo cambiar todo.
+        Se llama en el hilo que hizo la escritura: las vistas deben pasar a
+        su hilo con after().
+        """
+        with self._lock:
+            if callback not in self._suscriptores:
+                self._suscriptores.append(callback)
+
+    def desuscribir(self, callback: Callable):
+        """Quita un callback registrado con suscribir."""
+        with self._lock:
+            if callback in self._suscriptores:
+                self._suscriptores.remove(callback)
+
+    def cambios_desde(self, version: int) -> Optional[list]:
+        """
+        Obtiene los cambios posteriores a `version` como (versión, acción, ids).
+
+        Retorna None si el feed ya no los tiene todos: el llamador debe
+        releer el catálogo completo.
+        """
+        with self._lock:
+            if version >= self.version:
+                return []
+            if not self._cambios or self._cambios[0][0] > version + 1:
+                return None
+            return [cambio for cambio in self._cambios if cambio[0] > version]
+
+    def _notificar(self, version: int, accion: str, producto_ids: Optional[List[int]]):
+        """Avisa a los suscriptores fuera del lock (uso interno)."""
+        with self._lock:
+            suscriptores = list(self._suscriptores)
+        for callback in suscriptores:
+            try:
+                callback(version, accion, producto_ids)
+            except Exception as e:
+                print(f"Error notificando cambio del catálogo: {e}")
+
+    # ---------- Consulta ----------
+
+    def get_por_id(self, producto_id: int) -> Optional[dict]:
+        """Obtiene un producto por su id (None si no existe)."""
+        self._asegurar_cargado()
+        return self._por_id.get(producto_id)
+
+    def get_por_codigo(self, codigo: str) -> Optional[dict]:
+        """Obtiene un producto por su código exacto (None si no existe)."""
+        self._asegurar_cargado()
+        with self._lock:
+            producto_id = self._por_codigo.get(codigo)
+            return self._por_id.get(producto_id) if producto_id is not None else None
+
+    def get_productos(self, activos_only: bool = True) -> List[dict]:
+        """Obtiene los productos ordenados por nombre, como database.get_productos."""
+        self._asegurar_cargado()
+        with self._lock:
+            if activos_only:
+                if self._ordenados is None:
+                    self._ordenados = sorted(
+                        (p for p in self._por_id.values() if p['activo']),
+                        key=lambda p: p['nombre']
+                    )
+                return list(self._ordenados)
+            return sorted(self._por_id.values(), key=lambda p: p['nombre'])
+
+    def get_estadisticas(self) -> dict:
+        """Obtiene tamaño, versión y cambios guardados en el feed."""
+        with self._lock:
+            return {
+                'productos': len(self._por_id),
+                'version': self.version,
+                'cambios_en_feed': len(self._cambios),
+                'suscriptores': len(self._suscriptores),
+                'cargado': self.cargado,
+            }
+
+
+def _leer_productos(producto_ids: List[int] = None) -> Tuple[int, List[dict]]:
+    """
+    Lee productos (todos o sólo los ids dados) de la base de datos.
+
+    Retorna (seq, productos): seq es el del registro de cambios en la misma
+    foto, para saber cuál de dos lecturas es la más nueva.
+    """
+    conn = get_connection_lectura(instantanea=True)
+    try:
+        cursor = conn.cursor()
+        query = '''
+            SELECT p.*, c.nombre as categoria_nombre
+            FROM productos p
+            LEFT JOIN categorias c ON p.categoria_id = c.id
+        '''
+        if producto_ids is None:
+            cursor.execute(query)
+        else:
+            cursor.execute(query + ' WHERE p.id IN (SELECT value FROM json_each(?))',
+                           (f"[{','.join(str(int(i)) for i in producto_ids)}]",))
+        rows = cursor.fetchall()
+        seq = get_seq_cambios(conn)
+    finally:
+        conn.close()
+    return seq, [dict(row) for row in rows]
+
+
+_catalogo: Optional[CatalogoProductos] = None
+_catalogo_lock = threading.Lock()
+
+
+def get_catalogo() -> CatalogoProductos:
+    """Obtiene el catálogo global (se carga en la primera consulta)."""
+    global _catalogo
+    with _catalogo_lock:
+        if _catalogo is None:
+            _catalogo = CatalogoProductos()
+            suscribir_cambios_productos(_catalogo.al_cambiar_productos)
+        return _catalogo
+
+
+def precargar_catalogo():
+    """Carga el catálogo en segundo plano si todavía no está cargado."""
+    catalogo = get_catalogo()
+    if catalogo.cargado:
+        return
+
+    def cargar_thread():
+        try:
+            catalogo._asegurar_cargado()
+        except Exception as e:
+            print(f"Error cargando catálogo de productos: {e}")
+
+    threading.Thread(target=cargar_thread, daemon=True).start()
@@ -0,0 +1,256 @@
+"""
+Escritor de Base de Datos en Segundo Plano
+Un único hilo ejecuta todas las escrituras para que la interfaz nunca
+se congele esperando un fsync o un bloqueo de SQLite.
+"""
+import sys
+import os
+import time
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Callable, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from database import iniciar_lote, ejecutar_en_lote, terminar_lote
+
+
+class _Tarea:
+    """Operación de escritura pendiente en la cola."""
+
+    __slots__ = ('funcion', 'args', 'kwargs', 'agrupable', 'futuro', 'encolada')
+
+    def __init__(self, funcion: Callable, args: tuple, kwargs: dict, agrupable: bool):
+        self.funcion = funcion
+        self.args = args
+        self.kwargs = kwargs
+        self.agrupable = agrupable
+        self.futuro = Future()
+        self.encolada = time.perf_counter()
+
+
+class EscritorBD:
+    """
+    Hilo escritor único con cola de peticiones.
+
+    Cada petición retorna un Future. Las peticiones marcadas como agrupables
+    que llegan en ráfaga se ejecutan en un mismo lote (un solo COMMIT), cada
+    una aislada en su propio SAVEPOINT.
+    """
+
+    def __init__(self, max_lote: int = 32, espera_lote: float = 0.002):
+        self.max_lote = max(1, int(max_lote))
+        self.espera_lote = espera_lote
+
+        self._cola: "queue.Queue[Optional[_Tarea]]" = queue.Queue()
+        self._hilo: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._detenido = False
+
+        # Métricas
+        self._max_pendientes = 0
+        self._procesadas = 0
+        self._errores = 0
+        self._lotes = 0
+        self._agrupadas = 0
+        self._espera_total = 0.0
+        self._ejecucion_total = 0.0
+
+    def iniciar(self):
+        """Arranca el hilo escritor (si no está corriendo)."""
+        with self._lock:
+            if self._hilo is not None and self._hilo.is_alive():
+                return
+            self._detenido = False
+            self._hilo = threading.Thread(target=self._bucle, name="EscritorBD", daemon=True)
+            self._hilo.start()
+
+    def enviar(self, funcion: Callable, args: tuple = (), kwargs: dict = None,
+               agrupable: bool = False) -> Future:
+        """Encola una escritura y retorna un Future con su resultado."""
+        tarea = _Tarea(funcion, args, kwargs or {}, agrupable)
+        with self._lock:
+            if self._detenido:
+                tarea.futuro.set_exception(RuntimeError("El escritor de base de datos está detenido"))
+                return tarea.futuro
+        if self._hilo is None or not self._hilo.is_alive():
+            self.iniciar()
+
+        self._cola.put(tarea)
+        pendientes = self._cola.qsize()
+        if pendientes > self._max_pendientes:
+            self._max_pendientes = pendientes
+        return tarea.futuro
+
+    def enviar_tk(self, widget, funcion: Callable, args: tuple = (), kwargs: dict = None,
+                  al_terminar: Callable = None, al_fallar: Callable = None,
+                  agrupable: bool = False) -> Future:
+        """
+        Encola una escritura y entrega el resultado al hilo de Tk con after().
+
+        al_terminar(resultado) o al_fallar(excepcion) se ejecutan en el hilo
+        de la interfaz, nunca en el hilo escritor.
+        """
+        def entregar(futuro: Future):
+            error = futuro.exception()
+            if error is not None:
+                callback, valor = al_fallar, error
+            else:
+                callback, valor = al_terminar, futuro.result()
+            if callback is None:
+                return
+            try:
+                widget.after(0, lambda: callback(valor))
+            except Exception as e:
+                # La ventana pudo cerrarse mientras se escribía
+                print(f"No se pudo entregar resultado a la interfaz: {e}")
+
+        futuro = self.enviar(funcion, args, kwargs, agrupable)
+        futuro.add_done_callback(entregar)
+        return futuro
+
+    def detener(self, timeout: float = 5.0):
+        """Procesa las escrituras pendientes y detiene el hilo."""
+        with self._lock:
+            if self._detenido:
+                return
+            self._detenido = True
+            hilo = self._hilo
+        if hilo is not None and hilo.is_alive():
+            self._cola.put(None)
+            hilo.join(timeout)
+
+    def get_estadisticas(self) -> dict:
+        """Obtiene las métricas de la cola y del hilo escritor."""
+        procesadas = self._procesadas
+        return {
+            'pendientes': self._cola.qsize(),
+            'max_pendientes': self._max_pendientes,
+            'procesadas': procesadas,
+            'errores': self._errores,
+            'lotes': self._lotes,
+            'agrupadas': self._agrupadas,
+            'espera_promedio_ms': (self._espera_total / procesadas * 1000) if procesadas else 0.0,
+            'ejecucion_promedio_ms': (self._ejecucion_total / procesadas * 1000) if procesadas else 0.0,
+        }
+
+    # ---------- Hilo escritor ----------
+
+    def _bucle(self):
+        """Bucle principal del hilo escritor."""
+        pendiente = []  # tarea no agrupable que cortó una ráfaga
+        while True:
+            tarea = pendiente.pop() if pendiente else self._cola.get()
+            if tarea is None:
+                break
+
+            if not tarea.agrupable:
+                self._ejecutar(tarea)
+                continue
+
+            # Reunir la ráfaga de escrituras agrupables
+            lote = [tarea]
+            limite = time.perf_counter() + self.espera_lote
+            while len(lote) < self.max_lote:
+                try:
+                    restante = limite - time.perf_counter()
+                    otra = self._cola.get(timeout=restante) if restante > 0 else self._cola.get_nowait()
+                except queue.Empty:
+                    break
+                if otra is None or not otra.agrupable:
+                    pendiente.append(otra)
+                    break
+                lote.append(otra)
+
+            if len(lote) == 1:
+                self._ejecutar(tarea)
+            else:
+                self._ejecutar_lote(lote)
+
+    def _ejecutar(self, tarea: _Tarea):
+        """Ejecuta una escritura individual (con su propio COMMIT)."""
+        if not tarea.futuro.set_running_or_notify_cancel():
+            return
+        inicio = time.perf_counter()
+        try:
+            resultado = tarea.funcion(*tarea.args, **tarea.kwargs)
+        except BaseException as e:
+            self._registrar(tarea, inicio, error=True)
+            tarea.futuro.set_exception(e)
+        else:
+            self._registrar(tarea, inicio)
+            tarea.futuro.set_result(resultado)
+
+    def _ejecutar_lote(self, lote: list):
+        """Ejecuta varias escrituras en una sola transacción."""
+        lote = [t for t in lote if t.futuro.set_running_or_notify_cancel()]
+        if not lote:
+            return
+
+        inicio = time.perf_counter()
+        resultados = []
+        try:
+            iniciar_lote()
+        except Exception as e:
+            print(f"Error iniciando lote de escritura: {e}")
+            for tarea in lote:
+                self._registrar(tarea, inicio, error=True)
+                tarea.futuro.set_exception(e)
+            return
+
+        try:
+            for tarea in lote:
+                try:
+                    resultados.append((tarea, ejecutar_en_lote(tarea.funcion, *tarea.args, **tarea.kwargs), None))
+                except Exception as e:
+                    resultados.append((tarea, None, e))
+            terminar_lote(confirmar=True)
+        except Exception as e:
+            # Falló el COMMIT: nada del lote quedó guardado
+            try:
+                terminar_lote(confirmar=False)
+            except Exception:
+                pass
+            resultados = [(tarea, None, e) for tarea in lote]
+
+        self._lotes += 1
+        self._agrupadas += len(lote)
+        for tarea, resultado, error in resultados:
+            self._registrar(tarea, inicio, error=error is not None)
+            if error is not None:
+                tarea.futuro.set_exception(error)
+            else:
+                tarea.futuro.set_result(resultado)
+
+    def _registrar(self, tarea: _Tarea, inicio: float, error: bool = False):
+        """Actualiza las métricas de una tarea terminada."""
+        fin = time.perf_counter()
+        self._procesadas += 1
+        self._espera_total += inicio - tarea.encolada
+        self._ejecucion_total += fin - inicio
+        if error:
+            self._errores += 1
+
+
+_escritor: Optional[EscritorBD] = None
+_escritor_lock = threading.Lock()
+
+
+def get_escritor() -> EscritorBD:
+    """Obtiene el escritor global de la aplicación (lo arranca si no existe)."""
+    global _escritor
+    with _escritor_lock:
+        if _escritor is None:
+            _escritor = EscritorBD()
+            _escritor.iniciar()
+        return _escritor
+
+
+def detener_escritor(timeout: float = 5.0):
+    """Vacía la cola y detiene el escritor global (al salir de la aplicación)."""
+    global _escritor
+    with _escritor_lock:
+        escritor, _escritor = _escritor, None
+    if escritor is not None:
+        escritor.detener(timeout)
@@ -11,19 +11,16 @@ import customtkinter as ctk
 from tkinter import filedialog
 from CTkMessagebox import CTkMessagebox
 
-try:
-    from openpyxl import Workbook, load_workbook
-    from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-    from openpyxl.utils import get_column_letter
-except ImportError:
-    Workbook = None
+import importlib.util
+
+# openpyxl se importa al generar o leer el archivo, no al abrir la vista de productos
+OPENPYXL_AVAILABLE = importlib.util.find_spec("openpyxl") is not None
 
 # Agregar path para imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
 from database import (
-    get_categorias, crear_categoria, get_producto_por_codigo,
-    crear_producto, actualizar_producto, generar_codigo_producto
+    get_categorias, crear_categoria, upsert_productos_bulk, generar_codigo_producto
 )
 from utils.theme import (
     BG_PRINCIPAL, BG_SECUNDARIO, BORDER_COLOR, 
@@ -51,7 +48,7 @@ def generar_plantilla_excel(ruta: str = None) -> str:
     Genera una plantilla Excel con el formato correcto para importar inventario.
     Retorna la ruta del archivo generado.
     """
-    if Workbook is None:
+    if not OPENPYXL_AVAILABLE:
         raise ImportError("openpyxl no está instalado")
     
     # Si no se especifica ruta, usar el escritorio
@@ -63,6 +60,10 @@ def generar_plantilla_excel(ruta: str = None) -> str:
             desktop = Path.home()
         ruta = str(desktop / "Plantilla_Inventario.xlsx")
     
+    from openpyxl import Workbook
+    from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+    from openpyxl.utils import get_column_letter
+    
     wb = Workbook()
     ws = wb.active
     ws.title = "Inventario"
@@ -252,19 +253,38 @@ def validar_fila(fila: Dict, fila_num: int, categorias_existentes: Dict) -> Tupl
     return True, "", datos
 
 
+def _generador_codigos(usados: set):
+    """Genera códigos PRDnnnnn consecutivos a partir del siguiente libre, sin repetir `usados`."""
+    primero = generar_codigo_producto()
+    try:
+        numero = int(primero[3:])
+    except ValueError:
+        numero = 1
+    while True:
+        codigo = f'PRD{numero:05d}'
+        numero += 1
+        if codigo not in usados:
+            yield codigo
+
+
 def importar_inventario(ruta: str, actualizar_existentes: bool = True) -> Tuple[int, int, int, List[str]]:
     """
     Importa inventario desde un archivo Excel.
     
+    Las filas válidas se escriben juntas con upsert_productos_bulk (por
+    bloques, no una transacción por producto).
+    
     Args:
         ruta: Ruta del archivo Excel
         actualizar_existentes: Si True, actualiza productos con código existente
         
     Retorna: (creados, actualizados, errores, lista_mensajes_error)
     """
-    if Workbook is None:
+    if not OPENPYXL_AVAILABLE:
         raise ImportError("openpyxl no está instalado")
     
+    from openpyxl import load_workbook
+    
     wb = load_workbook(ruta, data_only=True)
     ws = wb.active
     
@@ -277,11 +297,11 @@ def importar_inventario(ruta: str, actualizar_existentes: bool = True) -> Tuple[
     for cell in ws[1]:
         headers.append(str(cell.value or "").strip())
     
-    # Procesar filas
-    creados = 0
-    actualizados = 0
+    # Validar filas
     errores = 0
     mensajes_error = []
+    productos = []
+    filas_excel = []
     
     for fila_num, row in enumerate(ws.iter_rows(min_row=2, values_only=True), 2):
         # Saltar filas vacías
@@ -309,54 +329,39 @@ def importar_inventario(ruta: str, actualizar_existentes: bool = True) -> Tuple[
                 categorias_dict[datos["nueva_categoria"].lower()] = nueva_cat_id
                 datos["categoria_id"] = nueva_cat_id
                 del datos["nueva_categoria"]
-            
-            # Generar código si está vacío
-            if datos["codigo"] is None:
-                datos["codigo"] = generar_codigo_producto()
-            
-            # Verificar si el producto ya existe
-            producto_existente = get_producto_por_codigo(datos["codigo"])
-            
-            if producto_existente:
-                if actualizar_existentes:
-                    # Actualizar producto existente
-                    actualizar_producto(
-                        producto_id=producto_existente['id'],
-                        codigo=datos["codigo"],
-                        nombre=datos["nombre"],
-                        precio_usd=datos["precio_usd"],
-                        categoria_id=datos.get("categoria_id"),
-                        marca=datos.get("marca"),
-                        unidad_medida=datos.get("unidad_medida"),
-                        costo_usd=datos.get("costo_usd"),
-                        porcentaje_ganancia=datos.get("porcentaje_ganancia"),
-                        stock_minimo=datos.get("stock_minimo")
-                    )
-                    actualizados += 1
-                else:
-                    errores += 1
-                    mensajes_error.append(f"Fila {fila_num}: El código '{datos['codigo']}' ya existe")
-            else:
-                # Crear nuevo producto
-                crear_producto(
-                    codigo=datos["codigo"],
-                    nombre=datos["nombre"],
-                    precio_usd=datos["precio_usd"],
-                    categoria_id=datos.get("categoria_id"),
-                    marca=datos.get("marca"),
-                    unidad_medida=datos.get("unidad_medida", "Unidad"),
-                    costo_usd=datos.get("costo_usd", 0),
-                    porcentaje_ganancia=datos.get("porcentaje_ganancia", 30),
-                    stock_actual=datos.get("stock_actual", 0),
-                    stock_minimo=datos.get("stock_minimo", 5)
-                )
-                creados += 1
-                
         except Exception as e:
             errores += 1
             mensajes_error.append(f"Fila {fila_num}: Error al procesar - {str(e)}")
+            continue
+        
+        productos.append(datos)
+        filas_excel.append(fila_num)
     
     wb.close()
+    
+    # Generar códigos para las filas sin código, sin chocar con los del archivo
+    codigos = _generador_codigos({p["codigo"] for p in productos if p["codigo"]})
+    for datos in productos:
+        if datos["codigo"] is None:
+            datos["codigo"] = next(codigos)
+    
+    # Escribir todo junto
+    creados = 0
+    actualizados = 0
+    modo = 'upsert' if actualizar_existentes else 'crear'
+    for resultado in upsert_productos_bulk(productos, modo=modo):
+        fila_num = filas_excel[resultado['fila']]
+        if resultado['resultado'] == 'creado':
+            creados += 1
+        elif resultado['resultado'] == 'actualizado':
+            actualizados += 1
+        elif resultado['resultado'] == 'existente':
+            errores += 1
+            mensajes_error.append(f"Fila {fila_num}: El código '{resultado['codigo']}' ya existe")
+        else:
+            errores += 1
+            mensajes_error.append(f"Fila {fila_num}: Error al procesar - {resultado['error']}")
+    
     return creados, actualizados, errores, mensajes_error
 
 
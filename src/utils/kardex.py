@@ -0,0 +1,30 @@
+"""
+Cortes de Stock en Segundo Plano
+Pone al día los cortes mensuales del kardex usando el escritor de base de
+datos, de a un mes por tarea para no demorar las ventas en cola.
+"""
+import sys
+import os
+from concurrent.futures import Future
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from database import construir_corte_stock_pendiente
+from utils.db_writer import get_escritor
+
+
+def programar_cortes_stock():
+    """Encola la construcción de los cortes que falten (uno por tarea)."""
+
+    def continuar(futuro: Future):
+        error = futuro.exception()
+        if error is not None:
+            print(f"Error construyendo corte de stock: {error}")
+            return
+        fecha = futuro.result()
+        if fecha is None:
+            return
+        print(f"📦 Corte de stock al {fecha} guardado")
+        get_escritor().enviar(construir_corte_stock_pendiente).add_done_callback(continuar)
+
+    get_escritor().enviar(construir_corte_stock_pendiente).add_done_callback(continuar)
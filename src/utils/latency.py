@@ -0,0 +1,66 @@
+"""
+Estadísticas de Latencia
+Registra la duración de operaciones repetidas (búsquedas, escaneos, etc.)
+y calcula percentiles sobre las muestras más recientes.
+"""
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+
+def _percentil(ordenadas: list, p: float) -> float:
+    """Percentil p (0-100) de una lista ya ordenada (0 si está vacía)."""
+    if not ordenadas:
+        return 0.0
+    return ordenadas[min(len(ordenadas) - 1, int(round(p / 100 * (len(ordenadas) - 1))))]
+
+
+class EstadisticasLatencia:
+    """Ventana deslizante de duraciones en milisegundos con percentiles."""
+
+    def __init__(self, nombre: str = "", ventana: int = 1000):
+        self.nombre = nombre
+        self._muestras = deque(maxlen=ventana)
+        self._lock = threading.Lock()
+        self._total = 0
+
+    def registrar(self, milisegundos: float):
+        """Agrega una muestra."""
+        with self._lock:
+            self._muestras.append(milisegundos)
+            self._total += 1
+
+    @contextmanager
+    def medir(self):
+        """Mide la duración del bloque `with` y la registra."""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.registrar((time.perf_counter() - inicio) * 1000)
+
+    def percentil(self, p: float) -> float:
+        """Obtiene el percentil p (0-100) de las muestras recientes (0 si no hay)."""
+        with self._lock:
+            muestras = sorted(self._muestras)
+        return _percentil(muestras, p)
+
+    def resumen(self) -> dict:
+        """Obtiene conteo, p50, p99 y máximo de las muestras recientes."""
+        with self._lock:
+            muestras = sorted(self._muestras)
+            total = self._total
+        return {
+            'nombre': self.nombre,
+            'total': total,
+            'p50_ms': _percentil(muestras, 50),
+            'p99_ms': _percentil(muestras, 99),
+            'max_ms': muestras[-1] if muestras else 0.0,
+        }
+
+    def reiniciar(self):
+        """Descarta todas las muestras."""
+        with self._lock:
+            self._muestras.clear()
+            self._total = 0
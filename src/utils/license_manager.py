@@ -5,16 +5,18 @@ Sistema de activación y validación de licencias permanentes vinculadas al hard
 import os
 import sys
 import json
+import hmac
 import hashlib
 import base64
 import platform
 import uuid
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional, Tuple
 import customtkinter as ctk
-from cryptography.fernet import Fernet
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+
+# cryptography se importa dentro de las funciones que cifran: cargarla
+# demora el arranque y sólo hace falta al leer o escribir la licencia
 
 
 # Clave secreta para encriptación (NO CAMBIAR después de generar licencias)
@@ -39,8 +41,21 @@ def get_license_path() -> Path:
     return license_dir / "license.dat"
 
 
+def get_license_cache_path() -> Path:
+    """Obtiene la ruta del archivo con la última validación exitosa."""
+    return get_license_path().with_name("license.cache")
+
+
+@lru_cache(maxsize=1)
 def _get_fernet_key() -> bytes:
-    """Genera una clave Fernet derivada de la clave secreta."""
+    """
+    Genera una clave Fernet derivada de la clave secreta.
+    
+    El PBKDF2 (100.000 iteraciones) se calcula una sola vez por proceso.
+    """
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+    
     kdf = PBKDF2HMAC(
         algorithm=hashes.SHA256(),
         length=32,
@@ -51,6 +66,7 @@ def _get_fernet_key() -> bytes:
     return key
 
 
+@lru_cache(maxsize=1)
 def get_hardware_id() -> str:
     """
     Genera un ID único basado en el hardware de la máquina.
@@ -120,6 +136,7 @@ def activate_license(license_code: str) -> Tuple[bool, str]:
     
     # Encriptar y guardar
     try:
+        from cryptography.fernet import Fernet
         fernet = Fernet(_get_fernet_key())
         encrypted_data = fernet.encrypt(json.dumps(license_data).encode())
         
@@ -127,15 +144,72 @@ def activate_license(license_code: str) -> Tuple[bool, str]:
         with open(license_path, 'wb') as f:
             f.write(encrypted_data)
         
+        _write_license_cache(license_path, encrypted_data, hardware_id)
         return True, "Licencia activada correctamente"
     except Exception as e:
         return False, f"Error al guardar licencia: {str(e)}"
 
 
+def _sign_license_cache(datos: dict) -> str:
+    """Firma HMAC-SHA256 de los datos del caché (con la clave secreta)."""
+    mensaje = json.dumps(datos, sort_keys=True).encode()
+    return hmac.new(SECRET_KEY, mensaje, hashlib.sha256).hexdigest()
+
+
+def _license_cache_data(license_path: Path, encrypted_data: bytes, hardware_id: str) -> dict:
+    """Datos que ata el caché: equipo, contenido y fecha del archivo de licencia."""
+    stat = license_path.stat()
+    return {
+        "hardware_id": hardware_id,
+        "license_sha256": hashlib.sha256(encrypted_data).hexdigest(),
+        "license_mtime_ns": stat.st_mtime_ns,
+        "license_size": stat.st_size,
+    }
+
+
+def _write_license_cache(license_path: Path, encrypted_data: bytes, hardware_id: str):
+    """Guarda la validación exitosa de este archivo de licencia en este equipo."""
+    try:
+        datos = _license_cache_data(license_path, encrypted_data, hardware_id)
+        datos["firma"] = _sign_license_cache(datos)
+        get_license_cache_path().write_text(json.dumps(datos), encoding="utf-8")
+    except OSError as e:
+        print(f"No se pudo guardar el caché de licencia: {e}")
+
+
+def _clear_license_cache():
+    """Borra el caché de validación (la licencia cambió o dejó de ser válida)."""
+    try:
+        get_license_cache_path().unlink()
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        print(f"No se pudo borrar el caché de licencia: {e}")
+
+
+def _license_cache_valid(license_path: Path, encrypted_data: bytes) -> bool:
+    """
+    Indica si el caché corresponde a este equipo y a este mismo archivo de
+    licencia (contenido y fecha), con una firma válida.
+    """
+    try:
+        datos = json.loads(get_license_cache_path().read_text(encoding="utf-8"))
+        firma = datos.pop("firma")
+    except (OSError, ValueError, KeyError, AttributeError):
+        return False
+    if not hmac.compare_digest(str(firma), _sign_license_cache(datos)):
+        return False
+    return datos == _license_cache_data(license_path, encrypted_data, get_hardware_id())
+
+
 def validate_license() -> Tuple[bool, str]:
     """
     Valida que existe una licencia válida para este hardware.
     Retorna: (válida, mensaje)
+    
+    Si el archivo de licencia no cambió desde la última validación exitosa
+    en este equipo, basta con el caché firmado: no se deriva la clave ni se
+    descifra (ni se carga cryptography).
     """
     license_path = get_license_path()
     
@@ -143,26 +217,34 @@ def validate_license() -> Tuple[bool, str]:
         return False, "No hay licencia instalada"
     
     try:
-        # Leer y desencriptar
-        fernet = Fernet(_get_fernet_key())
         with open(license_path, 'rb') as f:
             encrypted_data = f.read()
         
+        if _license_cache_valid(license_path, encrypted_data):
+            return True, "Licencia válida"
+        
+        # Desencriptar
+        from cryptography.fernet import Fernet
+        fernet = Fernet(_get_fernet_key())
         decrypted_data = fernet.decrypt(encrypted_data)
         license_data = json.loads(decrypted_data.decode())
         
         # Verificar hardware ID
         current_hardware_id = get_hardware_id()
         if license_data.get("hardware_id") != current_hardware_id:
+            _clear_license_cache()
             return False, "Esta licencia no corresponde a este equipo"
         
         # Verificar que está activada
         if not license_data.get("activated"):
+            _clear_license_cache()
             return False, "La licencia no está activada"
         
+        _write_license_cache(license_path, encrypted_data, current_hardware_id)
         return True, "Licencia válida"
         
     except Exception as e:
+        _clear_license_cache()
         return False, f"Licencia corrupta o inválida: {str(e)}"
 
 
@@ -0,0 +1,258 @@
+"""
+Monitor de Consultas SQL
+Instrumentación opcional de todas las consultas de database.py: tiempo,
+filas, función que llamó, histograma por sentencia y registro de consultas
+lentas con su EXPLAIN QUERY PLAN.
+"""
+import os
+import sys
+import json
+import time
+import sqlite3
+import threading
+from collections import Counter, deque
+from datetime import datetime
+from typing import Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from utils.latency import EstadisticasLatencia
+
+# Límites superiores (ms) de los cubos del histograma; el último es "más de 1 s"
+CUBOS_MS = (0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000, float('inf'))
+
+# Sólo estas sentencias tienen un plan de ejecución útil
+_CON_PLAN = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+
+def _normalizar_sql(sql: str) -> str:
+    """Colapsa espacios para agrupar la misma sentencia escrita en varias líneas."""
+    return ' '.join(sql.split())
+
+
+def _parametros_serializables(parametros) -> list:
+    """Copia de los parámetros de ejemplo apta para JSON (BLOBs como None)."""
+    if isinstance(parametros, dict):
+        parametros = list(parametros.values())
+    return [p if isinstance(p, (int, float, str)) or p is None else None for p in parametros]
+
+
+def _llamador() -> str:
+    """Obtiene 'archivo:función:línea' del primer marco fuera de la instrumentación."""
+    marco = sys._getframe(2)
+    while marco is not None and (marco.f_code.co_filename == __file__
+                                 or marco.f_code.co_name in ('execute', 'executemany')):
+        marco = marco.f_back
+    if marco is None:
+        return '?'
+    archivo = os.path.splitext(os.path.basename(marco.f_code.co_filename))[0]
+    return f"{archivo}:{marco.f_code.co_name}:{marco.f_lineno}"
+
+
+class _EstadisticaSentencia:
+    """Acumulado de una sentencia SQL."""
+
+    def __init__(self, sql: str):
+        self.sql = sql
+        self.llamadas = 0
+        self.total_ms = 0.0
+        self.filas = 0
+        self.cubos = [0] * len(CUBOS_MS)
+        self.recientes = EstadisticasLatencia(ventana=200)
+        self.llamadores = Counter()
+        self.parametros = []
+        self.plan: Optional[str] = None
+
+    def como_dict(self) -> dict:
+        resumen = self.recientes.resumen()
+        return {
+            'sql': self.sql,
+            'llamadas': self.llamadas,
+            'total_ms': round(self.total_ms, 3),
+            'promedio_ms': round(self.total_ms / self.llamadas, 3) if self.llamadas else 0.0,
+            'p50_ms': round(resumen['p50_ms'], 3),
+            'p99_ms': round(resumen['p99_ms'], 3),
+            'max_ms': round(resumen['max_ms'], 3),
+            'filas': self.filas,
+            'histograma': {
+                (f"<={limite:g}ms" if limite != float('inf') else f">{CUBOS_MS[-2]:g}ms"): n
+                for limite, n in zip(CUBOS_MS, self.cubos)
+            },
+            'llamadores': dict(self.llamadores.most_common(5)),
+            'parametros': self.parametros,
+            'plan': self.plan,
+        }
+
+
+class MonitorConsultas:
+    """Registro en memoria de las consultas ejecutadas con CursorMonitoreado."""
+
+    def __init__(self, umbral_lento_ms: float = 50.0, max_lentas: int = 200):
+        self.activo = False
+        self.umbral_lento_ms = umbral_lento_ms
+        self._lock = threading.Lock()
+        self._sentencias = {}
+        self._lentas = deque(maxlen=max_lentas)
+
+    def registrar(self, conn: sqlite3.Connection, sql: str, parametros, segundos: float,
+                  filas: int, llamador: str):
+        """Registra una ejecución; si supera el umbral, la agrega al log de lentas."""
+        ms = segundos * 1000
+        clave = _normalizar_sql(sql)
+        with self._lock:
+            estadistica = self._sentencias.get(clave)
+            if estadistica is None:
+                estadistica = self._sentencias[clave] = _EstadisticaSentencia(clave)
+            estadistica.llamadas += 1
+            estadistica.total_ms += ms
+            estadistica.filas += max(filas or 0, 0)
+            estadistica.llamadores[llamador] += 1
+            estadistica.parametros = _parametros_serializables(parametros)
+            for i, limite in enumerate(CUBOS_MS):
+                if ms <= limite:
+                    estadistica.cubos[i] += 1
+                    break
+            necesita_plan = ms >= self.umbral_lento_ms and estadistica.plan is None
+        estadistica.recientes.registrar(ms)
+
+        if ms < self.umbral_lento_ms:
+            return
+
+        if necesita_plan:
+            estadistica.plan = self._explicar(conn, sql, parametros)
+        with self._lock:
+            self._lentas.append({
+                'fecha': datetime.now().isoformat(timespec='seconds'),
+                'ms': round(ms, 3),
+                'filas': filas,
+                'llamador': llamador,
+                'sql': clave,
+                'plan': estadistica.plan,
+            })
+        print(f"🐢 Consulta lenta ({ms:.1f} ms) en {llamador}: {clave[:120]}")
+
+    def _explicar(self, conn: sqlite3.Connection, sql: str, parametros) -> Optional[str]:
+        """Obtiene el EXPLAIN QUERY PLAN de una sentencia (None si no aplica)."""
+        if not sql.lstrip().upper().startswith(_CON_PLAN):
+            return None
+        try:
+            # Cursor base: el EXPLAIN no debe registrarse a sí mismo
+            cursor = sqlite3.Cursor(conn)
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", parametros)
+            return '\n'.join(str(fila[3]) for fila in cursor.fetchall())
+        except sqlite3.Error as e:
+            return f"(sin plan: {e})"
+
+    def get_estadisticas(self, orden: str = 'total_ms') -> list:
+        """Obtiene el resumen por sentencia, de mayor a menor según `orden`."""
+        with self._lock:
+            sentencias = list(self._sentencias.values())
+        resultado = [s.como_dict() for s in sentencias]
+        resultado.sort(key=lambda s: s.get(orden, 0), reverse=True)
+        return resultado
+
+    def get_consultas_lentas(self) -> list:
+        """Obtiene el log de consultas lentas (más reciente al final)."""
+        with self._lock:
+            return list(self._lentas)
+
+    def volcar_json(self, ruta: str) -> str:
+        """Guarda estadísticas y consultas lentas en un archivo JSON."""
+        datos = {
+            'generado': datetime.now().isoformat(timespec='seconds'),
+            'umbral_lento_ms': self.umbral_lento_ms,
+            'sentencias': self.get_estadisticas(),
+            'lentas': self.get_consultas_lentas(),
+        }
+        with open(ruta, 'w', encoding='utf-8') as f:
+            json.dump(datos, f, ensure_ascii=False, indent=2)
+        return ruta
+
+    def reiniciar(self):
+        """Descarta todo lo registrado."""
+        with self._lock:
+            self._sentencias.clear()
+            self._lentas.clear()
+
+
+class CursorMonitoreado(sqlite3.Cursor):
+    """
+    Cursor que mide cada execute/executemany y lo registra en el monitor.
+
+    Las consultas que devuelven filas se leen completas dentro de la
+    medición, así el tiempo incluye el recorrido de los resultados; fetch*
+    sirve después las filas ya leídas.
+    """
+
+    def __init__(self, conn):
+        super().__init__(conn)
+        self._filas = None
+        self._posicion = 0
+
+    def execute(self, sql, parametros=()):
+        inicio = time.perf_counter()
+        super().execute(sql, parametros)
+        if self.description is not None:
+            self._filas = super().fetchall()
+            filas = len(self._filas)
+        else:
+            self._filas = None
+            filas = self.rowcount
+        self._posicion = 0
+        _monitor.registrar(self.connection, sql, parametros, time.perf_counter() - inicio,
+                           filas, _llamador())
+        return self
+
+    def executemany(self, sql, secuencia):
+        secuencia = list(secuencia)
+        inicio = time.perf_counter()
+        super().executemany(sql, secuencia)
+        self._filas = None
+        _monitor.registrar(self.connection, sql, secuencia[0] if secuencia else (),
+                           time.perf_counter() - inicio, self.rowcount, _llamador())
+        return self
+
+    def fetchone(self):
+        if self._filas is None:
+            return super().fetchone()
+        if self._posicion >= len(self._filas):
+            return None
+        fila = self._filas[self._posicion]
+        self._posicion += 1
+        return fila
+
+    def fetchmany(self, size=None):
+        if self._filas is None:
+            return super().fetchmany(size if size is not None else self.arraysize)
+        size = size if size is not None else self.arraysize
+        filas = self._filas[self._posicion:self._posicion + size]
+        self._posicion += len(filas)
+        return filas
+
+    def fetchall(self):
+        if self._filas is None:
+            return super().fetchall()
+        filas = self._filas[self._posicion:]
+        self._posicion = len(self._filas)
+        return filas
+
+    def __next__(self):
+        fila = self.fetchone()
+        if fila is None:
+            raise StopIteration
+        return fila
+
+
+_monitor = MonitorConsultas()
+
+
+def get_monitor() -> MonitorConsultas:
+    """Obtiene el monitor global de consultas."""
+    return _monitor
+
+
+def configurar_monitor(activo: bool, umbral_lento_ms: float = None):
+    """Activa o desactiva la instrumentación (afecta a los cursores nuevos)."""
+    _monitor.activo = bool(activo)
+    if umbral_lento_ms is not None:
+        _monitor.umbral_lento_ms = float(umbral_lento_ms)
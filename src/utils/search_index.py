@@ -0,0 +1,256 @@
+"""
+Índice de Búsqueda en Memoria
+Índice de trigramas sobre código, nombre y marca de los productos activos
+para sugerencias instantáneas mientras se escribe (tolerante a errores).
+"""
+import sys
+import os
+import heapq
+import threading
+import unicodedata
+from collections import Counter, defaultdict
+from typing import List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from database import buscar_productos
+from utils.catalogo import get_catalogo
+from utils.latency import EstadisticasLatencia
+
+
+def normalizar(texto: str) -> str:
+    """Pasa a minúsculas, quita acentos y deja sólo letras, números y espacios."""
+    texto = unicodedata.normalize('NFKD', texto or '')
+    texto = ''.join(c for c in texto if not unicodedata.combining(c)).lower()
+    return ' '.join(''.join(c if c.isalnum() else ' ' for c in texto).split())
+
+
+def trigramas(texto: str, prefijo_final: bool = False) -> set:
+    """
+    Obtiene los trigramas de un texto normalizado, palabra por palabra.
+
+    Cada palabra se rodea de espacios (" azucar ") para que los inicios y
+    finales de palabra cuenten. Con prefijo_final la última palabra no se
+    cierra, porque el usuario todavía la está escribiendo.
+    """
+    resultado = set()
+    palabras = texto.split()
+    for i, palabra in enumerate(palabras):
+        abierta = prefijo_final and i == len(palabras) - 1
+        relleno = f" {palabra}" if abierta else f" {palabra} "
+        for j in range(len(relleno) - 2):
+            resultado.add(relleno[j:j + 3])
+    return resultado
+
+
+class IndiceTrigramas:
+    """
+    Índice invertido trigrama -> productos, en memoria del proceso.
+
+    Se arma desde el catálogo en memoria (utils/catalogo) y se actualiza de
+    forma incremental con su feed de cambios.
+    """
+
+    # Hasta cuántos candidatos se ordenan también por prefijo de código
+    MAX_CANDIDATOS_ORDEN_FINO = 2000
+
+    def __init__(self, umbral_difuso: float = 0.5):
+        self.umbral_difuso = umbral_difuso
+        self.cargado = False
+        self.latencia = EstadisticasLatencia("sugerencias")
+
+        self._lock = threading.RLock()
+        self._productos = {}                  # id -> dict del producto
+        self._textos = {}                     # id -> (texto normalizado, código normalizado)
+        self._largos = {}                     # id -> largo del texto (más corto = más relevante)
+        self._postings = defaultdict(set)     # trigrama -> ids
+
+    # ---------- Mantenimiento ----------
+
+    def cargar(self, productos: List[dict]):
+        """Reconstruye el índice completo a partir de una lista de productos."""
+        with self._lock:
+            self._productos.clear()
+            self._textos.clear()
+            self._largos.clear()
+            self._postings.clear()
+            for producto in productos:
+                self._agregar(producto)
+            self.cargado = True
+
+    def recargar(self):
+        """Reconstruye el índice con los productos activos del catálogo."""
+        self.cargar(get_catalogo().get_productos())
+
+    def actualizar(self, producto: dict):
+        """Agrega o reemplaza un producto (lo quita si está inactivo)."""
+        with self._lock:
+            if not producto.get('activo', 1):
+                self.eliminar(producto['id'])
+                return
+            texto = self._texto_de(producto)
+            if self._textos.get(producto['id']) == texto:
+                # Sólo cambiaron datos no indexados (stock, precio...)
+                self._productos[producto['id']] = producto
+                return
+            self.eliminar(producto['id'])
+            self._agregar(producto)
+
+    def eliminar(self, producto_id: int):
+        """Quita un producto del índice."""
+        with self._lock:
+            textos = self._textos.pop(producto_id, None)
+            self._productos.pop(producto_id, None)
+            self._largos.pop(producto_id, None)
+            if textos is None:
+                return
+            for trigrama in trigramas(textos[0]):
+                ids = self._postings.get(trigrama)
+                if ids is not None:
+                    ids.discard(producto_id)
+                    if not ids:
+                        del self._postings[trigrama]
+
+    def al_cambiar_catalogo(self, version: int, accion: str, producto_ids: Optional[List[int]]):
+        """Callback para CatalogoProductos.suscribir."""
+        if not self.cargado:
+            return
+        if producto_ids is None:
+            self.recargar()
+            return
+        catalogo = get_catalogo()
+        for producto_id in producto_ids:
+            producto = catalogo.get_por_id(producto_id)
+            if producto is None:
+                self.eliminar(producto_id)
+            else:
+                self.actualizar(producto)
+
+    def _texto_de(self, producto: dict) -> tuple:
+        """Texto normalizado indexado y código normalizado de un producto."""
+        codigo = normalizar(producto.get('codigo'))
+        texto = ' '.join(filter(None, (codigo, normalizar(producto.get('nombre')),
+                                       normalizar(producto.get('marca')))))
+        return texto, codigo
+
+    def _agregar(self, producto: dict):
+        """Indexa un producto que no está en el índice."""
+        textos = self._texto_de(producto)
+        self._productos[producto['id']] = producto
+        self._textos[producto['id']] = textos
+        self._largos[producto['id']] = len(textos[0])
+        for trigrama in trigramas(textos[0]):
+            self._postings[trigrama].add(producto['id'])
+
+    # ---------- Consulta ----------
+
+    def buscar(self, termino: str, limite: int = 5, difuso: bool = True) -> List[dict]:
+        """
+        Busca productos por trigramas del término.
+
+        Primero intersecta las listas de trigramas (coincidencia completa),
+        empezando por la más corta. Si no alcanza para `limite` resultados y
+        `difuso` está activo, completa con productos que comparten al menos
+        `umbral_difuso` de los trigramas (errores de tipeo).
+        """
+        with self.latencia.medir():
+            consulta = normalizar(termino)
+            gramas = trigramas(consulta, prefijo_final=True)
+            if not gramas or limite <= 0:
+                return []
+
+            with self._lock:
+                listas = sorted((self._postings.get(g, set()) for g in gramas), key=len)
+                exactos = listas[0].intersection(*listas[1:]) if listas[0] else set()
+
+                # Los códigos que empiezan con lo escrito van primero
+                if len(exactos) <= self.MAX_CANDIDATOS_ORDEN_FINO:
+                    clave = lambda i: (not self._textos[i][1].startswith(consulta), self._largos[i])
+                else:
+                    clave = self._largos.__getitem__
+
+                # Verificar sólo los mejores: los trigramas pueden venir de palabras distintas
+                elegidos = [
+                    i for i in heapq.nsmallest(limite * 2, exactos, key=clave)
+                    if self._contiene_palabras(i, consulta)
+                ][:limite]
+
+                if difuso and len(elegidos) < limite:
+                    elegidos += self._buscar_difuso(gramas, limite - len(elegidos), set(elegidos))
+
+                return [dict(self._productos[i]) for i in elegidos]
+
+    def _contiene_palabras(self, producto_id: int, consulta: str) -> bool:
+        """Verifica que cada palabra de la consulta inicie alguna palabra del producto."""
+        texto = f" {self._textos[producto_id][0]}"
+        return all(f" {p}" in texto for p in consulta.split())
+
+    def _buscar_difuso(self, gramas: set, limite: int, excluir: set) -> List[int]:
+        """Productos con más trigramas en común, tolerando errores (uso interno)."""
+        coincidencias = Counter()
+        for trigrama in gramas:
+            ids = self._postings.get(trigrama)
+            if ids:
+                coincidencias.update(ids)
+
+        minimo = len(gramas) * self.umbral_difuso
+        candidatos = (
+            (hits, -self._largos[i], i) for i, hits in coincidencias.items()
+            if hits >= minimo and i not in excluir
+        )
+        return [i for _, _, i in heapq.nlargest(limite, candidatos)]
+
+    def get_estadisticas(self) -> dict:
+        """Obtiene tamaño del índice y latencias de consulta (p50/p99)."""
+        with self._lock:
+            tamano = {'productos': len(self._productos), 'trigramas': len(self._postings)}
+        return {**tamano, 'cargado': self.cargado, **self.latencia.resumen()}
+
+
+_indice: Optional[IndiceTrigramas] = None
+_indice_lock = threading.Lock()
+_cargando = False
+
+
+def get_indice_productos() -> IndiceTrigramas:
+    """Obtiene el índice global de productos (vacío hasta que se cargue)."""
+    global _indice
+    with _indice_lock:
+        if _indice is None:
+            _indice = IndiceTrigramas()
+            get_catalogo().suscribir(_indice.al_cambiar_catalogo)
+        return _indice
+
+
+def precargar_indice_productos():
+    """Construye el índice en segundo plano si todavía no está cargado."""
+    global _cargando
+    indice = get_indice_productos()
+    with _indice_lock:
+        if indice.cargado or _cargando:
+            return
+        _cargando = True
+
+    def cargar_thread():
+        global _cargando
+        try:
+            indice.recargar()
+        except Exception as e:
+            print(f"Error cargando índice de búsqueda: {e}")
+        finally:
+            _cargando = False
+
+    threading.Thread(target=cargar_thread, daemon=True).start()
+
+
+def buscar_sugerencias(termino: str, limite: int = 5) -> List[dict]:
+    """
+    Sugerencias de productos para la búsqueda mientras se escribe.
+
+    Usa el índice en memoria; mientras se carga, consulta la base de datos.
+    """
+    indice = get_indice_productos()
+    if not indice.cargado:
+        precargar_indice_productos()
+        return buscar_productos(termino, limite=limite)
+    return indice.buscar(termino, limite=limite)
@@ -0,0 +1,129 @@
+"""
+Perfil de Arranque
+Línea de tiempo opcional del inicio de la aplicación: cuánto tarda cada
+importación de módulo y cada fase de main.py hasta el primer cuadro de la
+ventana principal. Se activa con la variable de entorno PDV_PERFIL_ARRANQUE
+("1" escribe data/perfil_arranque.txt; cualquier otro valor es la ruta del
+archivo). Desactivado no instala nada: cada llamada retorna en el acto.
+
+No importa nada del proyecto, para poder medir también a database.
+"""
+import os
+import sys
+import time
+import builtins
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+VARIABLE_ENTORNO = 'PDV_PERFIL_ARRANQUE'
+UMBRAL_IMPORT_MS = 2.0   # Las importaciones más rápidas no se anotan
+
+_inicio = time.perf_counter()
+_eventos = []            # (inicio_ms, duracion_ms, tipo, nombre, profundidad)
+_activo = False
+_import_original = None
+_local = threading.local()
+
+
+def _ms_desde_inicio(momento: float) -> float:
+    return (momento - _inicio) * 1000
+
+
+def _ruta_archivo() -> str:
+    """Ruta indicada en la variable de entorno, o data/perfil_arranque.txt."""
+    valor = os.environ.get(VARIABLE_ENTORNO, '')
+    if valor not in ('1', 'true', 'si', 'sí'):
+        return valor
+    if getattr(sys, 'frozen', False):
+        app_data = os.environ.get('LOCALAPPDATA', os.path.expanduser('~'))
+        directorio = os.path.join(app_data, 'PuntoDeVenta', 'data')
+    else:
+        directorio = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'data')
+    return os.path.join(directorio, 'perfil_arranque.txt')
+
+
+def _import_medido(name, globals=None, locals=None, fromlist=(), level=0):
+    """Reemplazo de __import__ que anota las importaciones que cargan algo nuevo."""
+    if level == 0 and name in sys.modules:
+        return _import_original(name, globals, locals, fromlist, level)
+
+    profundidad = getattr(_local, 'profundidad', 0)
+    _local.profundidad = profundidad + 1
+    inicio = time.perf_counter()
+    try:
+        return _import_original(name, globals, locals, fromlist, level)
+    finally:
+        _local.profundidad = profundidad
+        duracion = (time.perf_counter() - inicio) * 1000
+        if duracion >= UMBRAL_IMPORT_MS:
+            _eventos.append((_ms_desde_inicio(inicio), duracion, 'import', name, profundidad))
+
+
+def activo() -> bool:
+    """Indica si el perfil está registrando."""
+    return _activo
+
+
+def iniciar():
+    """Empieza a registrar si la variable de entorno lo pide (llamar lo antes posible)."""
+    global _activo, _import_original
+    if _activo or not os.environ.get(VARIABLE_ENTORNO):
+        return
+    _activo = True
+    _import_original = builtins.__import__
+    builtins.__import__ = _import_medido
+
+
+@contextmanager
+def fase(nombre: str):
+    """Anota la duración de un bloque de main.py como una fase del arranque."""
+    if not _activo:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        _eventos.append((_ms_desde_inicio(inicio), (time.perf_counter() - inicio) * 1000,
+                         'fase', nombre, 0))
+
+
+def marca(nombre: str):
+    """Anota un instante del arranque."""
+    if _activo:
+        _eventos.append((_ms_desde_inicio(time.perf_counter()), 0.0, 'marca', nombre, 0))
+
+
+def terminar(nombre: str = "primer cuadro") -> float:
+    """
+    Cierra la línea de tiempo con la marca `nombre`, deja de medir las
+    importaciones y escribe el archivo. Retorna los ms desde el inicio (0
+    si el perfil no estaba activo).
+    """
+    global _activo
+    if not _activo:
+        return 0.0
+    marca(nombre)
+    total = _eventos[-1][0]
+    builtins.__import__ = _import_original
+    _activo = False
+
+    ruta = _ruta_archivo()
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+        with open(ruta, 'w', encoding='utf-8') as archivo:
+            archivo.write(f"Perfil de arranque - {datetime.now():%Y-%m-%d %H:%M:%S}\n")
+            archivo.write(f"{nombre}: {total:.0f} ms desde el inicio de main.py\n\n")
+            archivo.write(f"{'inicio':>9} {'duración':>10}  evento\n")
+            for inicio, duracion, tipo, evento, profundidad in sorted(_eventos):
+                if tipo == 'marca':
+                    archivo.write(f"{inicio:>7.1f}ms {'':>10}  ● {evento}\n")
+                elif tipo == 'fase':
+                    archivo.write(f"{inicio:>7.1f}ms {duracion:>8.1f}ms  ▶ {evento}\n")
+                else:
+                    archivo.write(f"{inicio:>7.1f}ms {duracion:>8.1f}ms  {'  ' * (profundidad + 1)}import {evento}\n")
+        print(f"⏱️ {nombre.capitalize()} a los {total:.0f} ms (perfil en {ruta})")
+    except OSError as e:
+        print(f"No se pudo escribir el perfil de arranque: {e}")
+    return total
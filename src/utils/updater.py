@@ -11,12 +11,12 @@ import tempfile
 import threading
 from pathlib import Path
 from typing import Optional, Tuple, Dict
+import importlib.util
 import customtkinter as ctk
 
-try:
-    import requests
-except ImportError:
-    requests = None
+# requests se importa al consultar GitHub, desde el hilo de verificación:
+# cargarlo aquí demoraba el arranque y trababa la interfaz
+REQUESTS_DISPONIBLE = importlib.util.find_spec("requests") is not None
 
 
 # Configuración del repositorio
@@ -67,10 +67,11 @@ def check_for_updates() -> Tuple[bool, Optional[Dict]]:
     Verifica si hay una nueva versión disponible en GitHub.
     Retorna: (hay_actualizacion, info_release)
     """
-    if requests is None:
+    if not REQUESTS_DISPONIBLE:
         return False, None
     
     try:
+        import requests
         response = requests.get(GITHUB_API_URL, timeout=10)
         
         if response.status_code != 200:
@@ -114,10 +115,12 @@ def download_update(download_url: str, progress_callback=None) -> Optional[Path]
     Descarga la actualización a un directorio temporal.
     Retorna la ruta del archivo descargado o None si falla.
     """
-    if requests is None or not download_url:
+    if not REQUESTS_DISPONIBLE or not download_url:
         return None
     
     try:
+        import requests
+        
         # Crear directorio temporal
         temp_dir = Path(tempfile.gettempdir()) / "pdv_update"
         temp_dir.mkdir(exist_ok=True)
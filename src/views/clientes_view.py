@@ -9,7 +9,8 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
 from database import get_connection
-from utils.theme import BG_PRINCIPAL, BG_SECUNDARIO, BORDER_COLOR, TEXT_PRIMARY, TEXT_SECONDARY, ACCENT_PRIMARY, BG_HOVER
+from utils.theme import BG_PRINCIPAL, BG_SECUNDARIO, BORDER_COLOR, TEXT_PRIMARY, ACCENT_PRIMARY
+from views.virtual_grid import VirtualGrid, Columna
 
 
 class ClientesView(ctk.CTkFrame):
@@ -61,11 +62,20 @@ class ClientesView(ctk.CTkFrame):
         self.entry_buscar.bind("<KeyRelease>", self.buscar_clientes)
         
         # === TABLA DE CLIENTES ===
-        self.frame_tabla = ctk.CTkScrollableFrame(self)
-        self.frame_tabla.grid(row=1, column=0, sticky="nsew", padx=10, pady=10)
-        
-        for i in range(6):
-            self.frame_tabla.grid_columnconfigure(i, weight=1)
+        # Virtual: sólo existen widgets para las filas visibles
+        self.grid_clientes = VirtualGrid(self, [
+            Columna("Cédula/RIF", lambda c: c.get('cedula_rif') or '-', ancho=110),
+            Columna("Nombre", lambda c: c['nombre'], ancho=180, peso=3, alinear="w"),
+            Columna("Teléfono", lambda c: c.get('telefono') or '-', ancho=110),
+            Columna("Email", lambda c: c.get('email') or '-', ancho=150, peso=2),
+            Columna("Dirección", lambda c: c.get('direccion') or '-', ancho=150, peso=2),
+            Columna("Acciones", ancho=90, peso=0, acciones=[
+                {'texto': "✏️", 'comando': self.editar_cliente},
+                {'texto': "🗑️", 'comando': self.eliminar_cliente,
+                 'fg_color': "#e74c3c", 'hover_color': "#c0392b"},
+            ]),
+        ], texto_vacio="No hay clientes registrados")
+        self.grid_clientes.grid(row=1, column=0, sticky="nsew", padx=10, pady=10)
     
     def cargar_clientes(self):
         """Carga los clientes de la base de datos."""
@@ -79,110 +89,12 @@ class ClientesView(ctk.CTkFrame):
         ''')
         self.clientes = [dict(row) for row in cursor.fetchall()]
         conn.close()
-        self.mostrar_clientes()
+        self.mostrar_clientes(conservar_posicion=True)
     
-    def mostrar_clientes(self, clientes=None):
+    def mostrar_clientes(self, clientes=None, conservar_posicion: bool = False):
         """Muestra los clientes en la tabla."""
-        # Limpiar tabla
-        for widget in self.frame_tabla.winfo_children():
-            widget.destroy()
-        
-        # Headers
-        headers = ["Cédula/RIF", "Nombre", "Teléfono", "Email", "Dirección", "Acciones"]
-        for i, header in enumerate(headers):
-            ctk.CTkLabel(
-                self.frame_tabla,
-                text=header,
-                font=ctk.CTkFont(weight="bold"),
-                fg_color=BG_HOVER,
-                text_color=TEXT_SECONDARY,
-                corner_radius=5,
-                padx=10,
-                pady=8
-            ).grid(row=0, column=i, sticky="ew", padx=2, pady=2)
-        
-        # Datos
         lista = clientes if clientes is not None else self.clientes
-        
-        if not lista:
-            ctk.CTkLabel(
-                self.frame_tabla,
-                text="No hay clientes registrados",
-                text_color="gray"
-            ).grid(row=1, column=0, columnspan=6, pady=30)
-            return
-        
-        for idx, cliente in enumerate(lista, start=1):
-            bg = "gray20" if idx % 2 == 0 else "transparent"
-            
-            # Cédula
-            ctk.CTkLabel(
-                self.frame_tabla,
-                text=cliente.get('cedula_rif') or '-',
-                fg_color=bg,
-                padx=10, pady=5
-            ).grid(row=idx, column=0, sticky="ew", padx=2)
-            
-            # Nombre
-            ctk.CTkLabel(
-                self.frame_tabla,
-                text=cliente['nombre'],
-                fg_color=bg,
-                padx=10, pady=5
-            ).grid(row=idx, column=1, sticky="ew", padx=2)
-            
-            # Teléfono
-            ctk.CTkLabel(
-                self.frame_tabla,
-                text=cliente.get('telefono') or '-',
-                fg_color=bg,
-                padx=10, pady=5
-            ).grid(row=idx, column=2, sticky="ew", padx=2)
-            
-            # Email
-            ctk.CTkLabel(
-                self.frame_tabla,
-                text=cliente.get('email') or '-',
-                fg_color=bg,
-                padx=10, pady=5
-            ).grid(row=idx, column=3, sticky="ew", padx=2)
-            
-            # Dirección
-            direccion = cliente.get('direccion') or '-'
-            if len(direccion) > 30:
-                direccion = direccion[:30] + "..."
-            ctk.CTkLabel(
-                self.frame_tabla,
-                text=direccion,
-                fg_color=bg,
-                padx=10, pady=5
-            ).grid(row=idx, column=4, sticky="ew", padx=2)
-            
-            # Acciones
-            frame_acciones = ctk.CTkFrame(self.frame_tabla, fg_color=bg)
-            frame_acciones.grid(row=idx, column=5, sticky="ew", padx=2)
-            
-            ctk.CTkButton(
-                frame_acciones,
-                text="✏️",
-                width=30,
-                height=25,
-                fg_color="#3a4a6b",
-                hover_color="#4a5a7b",
-                text_color="#ffffff",
-                command=lambda c=cliente: self.editar_cliente(c)
-            ).pack(side="left", padx=2, pady=2)
-            
-            ctk.CTkButton(
-                frame_acciones,
-                text="🗑️",
-                width=30,
-                height=25,
-                fg_color="#e74c3c",
-                hover_color="#c0392b",
-                text_color="#ffffff",
-                command=lambda c=cliente: self.eliminar_cliente(c)
-            ).pack(side="left", padx=2, pady=2)
+        self.grid_clientes.set_filas(lista, conservar_posicion=conservar_posicion)
     
     def buscar_clientes(self, event=None):
         """Filtra clientes según el término de búsqueda."""
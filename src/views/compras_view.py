@@ -8,11 +8,13 @@ import os
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from database import (
-    get_productos, buscar_productos, crear_compra, get_compras
-)
+from database import crear_compra
+from controllers.carrito import Carrito
 from utils.currency import formato_usd, formato_bs, get_tasa_global
+from utils.db_writer import get_escritor
+from utils.search_index import precargar_indice_productos
 from utils.theme import BG_PRINCIPAL, BG_SECUNDARIO, BORDER_COLOR, TEXT_PRIMARY, TEXT_SECONDARY, ACCENT_PRIMARY, BG_HOVER
+from views.sugerencias import SugerenciasProductos
 
 
 class ComprasView(ctk.CTkFrame):
@@ -21,9 +23,14 @@ class ComprasView(ctk.CTkFrame):
     def __init__(self, parent, app_controller):
         super().__init__(parent, fg_color=BG_PRINCIPAL)
         self.app = app_controller
-        self.carrito = []
+        self.carrito = Carrito(campo_precio='costo_unit_usd')
+        self._filas_carrito = {}  # producto_id -> widgets de su línea en la tabla
+        self._registrando = False  # Compra enviada al escritor: el carrito no se toca
         self.tasa = get_tasa_global()
         
+        # Índice en memoria para las sugerencias mientras se escribe
+        precargar_indice_productos()
+        
         self.setup_ui()
     
     def setup_ui(self):
@@ -56,11 +63,20 @@ class ComprasView(ctk.CTkFrame):
         self.entry_buscar = ctk.CTkEntry(frame_buscar, width=300, placeholder_text="Código o nombre...")
         self.entry_buscar.pack(side="left", padx=5)
         self.entry_buscar.bind('<KeyRelease>', self.buscar_producto)
+        self.entry_buscar.bind('<Control-z>', self.deshacer_carrito)
         
         # Frame para sugerencias
         self.frame_sugerencias = ctk.CTkFrame(frame_izq)
         self.frame_sugerencias.grid(row=1, column=0, sticky="ew", padx=10)
         self.frame_sugerencias.grid_remove()
+        self.sugerencias = SugerenciasProductos(
+            self.frame_sugerencias,
+            texto=lambda p: f"{p['codigo']} - {p['nombre']} (Stock: {p['stock_actual']})",
+            al_elegir=self.abrir_dialogo_cantidad,
+            fg_color="transparent",
+            text_color="white",
+            hover_color="gray30"
+        )
         
         # Tabla del carrito
         ctk.CTkLabel(
@@ -74,7 +90,16 @@ class ComprasView(ctk.CTkFrame):
         for i in range(6):
             self.frame_tabla.grid_columnconfigure(i, weight=1)
         
-        self.actualizar_tabla_carrito()
+        # Encabezados (una sola vez: las líneas se agregan y quitan de a una)
+        headers = ["Producto", "Cantidad", "Costo Unit $", "Total $", ""]
+        for i, header in enumerate(headers):
+            ctk.CTkLabel(
+                self.frame_tabla,
+                text=header,
+                font=ctk.CTkFont(size=11, weight="bold"),
+                fg_color="gray30",
+                padx=5, pady=5
+            ).grid(row=0, column=i, sticky="ew", padx=1, pady=1)
         
         # === PANEL DERECHO: Datos de compra y resumen ===
         frame_der = ctk.CTkFrame(self, fg_color=BG_SECUNDARIO, border_color=BORDER_COLOR, border_width=1)
@@ -114,7 +139,7 @@ class ComprasView(ctk.CTkFrame):
         self.lbl_items.pack(pady=5)
         
         # Botones
-        ctk.CTkButton(
+        self.btn_registrar = ctk.CTkButton(
             frame_der,
             text="✅ REGISTRAR COMPRA",
             font=ctk.CTkFont(size=14, weight="bold"),
@@ -122,7 +147,8 @@ class ComprasView(ctk.CTkFrame):
             fg_color=ACCENT_PRIMARY,
             hover_color="#0284c7",
             command=self.registrar_compra
-        ).pack(pady=10, padx=15, fill="x")
+        )
+        self.btn_registrar.pack(pady=10, padx=15, fill="x")
         
         ctk.CTkButton(
             frame_der,
@@ -134,110 +160,87 @@ class ComprasView(ctk.CTkFrame):
         ).pack(pady=5, padx=15, fill="x")
     
     def buscar_producto(self, event=None):
-        """Busca productos mientras se escribe."""
-        termino = self.entry_buscar.get().strip()
-        
-        if len(termino) < 2:
-            self.frame_sugerencias.grid_remove()
+        """Pide sugerencias de productos mientras se escribe (en segundo plano)."""
+        if self._registrando:
             return
-        
-        productos = buscar_productos(termino)[:5]
-        
-        # Limpiar sugerencias anteriores
-        for widget in self.frame_sugerencias.winfo_children():
-            widget.destroy()
-        
-        if productos:
-            self.frame_sugerencias.grid()
-            for producto in productos:
-                btn = ctk.CTkButton(
-                    self.frame_sugerencias,
-                    text=f"{producto['codigo']} - {producto['nombre']} (Stock: {producto['stock_actual']})",
-                    anchor="w",
-                    fg_color="transparent",
-                    text_color="white",
-                    hover_color="gray30",
-                    command=lambda p=producto: self.abrir_dialogo_cantidad(p)
-                )
-                btn.pack(fill="x", padx=5, pady=2)
-        else:
-            self.frame_sugerencias.grid_remove()
+        self.sugerencias.programar(self.entry_buscar.get())
     
     def abrir_dialogo_cantidad(self, producto: dict):
         """Abre diálogo para ingresar cantidad y costo."""
-        self.frame_sugerencias.grid_remove()
+        if self._registrando:
+            return
+        self.sugerencias.cancelar()
         self.entry_buscar.delete(0, 'end')
         
         dialogo = DialogoCompra(self, producto, self.agregar_al_carrito)
     
     def agregar_al_carrito(self, producto_id: int, nombre: str, cantidad: int, costo_usd: float):
         """Agrega un producto al carrito de compra."""
-        # Verificar si ya está
-        for item in self.carrito:
-            if item['producto_id'] == producto_id:
-                item['cantidad'] += cantidad
-                item['total_linea_usd'] = item['cantidad'] * item['costo_unit_usd']
-                self.actualizar_tabla_carrito()
-                self.calcular_totales()
-                return
-        
-        # Agregar nuevo
-        item = {
-            'producto_id': producto_id,
-            'nombre_producto': nombre,
-            'cantidad': cantidad,
-            'costo_unit_usd': costo_usd,
-            'total_linea_usd': cantidad * costo_usd
-        }
-        self.carrito.append(item)
-        self.actualizar_tabla_carrito()
+        if self._registrando:
+            return
+        self.carrito.agregar(producto_id, nombre, cantidad, costo_usd)
+        self._actualizar_fila_carrito(producto_id)
         self.calcular_totales()
     
-    def actualizar_tabla_carrito(self):
-        """Actualiza la tabla del carrito."""
-        for widget in self.frame_tabla.winfo_children():
-            widget.destroy()
-        
-        # Headers
-        headers = ["Producto", "Cantidad", "Costo Unit $", "Total $", ""]
-        for i, header in enumerate(headers):
-            ctk.CTkLabel(
-                self.frame_tabla,
-                text=header,
-                font=ctk.CTkFont(size=11, weight="bold"),
-                fg_color="gray30",
-                padx=5, pady=5
-            ).grid(row=0, column=i, sticky="ew", padx=1, pady=1)
-        
-        # Productos
-        for idx, item in enumerate(self.carrito, start=1):
-            ctk.CTkLabel(self.frame_tabla, text=item['nombre_producto'][:30]).grid(row=idx, column=0, sticky="ew", padx=2)
-            ctk.CTkLabel(self.frame_tabla, text=str(item['cantidad'])).grid(row=idx, column=1, sticky="ew", padx=2)
-            ctk.CTkLabel(self.frame_tabla, text=formato_usd(item['costo_unit_usd'])).grid(row=idx, column=2, sticky="ew", padx=2)
-            ctk.CTkLabel(self.frame_tabla, text=formato_usd(item['total_linea_usd'])).grid(row=idx, column=3, sticky="ew", padx=2)
-            
-            ctk.CTkButton(
-                self.frame_tabla,
-                text="❌",
-                width=30,
-                fg_color="red",
-                command=lambda i=idx-1: self.eliminar_item(i)
-            ).grid(row=idx, column=4, padx=2)
+    def _actualizar_fila_carrito(self, producto_id: int):
+        """Deja la línea de un producto en la tabla como está en el carrito (crear, actualizar o quitar)."""
+        item = self.carrito.obtener(producto_id)
+        widgets = self._filas_carrito.get(producto_id)
+        if item is None:
+            if widgets is not None:
+                for widget in self._filas_carrito.pop(producto_id).values():
+                    widget.destroy()
+        elif widgets is None:
+            self._crear_fila_carrito(item)
+        else:
+            widgets['cantidad'].configure(text=str(item['cantidad']))
+            widgets['total'].configure(text=formato_usd(item['total_linea_usd']))
+    
+    def _crear_fila_carrito(self, item: dict):
+        """Crea los widgets de una línea en su fila de la tabla (su posición en el carrito)."""
+        producto_id = item['producto_id']
+        fila = self.carrito.posicion(producto_id)  # Fila 0 = encabezados
+        widgets = {
+            'nombre': ctk.CTkLabel(self.frame_tabla, text=item['nombre_producto'][:30]),
+            'cantidad': ctk.CTkLabel(self.frame_tabla, text=str(item['cantidad'])),
+            'costo': ctk.CTkLabel(self.frame_tabla, text=formato_usd(item['costo_unit_usd'])),
+            'total': ctk.CTkLabel(self.frame_tabla, text=formato_usd(item['total_linea_usd'])),
+        }
+        for columna, widget in enumerate(widgets.values()):
+            widget.grid(row=fila, column=columna, sticky="ew", padx=2)
+        
+        widgets['eliminar'] = ctk.CTkButton(
+            self.frame_tabla,
+            text="❌",
+            width=30,
+            fg_color="red",
+            command=lambda: self.eliminar_item(producto_id)
+        )
+        widgets['eliminar'].grid(row=fila, column=4, padx=2)
+        self._filas_carrito[producto_id] = widgets
     
-    def eliminar_item(self, index: int):
+    def eliminar_item(self, producto_id: int):
         """Elimina un item del carrito."""
-        if 0 <= index < len(self.carrito):
-            self.carrito.pop(index)
-            self.actualizar_tabla_carrito()
+        if self._registrando:
+            return
+        self.carrito.eliminar(producto_id)
+        self._actualizar_fila_carrito(producto_id)
+        self.calcular_totales()
+    
+    def deshacer_carrito(self, event=None):
+        """Deshace la última operación sobre el carrito (Ctrl+Z)."""
+        if self._registrando:
+            return "break"
+        producto_id = self.carrito.deshacer()
+        if producto_id is not None:
+            self._actualizar_fila_carrito(producto_id)
             self.calcular_totales()
+        return "break"
     
     def calcular_totales(self):
         """Calcula los totales."""
-        total = sum(item['total_linea_usd'] for item in self.carrito)
-        items = sum(item['cantidad'] for item in self.carrito)
-        
-        self.lbl_total.configure(text=formato_usd(total))
-        self.lbl_items.configure(text=f"{items} productos")
+        self.lbl_total.configure(text=formato_usd(self.carrito.subtotal_usd))
+        self.lbl_items.configure(text=f"{self.carrito.unidades} productos")
     
     def registrar_compra(self):
         """Registra la compra en el sistema."""
@@ -247,33 +250,64 @@ class ComprasView(ctk.CTkFrame):
         
         proveedor = self.entry_proveedor.get().strip() or "Sin proveedor"
         observacion = self.entry_observacion.get().strip()
-        total = sum(item['total_linea_usd'] for item in self.carrito)
+        total = self.carrito.subtotal_usd
         
-        try:
-            compra_id = crear_compra(proveedor, observacion, self.carrito, total)
-            
-            CTkMessagebox(
-                title="✅ Compra Registrada",
-                message=f"Compra registrada exitosamente.\n\n"
-                        f"Se actualizó el stock de {len(self.carrito)} productos.",
-                icon="check"
-            )
-            
-            self.limpiar_carrito()
-            
-        except Exception as e:
-            CTkMessagebox(
-                title="Error",
-                message=f"Error al registrar compra: {str(e)}",
-                icon="cancel"
-            )
+        # Registrar en el hilo escritor; la interfaz sigue respondiendo
+        self.btn_registrar.configure(state="disabled", text="⏳ REGISTRANDO...")
+        self._bloquear_carrito(True)
+        num_productos = len(self.carrito)
+        
+        get_escritor().enviar_tk(
+            self,
+            crear_compra,
+            args=(proveedor, observacion, self.carrito.detalles(), total),
+            al_terminar=lambda compra_id: self._compra_registrada(num_productos),
+            al_fallar=self._compra_fallida
+        )
+    
+    def _bloquear_carrito(self, bloquear: bool):
+        """Bloquea (o libera) la búsqueda y toda edición del carrito mientras se registra la compra."""
+        self._registrando = bloquear
+        if bloquear:
+            self.sugerencias.cancelar()
+        self.entry_buscar.configure(state="disabled" if bloquear else "normal")
+    
+    def _compra_registrada(self, num_productos: int):
+        """Muestra la confirmación de la compra (hilo de la interfaz)."""
+        self.btn_registrar.configure(state="normal", text="✅ REGISTRAR COMPRA")
+        self._bloquear_carrito(False)
+        
+        CTkMessagebox(
+            title="✅ Compra Registrada",
+            message=f"Compra registrada exitosamente.\n\n"
+                    f"Se actualizó el stock de {num_productos} productos.",
+            icon="check"
+        )
+        
+        self.limpiar_carrito()
+    
+    def _compra_fallida(self, error: Exception):
+        """Informa el error al registrar la compra (hilo de la interfaz)."""
+        self.btn_registrar.configure(state="normal", text="✅ REGISTRAR COMPRA")
+        self._bloquear_carrito(False)
+        
+        CTkMessagebox(
+            title="Error",
+            message=f"Error al registrar compra: {str(error)}",
+            icon="cancel"
+        )
     
     def limpiar_carrito(self):
         """Limpia el carrito."""
-        self.carrito = []
+        if self._registrando:
+            return
+        for widgets in self._filas_carrito.values():
+            for widget in widgets.values():
+                widget.destroy()
+        self._filas_carrito.clear()
+        self.carrito.limpiar()
         self.entry_proveedor.delete(0, 'end')
         self.entry_observacion.delete(0, 'end')
-        self.actualizar_tabla_carrito()
         self.calcular_totales()
 
 
@@ -5,13 +5,20 @@ import customtkinter as ctk
 from CTkMessagebox import CTkMessagebox
 import sys
 import os
+import threading
+from datetime import datetime
+from tkinter import filedialog
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from database import (get_configuracion, update_tasa_cambio, get_historial_tasas, get_connection,
+from database import (get_configuracion, update_tasa_cambio, get_historial_tasas, actualizar_configuracion,
                       guardar_password_admin, verificar_password_admin, existe_password_admin,
-                      limpiar_base_datos)
+                      limpiar_base_datos, get_perfil_rendimiento, PERFILES_RENDIMIENTO,
+                      medir_commits_por_segundo, get_medicion_perfil, get_archivos_historicos)
+from utils.archiver import archivar_anio, get_anios_archivables
+from utils.db_writer import get_escritor
 from utils.currency import set_tasa_global
+from utils.query_monitor import get_monitor, configurar_monitor
 from utils.theme import BG_PRINCIPAL, BG_SECUNDARIO, BORDER_COLOR, TEXT_PRIMARY, TEXT_SECONDARY, ACCENT_PRIMARY, BG_HOVER, ACCENT_HOVER, ERROR
 
 
@@ -56,6 +63,204 @@ class ConfigView(ctk.CTkFrame):
         frame_seguridad = ctk.CTkFrame(scroll_frame, fg_color=BG_SECUNDARIO, border_color=BORDER_COLOR, border_width=1)
         frame_seguridad.grid(row=2, column=0, columnspan=2, padx=10, pady=10, sticky="ew")
         self.setup_seguridad(frame_seguridad)
+        
+        # === FILA 3: Rendimiento de la base de datos ===
+        frame_rendimiento = ctk.CTkFrame(scroll_frame, fg_color=BG_SECUNDARIO, border_color=BORDER_COLOR, border_width=1)
+        frame_rendimiento.grid(row=3, column=0, columnspan=2, padx=10, pady=10, sticky="ew")
+        self.setup_rendimiento(frame_rendimiento)
+        
+        # === FILA 4: Diagnóstico de consultas ===
+        frame_diagnostico = ctk.CTkFrame(scroll_frame, fg_color=BG_SECUNDARIO, border_color=BORDER_COLOR, border_width=1)
+        frame_diagnostico.grid(row=4, column=0, columnspan=2, padx=10, pady=10, sticky="ew")
+        self.setup_diagnostico(frame_diagnostico)
+    
+    def setup_rendimiento(self, frame):
+        """Configura la sección de rendimiento de la base de datos."""
+        ctk.CTkLabel(
+            frame,
+            text="⚡ Rendimiento de la Base de Datos",
+            font=ctk.CTkFont(size=16, weight="bold")
+        ).pack(pady=15, padx=20, anchor="w")
+        
+        perfil = get_perfil_rendimiento()
+        ajustes = PERFILES_RENDIMIENTO[perfil]
+        
+        ctk.CTkLabel(
+            frame,
+            text=f"Perfil activo: {perfil}",
+            font=ctk.CTkFont(size=14, weight="bold"),
+            text_color=ACCENT_PRIMARY
+        ).pack(padx=20, anchor="w")
+        
+        ctk.CTkLabel(
+            frame,
+            text=ajustes['descripcion'],
+            text_color=TEXT_SECONDARY
+        ).pack(padx=20, anchor="w")
+        
+        ctk.CTkLabel(
+            frame,
+            text=(f"journal_mode={ajustes['journal_mode']}  |  synchronous={ajustes['synchronous']}  |  "
+                  f"cache_size={ajustes['cache_size']}  |  mmap_size={ajustes['mmap_size'] // (1024 * 1024)} MB  |  "
+                  f"temp_store={ajustes['temp_store']}  |  busy_timeout={ajustes['busy_timeout']} ms"),
+            text_color="gray"
+        ).pack(pady=5, padx=20, anchor="w")
+        
+        frame_medicion = ctk.CTkFrame(frame, fg_color="transparent")
+        frame_medicion.pack(fill="x", padx=20, pady=(5, 15))
+        
+        medicion = get_medicion_perfil(perfil)
+        self.lbl_commits = ctk.CTkLabel(
+            frame_medicion,
+            text=f"Commits/s: {medicion:,.0f}" if medicion is not None else "Commits/s: sin medir",
+            font=ctk.CTkFont(size=14)
+        )
+        self.lbl_commits.pack(side="left")
+        
+        self.btn_medir = ctk.CTkButton(
+            frame_medicion,
+            text="⏱️ Medir",
+            width=100,
+            command=self.medir_rendimiento
+        )
+        self.btn_medir.pack(side="left", padx=15)
+    
+    def medir_rendimiento(self):
+        """Mide los commits por segundo del perfil activo en segundo plano."""
+        perfil = get_perfil_rendimiento()
+        self.btn_medir.configure(state="disabled")
+        self.lbl_commits.configure(text="Commits/s: midiendo...")
+        
+        def medir_thread():
+            try:
+                resultado = medir_commits_por_segundo(perfil)
+                texto = f"Commits/s: {resultado:,.0f}"
+            except Exception as e:
+                texto = f"Commits/s: error ({e})"
+            self.after(0, lambda: self._mostrar_medicion(texto))
+        
+        threading.Thread(target=medir_thread, daemon=True).start()
+    
+    def _mostrar_medicion(self, texto: str):
+        self.lbl_commits.configure(text=texto)
+        self.btn_medir.configure(state="normal")
+    
+    def setup_diagnostico(self, frame):
+        """Configura la sección de diagnóstico de consultas SQL."""
+        monitor = get_monitor()
+        
+        ctk.CTkLabel(
+            frame,
+            text="🩺 Diagnóstico de Consultas",
+            font=ctk.CTkFont(size=16, weight="bold")
+        ).pack(pady=15, padx=20, anchor="w")
+        
+        frame_controles = ctk.CTkFrame(frame, fg_color="transparent")
+        frame_controles.pack(fill="x", padx=20)
+        
+        self.switch_monitor = ctk.CTkSwitch(
+            frame_controles,
+            text=f"Monitorear consultas (lentas: ≥ {monitor.umbral_lento_ms:g} ms)",
+            command=self.cambiar_monitor
+        )
+        self.switch_monitor.pack(side="left")
+        if monitor.activo:
+            self.switch_monitor.select()
+        
+        ctk.CTkButton(
+            frame_controles,
+            text="🗑️ Reiniciar",
+            width=100,
+            fg_color="gray30",
+            hover_color="gray40",
+            command=self.reiniciar_diagnostico
+        ).pack(side="right", padx=(10, 0))
+        
+        ctk.CTkButton(
+            frame_controles,
+            text="💾 Exportar JSON",
+            width=130,
+            command=self.exportar_diagnostico
+        ).pack(side="right", padx=(10, 0))
+        
+        ctk.CTkButton(
+            frame_controles,
+            text="🔄 Actualizar",
+            width=100,
+            command=self.actualizar_diagnostico
+        ).pack(side="right")
+        
+        self.txt_diagnostico = ctk.CTkTextbox(
+            frame,
+            height=260,
+            wrap="none",
+            font=ctk.CTkFont(family="Consolas", size=12)
+        )
+        self.txt_diagnostico.pack(fill="x", padx=20, pady=(10, 15))
+        self.actualizar_diagnostico()
+    
+    def cambiar_monitor(self):
+        """Activa o desactiva la instrumentación de consultas."""
+        configurar_monitor(self.switch_monitor.get() == 1)
+        self.actualizar_diagnostico()
+    
+    def actualizar_diagnostico(self):
+        """Muestra las sentencias más costosas y las últimas consultas lentas."""
+        monitor = get_monitor()
+        lineas = []
+        
+        if not monitor.activo:
+            lineas.append("Monitor desactivado. Actívelo para registrar las consultas.")
+            lineas.append("")
+        
+        sentencias = monitor.get_estadisticas()[:15]
+        lineas.append(f"{'Llamadas':>8} {'Total ms':>10} {'p50 ms':>8} {'p99 ms':>8} {'Filas':>8}  Origen / SQL")
+        lineas.append("-" * 110)
+        for sentencia in sentencias:
+            origen = next(iter(sentencia['llamadores']), '?')
+            lineas.append(f"{sentencia['llamadas']:>8} {sentencia['total_ms']:>10.1f} {sentencia['p50_ms']:>8.2f} "
+                          f"{sentencia['p99_ms']:>8.2f} {sentencia['filas']:>8}  {origen}")
+            lineas.append(f"{'':>47}{sentencia['sql'][:100]}")
+        if not sentencias:
+            lineas.append("(sin consultas registradas)")
+        
+        lentas = monitor.get_consultas_lentas()[-10:]
+        lineas.append("")
+        lineas.append(f"🐢 Últimas consultas lentas ({len(lentas)})")
+        lineas.append("-" * 110)
+        for lenta in reversed(lentas):
+            lineas.append(f"{lenta['fecha']}  {lenta['ms']:.1f} ms  {lenta['filas']} filas  {lenta['llamador']}")
+            lineas.append(f"    {lenta['sql'][:120]}")
+            for paso in (lenta['plan'] or '').splitlines():
+                lineas.append(f"      ↳ {paso}")
+        
+        self.txt_diagnostico.configure(state="normal")
+        self.txt_diagnostico.delete("1.0", "end")
+        self.txt_diagnostico.insert("1.0", "\n".join(lineas))
+        self.txt_diagnostico.configure(state="disabled")
+    
+    def exportar_diagnostico(self):
+        """Guarda las estadísticas de consultas en un archivo JSON."""
+        ruta = filedialog.asksaveasfilename(
+            title="Exportar Diagnóstico",
+            defaultextension=".json",
+            initialfile=f"Diagnostico_{datetime.now().strftime('%Y%m%d_%H%M')}.json",
+            filetypes=[("Archivo JSON", "*.json")]
+        )
+        
+        if not ruta:
+            return
+        
+        try:
+            get_monitor().volcar_json(ruta)
+            CTkMessagebox(title="Éxito", message=f"Diagnóstico exportado en:\n{ruta}", icon="check")
+        except Exception as e:
+            CTkMessagebox(title="Error", message=f"No se pudo exportar: {str(e)}", icon="cancel")
+    
+    def reiniciar_diagnostico(self):
+        """Descarta las estadísticas registradas."""
+        get_monitor().reiniciar()
+        self.actualizar_diagnostico()
     
     def setup_seguridad(self, frame):
         """Configura la sección de seguridad."""
@@ -134,6 +339,41 @@ class ConfigView(ctk.CTkFrame):
             text_color="#ffffff",
             command=self.limpiar_bd
         ).pack(pady=15, padx=15)
+        
+        # --- Archivar Historial ---
+        frame_archivo = ctk.CTkFrame(frame_content)
+        frame_archivo.pack(side="left", padx=10, pady=5, fill="y")
+        
+        ctk.CTkLabel(
+            frame_archivo,
+            text="🗄️ Archivar Historial",
+            font=ctk.CTkFont(weight="bold")
+        ).pack(pady=10, padx=15, anchor="w")
+        
+        ctk.CTkLabel(
+            frame_archivo,
+            text="Mueve las ventas y movimientos de un año\ncerrado a un archivo aparte. Los reportes\nlos siguen mostrando.",
+            text_color=TEXT_SECONDARY,
+            justify="left"
+        ).pack(pady=10, padx=15, anchor="w")
+        
+        ctk.CTkLabel(frame_archivo, text="Año:").pack(pady=(10, 0), padx=15, anchor="w")
+        self.cmb_anio_archivo = ctk.CTkComboBox(frame_archivo, values=[], width=200, state="readonly")
+        self.cmb_anio_archivo.pack(pady=5, padx=15)
+        
+        self.lbl_archivados = ctk.CTkLabel(frame_archivo, text="", text_color=TEXT_SECONDARY)
+        self.lbl_archivados.pack(pady=5, padx=15, anchor="w")
+        
+        self.btn_archivar = ctk.CTkButton(
+            frame_archivo,
+            text="🗄️ Archivar Año",
+            fg_color=ACCENT_PRIMARY,
+            hover_color=ACCENT_HOVER,
+            command=self.archivar_historial
+        )
+        self.btn_archivar.pack(pady=15, padx=15)
+        
+        self.actualizar_archivo_historico()
     
     def guardar_password(self):
         """Guarda la contraseña de administrador."""
@@ -212,6 +452,61 @@ class ConfigView(ctk.CTkFrame):
                     icon="cancel"
                 )
     
+    def actualizar_archivo_historico(self):
+        """Carga los años que se pueden archivar y los ya archivados."""
+        anios = [str(anio) for anio in get_anios_archivables()]
+        self.cmb_anio_archivo.configure(values=anios)
+        self.cmb_anio_archivo.set(anios[0] if anios else "")
+        self.btn_archivar.configure(state="normal" if anios else "disabled")
+        
+        archivados = get_archivos_historicos()
+        if archivados:
+            texto = "Archivados: " + ", ".join(str(a['anio']) for a in archivados)
+        else:
+            texto = "Sin años archivados"
+        self.lbl_archivados.configure(text=texto)
+    
+    def archivar_historial(self):
+        """Archiva el año seleccionado en el hilo escritor."""
+        anio = self.cmb_anio_archivo.get()
+        if not anio:
+            return
+        
+        msg = CTkMessagebox(
+            title="🗄️ Archivar Historial",
+            message=f"¿Mover las ventas y movimientos de {anio} a su archivo histórico?\n\n"
+                    "La caja puede demorar unos segundos mientras tanto.",
+            icon="question",
+            option_1="Cancelar",
+            option_2="Sí, Archivar"
+        )
+        if msg.get() != "Sí, Archivar":
+            return
+        
+        self.btn_archivar.configure(state="disabled", text="⏳ Archivando...")
+        get_escritor().enviar_tk(
+            self, archivar_anio, args=(int(anio),),
+            al_terminar=self._historial_archivado,
+            al_fallar=self._archivado_fallido
+        )
+    
+    def _historial_archivado(self, resultado: dict):
+        """Muestra el resultado del archivado (hilo de la interfaz)."""
+        self.btn_archivar.configure(text="🗄️ Archivar Año")
+        self.actualizar_archivo_historico()
+        CTkMessagebox(
+            title="✅ Historial Archivado",
+            message=f"Año {resultado['anio']}: {resultado['ventas']} ventas y "
+                    f"{resultado['movimientos_inventario']} movimientos archivados.",
+            icon="check"
+        )
+    
+    def _archivado_fallido(self, error: Exception):
+        """Informa un error de archivado (hilo de la interfaz)."""
+        self.btn_archivar.configure(text="🗄️ Archivar Año")
+        self.actualizar_archivo_historico()
+        CTkMessagebox(title="Error", message=f"No se pudo archivar:\n{error}", icon="cancel")
+    
     def setup_datos_tienda(self, frame):
         """Configura el formulario de datos de la tienda."""
         ctk.CTkLabel(
@@ -372,23 +667,15 @@ class ConfigView(ctk.CTkFrame):
     def guardar_datos_tienda(self):
         """Guarda los datos de la tienda."""
         try:
-            conn = get_connection()
-            cursor = conn.cursor()
-            
             nombre = self.entry_nombre.get().strip()
             rif = self.entry_rif.get().strip()
             direccion = self.entry_direccion.get().strip()
             telefono = self.entry_telefono.get().strip()
             iva = float(self.entry_iva.get().strip() or 16)
             
-            cursor.execute('''
-                UPDATE configuracion 
-                SET nombre_tienda = ?, rif = ?, direccion = ?, telefono = ?, iva_porcentaje = ?
-                WHERE id = 1
-            ''', (nombre, rif, direccion, telefono, iva))
-            
-            conn.commit()
-            conn.close()
+            if not actualizar_configuracion(nombre_tienda=nombre, rif=rif, direccion=direccion,
+                                            telefono=telefono, iva_porcentaje=iva):
+                raise RuntimeError("no se pudo actualizar la configuración")
             
             # Actualizar título de la ventana
             self.app.lbl_titulo.configure(text=f"🏪 {nombre}")
@@ -9,11 +9,23 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
 from database import (
-    get_productos, get_productos_bajo_stock, actualizar_stock,
+    get_productos_bajo_stock, actualizar_stock,
     get_connection, get_tasa_actual, get_movimientos_producto, get_todos_movimientos
 )
+from utils.catalogo import get_catalogo
 from utils.currency import formato_usd, formato_bs
-from utils.theme import BG_PRINCIPAL, BG_SECUNDARIO, BORDER_COLOR, TEXT_PRIMARY, TEXT_SECONDARY, ACCENT_PRIMARY, WARNING, BG_HOVER, ERROR, ACCENT_HOVER
+from utils.db_writer import get_escritor
+from utils.theme import BG_PRINCIPAL, BG_SECUNDARIO, BORDER_COLOR, TEXT_PRIMARY, ACCENT_PRIMARY, WARNING, ERROR, ACCENT_HOVER
+from views.virtual_grid import VirtualGrid, Columna
+
+
+def _estado_stock(producto: dict) -> tuple:
+    """Texto, color y gravedad (para ordenar) del estado de stock de un producto."""
+    if producto['stock_actual'] <= 0:
+        return "❌ Sin Stock", "#ff4444", 0
+    if producto['stock_actual'] <= producto['stock_minimo']:
+        return "⚠️ Bajo", "#ffa500", 1
+    return "✅ OK", "#00ff00", 2
 
 
 class InventarioView(ctk.CTkFrame):
@@ -23,8 +35,13 @@ class InventarioView(ctk.CTkFrame):
         super().__init__(parent, fg_color=BG_PRINCIPAL)
         self.app = app_controller
         self.productos = []
+        self._version_catalogo = None
         self.setup_ui()
         self.cargar_datos()
+        
+        # Las ventas y compras cambian el stock mientras la vista está en caché
+        get_catalogo().suscribir(self._al_cambiar_catalogo)
+        self.bind("<Destroy>", self._al_destruir, add="+")
     
     def setup_ui(self):
         """Configura la interfaz de inventario."""
@@ -104,108 +121,64 @@ class InventarioView(ctk.CTkFrame):
         self.lbl_valorizacion.pack(side="right", padx=20)
         
         # === TABLA DE INVENTARIO ===
-        self.frame_tabla = ctk.CTkScrollableFrame(self)
-        self.frame_tabla.grid(row=2, column=0, sticky="nsew", padx=10, pady=10)
-        
-        for i in range(7):
-            self.frame_tabla.grid_columnconfigure(i, weight=1)
+        # Virtual: sólo existen widgets para las filas visibles
+        self.tasa = get_tasa_actual()
+        self.grid_inventario = VirtualGrid(self, [
+            Columna("Código", lambda p: p['codigo'], ancho=110),
+            Columna("Nombre", lambda p: p['nombre'], ancho=200, peso=3, alinear="w"),
+            Columna("Stock", lambda p: str(p['stock_actual']), ancho=70,
+                    color=lambda p: _estado_stock(p)[1], orden=lambda p: p['stock_actual']),
+            Columna("Mínimo", lambda p: str(p['stock_minimo']), ancho=70,
+                    orden=lambda p: p['stock_minimo']),
+            Columna("Estado", lambda p: _estado_stock(p)[0], ancho=110,
+                    color=lambda p: _estado_stock(p)[1], orden=lambda p: _estado_stock(p)[2]),
+            Columna("Valor USD", lambda p: formato_usd(p['stock_actual'] * p['precio_usd']), ancho=110,
+                    color=lambda p: "#0ea5e9", orden=lambda p: p['stock_actual'] * p['precio_usd']),
+            Columna("Valor Bs", lambda p: formato_bs(p['stock_actual'] * p['precio_usd'] * self.tasa),
+                    ancho=130, color=lambda p: "#ffa500",
+                    orden=lambda p: p['stock_actual'] * p['precio_usd']),
+        ])
+        self.grid_inventario.grid(row=2, column=0, sticky="nsew", padx=10, pady=10)
     
     def cargar_datos(self):
-        """Carga los productos de la base de datos."""
-        self.productos = get_productos()
-        self.mostrar_inventario()
+        """Carga los productos del catálogo en memoria."""
+        catalogo = get_catalogo()
+        self._version_catalogo = catalogo.version
+        self.productos = catalogo.get_productos()
+        self.filtrar_productos(conservar_posicion=True)
         self.calcular_valorizacion()
     
-    def mostrar_inventario(self, productos=None):
+    def refrescar(self):
+        """Vuelve a mostrar el inventario si el catálogo cambió desde la última carga."""
+        catalogo = get_catalogo()
+        catalogo.sincronizar()  # Cambios de otros procesos (registro de cambios)
+        if catalogo.version != self._version_catalogo:
+            self.cargar_datos()
+    
+    def _al_cambiar_catalogo(self, version, accion, producto_ids):
+        """Callback del catálogo (hilo de la escritura): pasa al hilo de la interfaz."""
+        try:
+            self.after(0, self._catalogo_cambiado)
+        except Exception:
+            pass  # La vista se está cerrando
+    
+    def _catalogo_cambiado(self):
+        """Refresca sólo si la vista está visible; si no, lo hará refrescar() al mostrarla."""
+        if self.winfo_exists() and self.winfo_ismapped():
+            self.refrescar()
+    
+    def _al_destruir(self, event):
+        """Deja de escuchar el catálogo al cerrar la vista."""
+        if event.widget is self:
+            get_catalogo().desuscribir(self._al_cambiar_catalogo)
+    
+    def mostrar_inventario(self, productos=None, conservar_posicion: bool = False):
         """Muestra el inventario en la tabla."""
-        # Limpiar tabla
-        for widget in self.frame_tabla.winfo_children():
-            widget.destroy()
-        
-        # Headers
-        headers = ["Código", "Nombre", "Stock", "Mínimo", "Estado", "Valor USD", "Valor Bs"]
-        for i, header in enumerate(headers):
-            ctk.CTkLabel(
-                self.frame_tabla,
-                text=header,
-                font=ctk.CTkFont(weight="bold"),
-                fg_color=BG_HOVER,
-                text_color=TEXT_SECONDARY,
-                corner_radius=5,
-                padx=10,
-                pady=8
-            ).grid(row=0, column=i, sticky="ew", padx=2, pady=2)
-        
+        self.tasa = get_tasa_actual()
         productos_mostrar = productos if productos is not None else self.productos
-        tasa = get_tasa_actual()
-        
-        for idx, prod in enumerate(productos_mostrar, start=1):
-            stock = prod['stock_actual']
-            stock_min = prod['stock_minimo']
-            precio_usd = prod['precio_usd']
-            valor_usd = stock * precio_usd
-            valor_bs = valor_usd * tasa
-            
-            # Determinar estado
-            if stock <= 0:
-                estado = "❌ Sin Stock"
-                color_estado = "#ff4444"
-            elif stock <= stock_min:
-                estado = "⚠️ Bajo"
-                color_estado = "#ffa500"
-            else:
-                estado = "✅ OK"
-                color_estado = "#00ff00"
-            
-            bg_color = "gray20" if idx % 2 == 0 else "transparent"
-            
-            # Código
-            ctk.CTkLabel(
-                self.frame_tabla, text=prod['codigo'],
-                fg_color=bg_color, padx=10, pady=5
-            ).grid(row=idx, column=0, sticky="ew", padx=2)
-            
-            # Nombre
-            ctk.CTkLabel(
-                self.frame_tabla, text=prod['nombre'],
-                fg_color=bg_color, padx=10, pady=5
-            ).grid(row=idx, column=1, sticky="ew", padx=2)
-            
-            # Stock
-            ctk.CTkLabel(
-                self.frame_tabla, text=str(stock),
-                fg_color=bg_color, padx=10, pady=5,
-                text_color=color_estado
-            ).grid(row=idx, column=2, sticky="ew", padx=2)
-            
-            # Mínimo
-            ctk.CTkLabel(
-                self.frame_tabla, text=str(stock_min),
-                fg_color=bg_color, padx=10, pady=5
-            ).grid(row=idx, column=3, sticky="ew", padx=2)
-            
-            # Estado
-            ctk.CTkLabel(
-                self.frame_tabla, text=estado,
-                fg_color=bg_color, padx=10, pady=5,
-                text_color=color_estado
-            ).grid(row=idx, column=4, sticky="ew", padx=2)
-            
-            # Valor USD
-            ctk.CTkLabel(
-                self.frame_tabla, text=formato_usd(valor_usd),
-                fg_color=bg_color, padx=10, pady=5,
-                text_color="#0ea5e9"
-            ).grid(row=idx, column=5, sticky="ew", padx=2)
-            
-            # Valor Bs
-            ctk.CTkLabel(
-                self.frame_tabla, text=formato_bs(valor_bs),
-                fg_color=bg_color, padx=10, pady=5,
-                text_color="#ffa500"
-            ).grid(row=idx, column=6, sticky="ew", padx=2)
+        self.grid_inventario.set_filas(productos_mostrar, conservar_posicion=conservar_posicion)
     
-    def filtrar_productos(self, event=None):
+    def filtrar_productos(self, event=None, conservar_posicion: bool = False):
         """Filtra productos según búsqueda y filtros."""
         termino = self.entry_buscar.get().strip().lower()
         solo_bajo = self.var_stock_bajo.get()
@@ -224,7 +197,7 @@ class InventarioView(ctk.CTkFrame):
                 if p['stock_actual'] <= p['stock_minimo']
             ]
         
-        self.mostrar_inventario(filtrados)
+        self.mostrar_inventario(filtrados, conservar_posicion=conservar_posicion)
     
     def calcular_valorizacion(self):
         """Calcula el valor total del inventario."""
@@ -244,7 +217,20 @@ class InventarioView(ctk.CTkFrame):
         """Ejecuta un ajuste de inventario."""
         tipo_mov = "Entrada" if tipo == "Entrada" else "Salida"
         
-        if actualizar_stock(producto_id, cantidad, tipo_mov, observacion=observacion):
+        # Los ajustes seguidos son escrituras pequeñas: se agrupan en un solo commit
+        get_escritor().enviar_tk(
+            self,
+            actualizar_stock,
+            args=(producto_id, cantidad, tipo_mov),
+            kwargs={'observacion': observacion},
+            al_terminar=lambda ok: self._ajuste_terminado(ok, tipo_mov),
+            al_fallar=lambda e: self._ajuste_terminado(False, tipo_mov),
+            agrupable=True
+        )
+    
+    def _ajuste_terminado(self, ok: bool, tipo_mov: str):
+        """Informa el resultado de un ajuste (hilo de la interfaz)."""
+        if ok:
             self.cargar_datos()
             CTkMessagebox(
                 title="Éxito",
@@ -6,20 +6,41 @@ from CTkMessagebox import CTkMessagebox
 from datetime import datetime
 import sys
 import os
+import time
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
 from database import (
-    buscar_productos, get_producto_por_codigo, crear_venta,
+    buscar_productos, crear_venta,
     get_tasa_actual, get_configuracion, get_clientes
 )
+from controllers.carrito import Carrito
+from utils.catalogo import get_catalogo
 from utils.currency import formato_usd, formato_bs, usd_a_bs
+from utils.db_writer import get_escritor
+from utils.latency import EstadisticasLatencia
+from utils.search_index import precargar_indice_productos
 from utils.theme import (
     BG_PRINCIPAL, BG_SECUNDARIO, BG_HOVER, BORDER_COLOR,
     TEXT_PRIMARY, TEXT_SECONDARY, TEXT_MUTED,
     ACCENT_PRIMARY, ACCENT_HOVER, WARNING, ERROR,
     BTN_PRIMARY, BTN_DANGER
 )
+from views.sugerencias import SugerenciasProductos
+
+# Lector de código de barras: teclea el código completo en pocos ms y luego Enter
+UMBRAL_RAFAGA_MS = 30      # Pausa máxima entre teclas de una ráfaga (una persona tarda más)
+MIN_TECLAS_RAFAGA = 4      # Teclas seguidas dentro del umbral para considerar que es un lector
+OBJETIVO_ESCANEO_MS = 20   # Latencia escaneo→carrito esperada (p99)
+
+
+def separar_cantidad(texto: str) -> tuple:
+    """Separa el multiplicador de cantidad: '6*7591234' -> (6, '7591234')."""
+    cantidad, separador, codigo = texto.partition('*')
+    cantidad, codigo = cantidad.strip(), codigo.strip()
+    if separador and cantidad.isdigit() and int(cantidad) > 0 and codigo:
+        return int(cantidad), codigo
+    return 1, texto.strip()
 
 
 class POSView(ctk.CTkFrame):
@@ -28,15 +49,24 @@ class POSView(ctk.CTkFrame):
     def __init__(self, parent, app_controller):
         super().__init__(parent, fg_color=BG_PRINCIPAL)
         self.app = app_controller
-        self.carrito = []  # Lista de productos en el carrito
+        self._filas_carrito = {}    # producto_id -> widgets de su línea en la tabla
+        self._registrando = False   # Venta enviada al escritor: el carrito no se toca
+        self.latencia_escaneo = EstadisticasLatencia("escaneo_carrito")
+        self._ultima_tecla = None   # event.time (ms) de la última tecla soltada
+        self._teclas_rafaga = 0     # Teclas seguidas dentro de UMBRAL_RAFAGA_MS
+        self._inicio_rafaga = 0.0   # perf_counter de la primera tecla de la racha
         self.tasa = get_tasa_actual()
         config = get_configuracion()
         self.iva_porcentaje = config.get('iva_porcentaje', 16) / 100
+        self.carrito = Carrito(iva_porcentaje=self.iva_porcentaje)
         
         # Cargar clientes
         self.clientes = get_clientes()
         self.cliente_seleccionado_id = None
         
+        # Índice en memoria para las sugerencias mientras se escribe
+        precargar_indice_productos()
+        
         self.setup_ui()
     
     def setup_ui(self):
@@ -108,6 +138,19 @@ class POSView(ctk.CTkFrame):
             command=self.buscar_producto
         ).pack(side="left", padx=5)
         
+        ctk.CTkButton(
+            frame_busqueda,
+            text="↩️ Deshacer",
+            width=90,
+            fg_color="transparent",
+            border_color=BORDER_COLOR,
+            border_width=1,
+            text_color=TEXT_SECONDARY,
+            hover_color=BG_HOVER,
+            command=self.deshacer_carrito
+        ).pack(side="right")
+        self.entry_buscar.bind("<Control-z>", self.deshacer_carrito)
+        
         ctk.CTkButton(
             frame_busqueda,
             text="🗑️ Limpiar",
@@ -124,6 +167,13 @@ class POSView(ctk.CTkFrame):
         self.frame_sugerencias = ctk.CTkFrame(parent, height=0)
         self.frame_sugerencias.grid(row=0, column=0, sticky="new", padx=10, pady=(60, 0))
         self.frame_sugerencias.grid_remove()
+        self.sugerencias = SugerenciasProductos(
+            self.frame_sugerencias,
+            texto=self._texto_sugerencia,
+            al_elegir=self._elegir_sugerencia,
+            fg_color="gray30",
+            hover_color="gray40"
+        )
     
     def setup_carrito(self, parent):
         """Configura la tabla del carrito."""
@@ -145,7 +195,18 @@ class POSView(ctk.CTkFrame):
         for i in range(6):
             self.frame_tabla_carrito.grid_columnconfigure(i, weight=1)
         
-        self.actualizar_tabla_carrito()
+        # Encabezados (una sola vez: las líneas se agregan y quitan de a una)
+        headers = ["Código", "Producto", "Cant", "P.Unit $", "P.Unit Bs", "Total $", ""]
+        for i, header in enumerate(headers):
+            ctk.CTkLabel(
+                self.frame_tabla_carrito,
+                text=header,
+                font=ctk.CTkFont(size=11, weight="bold"),
+                fg_color=BG_HOVER,
+                text_color=TEXT_SECONDARY,
+                padx=5,
+                pady=5
+            ).grid(row=0, column=i, sticky="ew", padx=1, pady=1)
     
     def setup_resumen(self, parent):
         """Configura el resumen de la venta."""
@@ -285,7 +346,7 @@ class POSView(ctk.CTkFrame):
         frame_botones = ctk.CTkFrame(parent, fg_color="transparent")
         frame_botones.pack(fill="x", padx=10, pady=5)
         
-        ctk.CTkButton(
+        self.btn_cobrar = ctk.CTkButton(
             frame_botones,
             text="💳 COBRAR",
             font=ctk.CTkFont(size=13, weight="bold"),
@@ -293,7 +354,8 @@ class POSView(ctk.CTkFrame):
             fg_color=ACCENT_PRIMARY,
             hover_color=ACCENT_HOVER,
             command=self.procesar_venta
-        ).pack(fill="x", pady=2)
+        )
+        self.btn_cobrar.pack(fill="x", pady=2)
         
         ctk.CTkButton(
             frame_botones,
@@ -323,71 +385,89 @@ class POSView(ctk.CTkFrame):
             self.cliente_seleccionado_id = self.cliente_ids[valor]
     
     def mostrar_sugerencias(self, event=None):
-        """Muestra sugerencias de productos mientras se escribe."""
-        termino = self.entry_buscar.get().strip()
-        
-        # Limpiar sugerencias anteriores
-        for widget in self.frame_sugerencias.winfo_children():
-            widget.destroy()
-        
-        if len(termino) < 2:
-            self.frame_sugerencias.grid_remove()
+        """Pide sugerencias de productos mientras se escribe (en segundo plano)."""
+        if self._registrando:
             return
-        
-        productos = buscar_productos(termino)[:5]  # Máximo 5 sugerencias
-        
-        if not productos:
-            self.frame_sugerencias.grid_remove()
+        if event is not None and self._es_rafaga(event):
+            # Es el lector de código de barras: el Enter llega en unos ms
+            self.sugerencias.cancelar()
             return
-        
-        self.frame_sugerencias.grid()
-        
-        for prod in productos:
-            precio_bs = prod['precio_usd'] * self.tasa
-            texto = f"{prod['codigo']} - {prod['nombre']} | {formato_usd(prod['precio_usd'])} | {formato_bs(precio_bs)}"
-            
-            btn = ctk.CTkButton(
-                self.frame_sugerencias,
-                text=texto,
-                anchor="w",
-                fg_color="gray30",
-                hover_color="gray40",
-                command=lambda p=prod: self.agregar_al_carrito(p)
-            )
-            btn.pack(fill="x", padx=5, pady=2)
+        self.sugerencias.programar(separar_cantidad(self.entry_buscar.get())[1])
+    
+    def _es_rafaga(self, event) -> bool:
+        """Cuenta las teclas soltadas en ráfaga; True si parece un lector."""
+        momento = getattr(event, 'time', None)
+        if not isinstance(momento, int):
+            return False
+        if self._ultima_tecla is not None and 0 <= momento - self._ultima_tecla <= UMBRAL_RAFAGA_MS:
+            self._teclas_rafaga += 1
+        else:
+            self._teclas_rafaga = 1
+            self._inicio_rafaga = time.perf_counter()
+        self._ultima_tecla = momento
+        return self._teclas_rafaga >= MIN_TECLAS_RAFAGA
+    
+    def _elegir_sugerencia(self, producto: dict):
+        """Agrega la sugerencia elegida con el multiplicador escrito (6*azu...)."""
+        if self._registrando:
+            return
+        self.agregar_al_carrito(producto, cantidad=separar_cantidad(self.entry_buscar.get())[0])
+    
+    def _texto_sugerencia(self, prod: dict) -> str:
+        """Etiqueta de un botón de sugerencia."""
+        precio_bs = prod['precio_usd'] * self.tasa
+        return f"{prod['codigo']} - {prod['nombre']} | {formato_usd(prod['precio_usd'])} | {formato_bs(precio_bs)}"
     
     def buscar_producto(self, event=None):
-        """Busca un producto por código exacto."""
-        codigo = self.entry_buscar.get().strip()
+        """Busca un producto por código exacto ('6*7591234' agrega 6 unidades)."""
+        if self._registrando:
+            return
+        escaneado = self._teclas_rafaga >= MIN_TECLAS_RAFAGA
+        # Para un lector la latencia cuenta desde su primera tecla
+        inicio = self._inicio_rafaga if escaneado else time.perf_counter()
+        self._teclas_rafaga = 0
+        self._ultima_tecla = None
+        
+        cantidad, codigo = separar_cantidad(self.entry_buscar.get())
         if not codigo:
             return
         
-        producto = get_producto_por_codigo(codigo)
+        catalogo = get_catalogo()
+        producto = catalogo.get_por_codigo(codigo)
+        if producto is None and catalogo.sincronizar():
+            # Puede ser un producto recién creado en otra caja
+            producto = catalogo.get_por_codigo(codigo)
+        if producto is None and not escaneado:
+            # Lo escribió una persona: buscar también por nombre
+            productos = buscar_productos(codigo, limite=1)
+            producto = productos[0] if productos else None
+        
         if producto:
-            self.agregar_al_carrito(producto)
+            self.agregar_al_carrito(producto, inicio, cantidad)
         else:
-            # Mostrar sugerencias si no es código exacto
-            productos = buscar_productos(codigo)
-            if productos:
-                self.agregar_al_carrito(productos[0])
-            else:
-                CTkMessagebox(title="No encontrado", message="Producto no encontrado", icon="warning")
+            if escaneado:
+                self.entry_buscar.delete(0, 'end')  # Que no se pegue al próximo escaneo
+            CTkMessagebox(title="No encontrado", message="Producto no encontrado", icon="warning")
     
-    def agregar_al_carrito(self, producto: dict):
-        """Agrega un producto al carrito."""
-        self.frame_sugerencias.grid_remove()
+    def agregar_al_carrito(self, producto: dict, inicio: float = None, cantidad: int = 1):
+        """
+        Agrega `cantidad` unidades de un producto al carrito. Sólo crea o
+        actualiza la línea de ese producto; `inicio` (perf_counter del
+        escaneo) mide la latencia hasta que la línea queda en pantalla.
+        """
+        if self._registrando:
+            return
+        if inicio is None:
+            inicio = time.perf_counter()
+        self.sugerencias.cancelar()
         self.entry_buscar.delete(0, 'end')
         
         # Obtener stock actual y cantidad ya en carrito
         stock_actual = producto.get('stock_actual', 0)
-        cantidad_en_carrito = 0
+        item = self.carrito.obtener(producto['id'])
+        cantidad_en_carrito = item['cantidad'] if item else 0
         
-        for item in self.carrito:
-            if item['producto_id'] == producto['id']:
-                cantidad_en_carrito = item['cantidad']
-                break
-        
-        nueva_cantidad = cantidad_en_carrito + 1
+        nueva_cantidad = cantidad_en_carrito + cantidad
         
         # Verificar si hay stock suficiente
         if nueva_cantidad > stock_actual:
@@ -402,132 +482,137 @@ class POSView(ctk.CTkFrame):
             )
             if msg.get() != "Agregar":
                 return
+            inicio = None  # El tiempo del diálogo no cuenta como latencia
         
-        # Verificar si ya está en el carrito
-        for item in self.carrito:
-            if item['producto_id'] == producto['id']:
-                item['cantidad'] += 1
-                item['total_linea_usd'] = item['cantidad'] * item['precio_unit_usd']
-                self.actualizar_tabla_carrito()
-                self.calcular_totales()
-                return
-        
-        # Agregar nuevo item
-        item = {
-            'producto_id': producto['id'],
-            'codigo': producto['codigo'],
-            'nombre_producto': producto['nombre'],
-            'cantidad': 1,
-            'precio_unit_usd': producto['precio_usd'],
-            'descuento': 0,
-            'total_linea_usd': producto['precio_usd'],
-            'stock_disponible': stock_actual  # Guardar para referencia
-        }
-        self.carrito.append(item)
-        self.actualizar_tabla_carrito()
+        self.carrito.agregar(
+            producto['id'], producto['nombre'], cantidad, producto['precio_usd'],
+            codigo=producto['codigo'],
+            descuento=0,
+            stock_disponible=stock_actual  # Guardar para referencia
+        )
+        self._actualizar_fila_carrito(producto['id'])
         self.calcular_totales()
+        
+        if inicio is not None:
+            # Los redibujos pendientes corren antes que este after_idle
+            self.after_idle(lambda: self.latencia_escaneo.registrar(
+                (time.perf_counter() - inicio) * 1000))
+    
+    def _actualizar_fila_carrito(self, producto_id: int):
+        """Deja la línea de un producto en la tabla como está en el carrito (crear, actualizar o quitar)."""
+        item = self.carrito.obtener(producto_id)
+        widgets = self._filas_carrito.get(producto_id)
+        if item is None:
+            if widgets is not None:
+                for widget in self._filas_carrito.pop(producto_id).values():
+                    widget.destroy()
+        elif widgets is None:
+            self._crear_fila_carrito(item)
+        else:
+            widgets['cantidad'].configure(text=str(item['cantidad']))
+            widgets['total'].configure(text=formato_usd(item['total_linea_usd']))
     
-    def actualizar_tabla_carrito(self):
-        """Actualiza la tabla del carrito."""
-        # Limpiar tabla
-        for widget in self.frame_tabla_carrito.winfo_children():
-            widget.destroy()
+    def _crear_fila_carrito(self, item: dict):
+        """Crea los widgets de una línea en su fila de la tabla (su posición en el carrito)."""
+        producto_id = item['producto_id']
+        fila = self.carrito.posicion(producto_id)  # Fila 0 = encabezados
+        precio_bs = item['precio_unit_usd'] * self.tasa
+        widgets = {}
+        
+        widgets['codigo'] = ctk.CTkLabel(
+            self.frame_tabla_carrito, text=item['codigo'],
+            padx=5, pady=3
+        )
+        widgets['codigo'].grid(row=fila, column=0, sticky="ew")
         
-        # Headers
-        headers = ["Código", "Producto", "Cant", "P.Unit $", "P.Unit Bs", "Total $", ""]
-        for i, header in enumerate(headers):
-            ctk.CTkLabel(
-                self.frame_tabla_carrito,
-                text=header,
-                font=ctk.CTkFont(size=11, weight="bold"),
-                fg_color=BG_HOVER,
-                text_color=TEXT_SECONDARY,
-                padx=5,
-                pady=5
-            ).grid(row=0, column=i, sticky="ew", padx=1, pady=1)
+        widgets['nombre'] = ctk.CTkLabel(
+            self.frame_tabla_carrito, text=item['nombre_producto'][:20],
+            padx=5, pady=3
+        )
+        widgets['nombre'].grid(row=fila, column=1, sticky="ew")
         
-        # Productos
-        for idx, item in enumerate(self.carrito, start=1):
-            precio_bs = item['precio_unit_usd'] * self.tasa
-            
-            ctk.CTkLabel(
-                self.frame_tabla_carrito, text=item['codigo'],
-                padx=5, pady=3
-            ).grid(row=idx, column=0, sticky="ew")
-            
-            ctk.CTkLabel(
-                self.frame_tabla_carrito, text=item['nombre_producto'][:20],
-                padx=5, pady=3
-            ).grid(row=idx, column=1, sticky="ew")
-            
-            # Cantidad con botones +/-
-            frame_cant = ctk.CTkFrame(self.frame_tabla_carrito, fg_color="transparent")
-            frame_cant.grid(row=idx, column=2)
-            
-            ctk.CTkButton(
-                frame_cant, text="-", width=25, height=25,
-                command=lambda i=idx-1: self.modificar_cantidad(i, -1)
-            ).pack(side="left", padx=1)
-            
-            ctk.CTkLabel(frame_cant, text=str(item['cantidad']), width=30).pack(side="left")
-            
-            ctk.CTkButton(
-                frame_cant, text="+", width=25, height=25,
-                command=lambda i=idx-1: self.modificar_cantidad(i, 1)
-            ).pack(side="left", padx=1)
-            
-            ctk.CTkLabel(
-                self.frame_tabla_carrito,
-                text=formato_usd(item['precio_unit_usd']),
-                text_color="#0ea5e9",
-                padx=5, pady=3
-            ).grid(row=idx, column=3, sticky="ew")
-            
-            ctk.CTkLabel(
-                self.frame_tabla_carrito,
-                text=formato_bs(precio_bs),
-                text_color="#ffa500",
-                padx=5, pady=3
-            ).grid(row=idx, column=4, sticky="ew")
-            
-            ctk.CTkLabel(
-                self.frame_tabla_carrito,
-                text=formato_usd(item['total_linea_usd']),
-                text_color="#0ea5e9",
-                padx=5, pady=3
-            ).grid(row=idx, column=5, sticky="ew")
-            
-            ctk.CTkButton(
-                self.frame_tabla_carrito,
-                text="🗑️", width=30, height=25,
-                fg_color="#dc3545",
-                command=lambda i=idx-1: self.eliminar_del_carrito(i)
-            ).grid(row=idx, column=6)
+        # Cantidad con botones +/-
+        frame_cant = ctk.CTkFrame(self.frame_tabla_carrito, fg_color="transparent")
+        frame_cant.grid(row=fila, column=2)
+        widgets['frame_cant'] = frame_cant
+        
+        ctk.CTkButton(
+            frame_cant, text="-", width=25, height=25,
+            command=lambda: self.modificar_cantidad(producto_id, -1)
+        ).pack(side="left", padx=1)
+        
+        widgets['cantidad'] = ctk.CTkLabel(frame_cant, text=str(item['cantidad']), width=30)
+        widgets['cantidad'].pack(side="left")
+        
+        ctk.CTkButton(
+            frame_cant, text="+", width=25, height=25,
+            command=lambda: self.modificar_cantidad(producto_id, 1)
+        ).pack(side="left", padx=1)
+        
+        widgets['precio_usd'] = ctk.CTkLabel(
+            self.frame_tabla_carrito,
+            text=formato_usd(item['precio_unit_usd']),
+            text_color="#0ea5e9",
+            padx=5, pady=3
+        )
+        widgets['precio_usd'].grid(row=fila, column=3, sticky="ew")
+        
+        widgets['precio_bs'] = ctk.CTkLabel(
+            self.frame_tabla_carrito,
+            text=formato_bs(precio_bs),
+            text_color="#ffa500",
+            padx=5, pady=3
+        )
+        widgets['precio_bs'].grid(row=fila, column=4, sticky="ew")
+        
+        widgets['total'] = ctk.CTkLabel(
+            self.frame_tabla_carrito,
+            text=formato_usd(item['total_linea_usd']),
+            text_color="#0ea5e9",
+            padx=5, pady=3
+        )
+        widgets['total'].grid(row=fila, column=5, sticky="ew")
+        
+        widgets['eliminar'] = ctk.CTkButton(
+            self.frame_tabla_carrito,
+            text="🗑️", width=30, height=25,
+            fg_color="#dc3545",
+            command=lambda: self.eliminar_del_carrito(producto_id)
+        )
+        widgets['eliminar'].grid(row=fila, column=6)
+        
+        self._filas_carrito[producto_id] = widgets
     
-    def modificar_cantidad(self, index: int, delta: int):
+    def modificar_cantidad(self, producto_id: int, delta: int):
         """Modifica la cantidad de un producto en el carrito."""
-        if 0 <= index < len(self.carrito):
-            self.carrito[index]['cantidad'] += delta
-            if self.carrito[index]['cantidad'] <= 0:
-                self.eliminar_del_carrito(index)
-            else:
-                self.carrito[index]['total_linea_usd'] = (
-                    self.carrito[index]['cantidad'] * self.carrito[index]['precio_unit_usd']
-                )
-                self.actualizar_tabla_carrito()
-                self.calcular_totales()
+        if self._registrando:
+            return
+        self.carrito.cambiar_cantidad(producto_id, delta)
+        self._actualizar_fila_carrito(producto_id)
+        self.calcular_totales()
     
-    def eliminar_del_carrito(self, index: int):
+    def eliminar_del_carrito(self, producto_id: int):
         """Elimina un producto del carrito."""
-        if 0 <= index < len(self.carrito):
-            del self.carrito[index]
-            self.actualizar_tabla_carrito()
+        if self._registrando:
+            return
+        self.carrito.eliminar(producto_id)
+        self._actualizar_fila_carrito(producto_id)
+        self.calcular_totales()
+    
+    def deshacer_carrito(self, event=None):
+        """Deshace la última operación sobre el carrito (Ctrl+Z)."""
+        if self._registrando:
+            return "break"
+        producto_id = self.carrito.deshacer()
+        if producto_id is not None:
+            self._actualizar_fila_carrito(producto_id)
             self.calcular_totales()
+        return "break"
     
     def calcular_totales(self):
-        """Calcula y muestra los totales."""
-        subtotal_usd = sum(item['total_linea_usd'] for item in self.carrito)
-        iva_usd = subtotal_usd * self.iva_porcentaje
+        """Muestra los totales (sumas corrientes del carrito)."""
+        subtotal_usd = self.carrito.subtotal_usd
+        iva_usd = self.carrito.iva_usd
         total_usd = subtotal_usd + iva_usd
         
         subtotal_bs = subtotal_usd * self.tasa
@@ -583,8 +668,21 @@ class POSView(ctk.CTkFrame):
     
     def limpiar_carrito(self):
         """Limpia el carrito."""
-        self.carrito = []
-        self.actualizar_tabla_carrito()
+        if self._registrando:
+            return
+        if len(self.carrito) >= 50:
+            resumen = self.latencia_escaneo.resumen()
+            print(f"🛒 Ticket de {len(self.carrito)} líneas: escaneo→pantalla "
+                  f"p50 {resumen['p50_ms']:.1f} ms, p99 {resumen['p99_ms']:.1f} ms")
+        if self.latencia_escaneo.percentil(99) > OBJETIVO_ESCANEO_MS:
+            print(f"🐢 Escaneo→carrito p99 {self.latencia_escaneo.percentil(99):.1f} ms "
+                  f"(objetivo {OBJETIVO_ESCANEO_MS} ms)")
+        for widgets in self._filas_carrito.values():
+            for widget in widgets.values():
+                widget.destroy()
+        self._filas_carrito.clear()
+        self.carrito.limpiar()
+        self.latencia_escaneo.reiniciar()
         self.calcular_totales()
         self.entry_monto_recibido.delete(0, 'end')
         self.entry_referencia.delete(0, 'end')
@@ -619,32 +717,61 @@ class POSView(ctk.CTkFrame):
         if msg.get() != "Confirmar":
             return
         
-        try:
-            venta_id = crear_venta(
+        # Registrar en el hilo escritor; la interfaz sigue respondiendo, pero el
+        # carrito queda bloqueado hasta la respuesta (se vacía al confirmar)
+        self.btn_cobrar.configure(state="disabled", text="⏳ PROCESANDO...")
+        self._bloquear_carrito(True)
+        tasa = self.tasa
+        
+        get_escritor().enviar_tk(
+            self,
+            crear_venta,
+            kwargs=dict(
                 subtotal_usd=self.subtotal_usd,
                 iva_usd=self.iva_usd,
                 total_usd=self.total_usd,
-                tasa_cambio=self.tasa,
+                tasa_cambio=tasa,
                 total_bs=self.total_bs,
                 forma_pago=forma_pago,
-                detalles=self.carrito,
+                detalles=self.carrito.detalles(),
                 cliente_id=self.cliente_seleccionado_id,
                 referencia_pago=referencia,
                 monto_recibido=monto_recibido,
                 vuelto=vuelto
-            )
-            
-            CTkMessagebox(
-                title="Venta Exitosa",
-                message=f"Venta registrada correctamente\n\nVuelto: {formato_usd(vuelto)} / {formato_bs(vuelto * self.tasa)}",
-                icon="check"
-            )
-            
-            self.limpiar_carrito()
-            
-        except Exception as e:
-            CTkMessagebox(
-                title="Error",
-                message=f"Error al procesar la venta: {str(e)}",
-                icon="cancel"
-            )
+            ),
+            al_terminar=lambda venta_id: self._venta_registrada(vuelto, tasa),
+            al_fallar=self._venta_fallida
+        )
+    
+    def _bloquear_carrito(self, bloquear: bool):
+        """Bloquea (o libera) la búsqueda y toda edición del carrito mientras se registra la venta."""
+        self._registrando = bloquear
+        if bloquear:
+            self.sugerencias.cancelar()
+        self.entry_buscar.configure(state="disabled" if bloquear else "normal")
+        if not bloquear:
+            self.entry_buscar.focus_set()
+    
+    def _venta_registrada(self, vuelto: float, tasa: float):
+        """Muestra la confirmación de la venta (hilo de la interfaz)."""
+        self.btn_cobrar.configure(state="normal", text="💳 COBRAR")
+        self._bloquear_carrito(False)
+        
+        CTkMessagebox(
+            title="Venta Exitosa",
+            message=f"Venta registrada correctamente\n\nVuelto: {formato_usd(vuelto)} / {formato_bs(vuelto * tasa)}",
+            icon="check"
+        )
+        
+        self.limpiar_carrito()
+    
+    def _venta_fallida(self, error: Exception):
+        """Informa el error al registrar la venta (hilo de la interfaz)."""
+        self.btn_cobrar.configure(state="normal", text="💳 COBRAR")
+        self._bloquear_carrito(False)
+        
+        CTkMessagebox(
+            title="Error",
+            message=f"Error al procesar la venta: {str(error)}",
+            icon="cancel"
+        )
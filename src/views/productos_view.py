@@ -9,15 +9,17 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
 from database import (
-    get_productos, get_categorias, crear_producto, generar_codigo_producto,
+    get_categorias, crear_producto, generar_codigo_producto,
     actualizar_producto, eliminar_producto, get_tasa_actual
 )
+from utils.catalogo import get_catalogo
 from utils.currency import formato_usd, formato_bs, usd_a_bs
 from utils.theme import (
-    BG_PRINCIPAL, BG_SECUNDARIO, BG_HOVER, BORDER_COLOR,
-    TEXT_PRIMARY, TEXT_SECONDARY, ACCENT_PRIMARY
+    BG_PRINCIPAL, BG_SECUNDARIO, BORDER_COLOR,
+    TEXT_PRIMARY, ACCENT_PRIMARY
 )
 from utils.excel_import import ImportDialog, generar_plantilla_excel
+from views.virtual_grid import VirtualGrid, Columna
 from tkinter import filedialog
 
 
@@ -29,6 +31,7 @@ class ProductosView(ctk.CTkFrame):
         self.app = app_controller
         self.productos = []
         self.categorias = []
+        self._version_catalogo = None
         
         # Formulario pre-creado (oculto) para evitar parpadeo
         self.formulario_producto = None
@@ -38,6 +41,10 @@ class ProductosView(ctk.CTkFrame):
         
         # Pre-crear el formulario DESPUÉS de cargar datos (para tener las categorías)
         self._pre_crear_formulario()
+        
+        # Cambios hechos desde otras vistas (ventas, compras, importación...)
+        get_catalogo().suscribir(self._al_cambiar_catalogo)
+        self.bind("<Destroy>", self._al_destruir, add="+")
     
     def setup_ui(self):
         """Configura la interfaz de productos."""
@@ -104,148 +111,77 @@ class ProductosView(ctk.CTkFrame):
         self.entry_buscar.bind("<KeyRelease>", self.buscar_productos)
         
         # === TABLA DE PRODUCTOS ===
-        self.frame_tabla = ctk.CTkScrollableFrame(self)
-        self.frame_tabla.grid(row=1, column=0, sticky="nsew", padx=10, pady=10)
-        
-        # Configurar columnas
-        for i in range(7):
-            self.frame_tabla.grid_columnconfigure(i, weight=1)
+        # Virtual: sólo existen widgets para las filas visibles
+        self.tasa = get_tasa_actual()
+        self.grid_productos = VirtualGrid(self, [
+            Columna("Código", lambda p: p['codigo'], ancho=110),
+            Columna("Nombre", lambda p: p['nombre'], ancho=200, peso=3, alinear="w"),
+            Columna("Categoría", lambda p: p.get('categoria_nombre') or '-', ancho=120),
+            Columna("Precio USD", lambda p: formato_usd(p['precio_usd']), ancho=100,
+                    color=lambda p: ACCENT_PRIMARY, orden=lambda p: p['precio_usd']),
+            Columna("Precio Bs", lambda p: formato_bs(p['precio_usd'] * self.tasa), ancho=120,
+                    color=lambda p: "#ffa500", orden=lambda p: p['precio_usd']),
+            Columna("Stock", lambda p: str(p['stock_actual']), ancho=70,
+                    color=lambda p: "#ff4444" if p['stock_actual'] <= p['stock_minimo'] else None,
+                    orden=lambda p: p['stock_actual']),
+            Columna("Acciones", ancho=90, peso=0, acciones=[
+                {'texto': "✏️", 'comando': self.editar_producto},
+                {'texto': "🗑️", 'comando': self.eliminar_producto,
+                 'fg_color': "#e74c3c", 'hover_color': "#c0392b"},
+            ]),
+        ])
+        self.grid_productos.grid(row=1, column=0, sticky="nsew", padx=10, pady=10)
     
     def cargar_datos(self):
-        """Carga los productos de la base de datos."""
-        self.productos = get_productos()
+        """Carga los productos del catálogo en memoria."""
+        catalogo = get_catalogo()
+        self._version_catalogo = catalogo.version
+        self.productos = catalogo.get_productos()
         self.categorias = get_categorias()
-        self.mostrar_productos()
+        self.buscar_productos(conservar_posicion=True)
+    
+    def refrescar(self):
+        """Vuelve a mostrar los productos si el catálogo cambió desde la última carga."""
+        catalogo = get_catalogo()
+        catalogo.sincronizar()  # Cambios de otros procesos (registro de cambios)
+        if catalogo.version != self._version_catalogo:
+            self.cargar_datos()
     
-    def mostrar_productos(self, productos=None):
+    def _al_cambiar_catalogo(self, version, accion, producto_ids):
+        """Callback del catálogo (hilo de la escritura): pasa al hilo de la interfaz."""
+        try:
+            self.after(0, self._catalogo_cambiado)
+        except Exception:
+            pass  # La vista se está cerrando
+    
+    def _catalogo_cambiado(self):
+        """Refresca sólo si la vista está visible; si no, lo hará refrescar() al mostrarla."""
+        if self.winfo_exists() and self.winfo_ismapped():
+            self.refrescar()
+    
+    def _al_destruir(self, event):
+        """Deja de escuchar el catálogo al cerrar la vista."""
+        if event.widget is self:
+            get_catalogo().desuscribir(self._al_cambiar_catalogo)
+    
+    def mostrar_productos(self, productos=None, conservar_posicion: bool = False):
         """Muestra los productos en la tabla."""
-        # Limpiar tabla
-        for widget in self.frame_tabla.winfo_children():
-            widget.destroy()
-        
-        # Headers
-        headers = ["Código", "Nombre", "Categoría", "Precio USD", "Precio Bs", "Stock", "Acciones"]
-        for i, header in enumerate(headers):
-            lbl = ctk.CTkLabel(
-                self.frame_tabla,
-                text=header,
-                font=ctk.CTkFont(weight="bold"),
-                fg_color=BG_HOVER,
-                text_color=TEXT_SECONDARY,
-                corner_radius=5,
-                padx=10,
-                pady=8
-            )
-            lbl.grid(row=0, column=i, sticky="ew", padx=2, pady=2)
-        
-        # Datos
+        self.tasa = get_tasa_actual()
         productos_mostrar = productos if productos is not None else self.productos
-        tasa = get_tasa_actual()
-        
-        for idx, prod in enumerate(productos_mostrar, start=1):
-            # Código
-            ctk.CTkLabel(
-                self.frame_tabla,
-                text=prod['codigo'],
-                fg_color="gray20" if idx % 2 == 0 else "transparent",
-                padx=10,
-                pady=5
-            ).grid(row=idx, column=0, sticky="ew", padx=2)
-            
-            # Nombre
-            ctk.CTkLabel(
-                self.frame_tabla,
-                text=prod['nombre'],
-                fg_color="gray20" if idx % 2 == 0 else "transparent",
-                padx=10,
-                pady=5
-            ).grid(row=idx, column=1, sticky="ew", padx=2)
-            
-            # Categoría
-            ctk.CTkLabel(
-                self.frame_tabla,
-                text=prod.get('categoria_nombre', '-'),
-                fg_color="gray20" if idx % 2 == 0 else "transparent",
-                padx=10,
-                pady=5
-            ).grid(row=idx, column=2, sticky="ew", padx=2)
-            
-            # Precio USD
-            precio_usd = prod['precio_usd']
-            ctk.CTkLabel(
-                self.frame_tabla,
-                text=formato_usd(precio_usd),
-                fg_color="gray20" if idx % 2 == 0 else "transparent",
-                text_color=ACCENT_PRIMARY,
-                padx=10,
-                pady=5
-            ).grid(row=idx, column=3, sticky="ew", padx=2)
-            
-            # Precio Bs
-            precio_bs = precio_usd * tasa
-            ctk.CTkLabel(
-                self.frame_tabla,
-                text=formato_bs(precio_bs),
-                fg_color="gray20" if idx % 2 == 0 else "transparent",
-                text_color="#ffa500",
-                padx=10,
-                pady=5
-            ).grid(row=idx, column=4, sticky="ew", padx=2)
-            
-            # Stock
-            stock = prod['stock_actual']
-            stock_min = prod['stock_minimo']
-            color_stock = "#ff4444" if stock <= stock_min else "white"
-            ctk.CTkLabel(
-                self.frame_tabla,
-                text=str(stock),
-                fg_color="gray20" if idx % 2 == 0 else "transparent",
-                text_color=color_stock,
-                padx=10,
-                pady=5
-            ).grid(row=idx, column=5, sticky="ew", padx=2)
-            
-            # Acciones
-            frame_acciones = ctk.CTkFrame(
-                self.frame_tabla,
-                fg_color="gray20" if idx % 2 == 0 else "transparent"
-            )
-            frame_acciones.grid(row=idx, column=6, sticky="ew", padx=2)
-            
-            ctk.CTkButton(
-                frame_acciones,
-                text="✏️",
-                width=30,
-                height=25,
-                fg_color="#3a4a6b",
-                hover_color="#4a5a7b",
-                text_color="#ffffff",
-                command=lambda p=prod: self.editar_producto(p)
-            ).pack(side="left", padx=2, pady=2)
-            
-            ctk.CTkButton(
-                frame_acciones,
-                text="🗑️",
-                width=30,
-                height=25,
-                fg_color="#e74c3c",
-                hover_color="#c0392b",
-                text_color="#ffffff",
-                command=lambda p=prod: self.eliminar_producto(p)
-            ).pack(side="left", padx=2, pady=2)
+        self.grid_productos.set_filas(productos_mostrar, conservar_posicion=conservar_posicion)
     
-    def buscar_productos(self, event=None):
+    def buscar_productos(self, event=None, conservar_posicion: bool = False):
         """Filtra productos según el término de búsqueda."""
         termino = self.entry_buscar.get().strip().lower()
         if not termino:
-            self.mostrar_productos()
+            self.mostrar_productos(conservar_posicion=conservar_posicion)
             return
         
         filtrados = [
             p for p in self.productos
             if termino in p['codigo'].lower() or termino in p['nombre'].lower()
         ]
-        self.mostrar_productos(filtrados)
+        self.mostrar_productos(filtrados, conservar_posicion=conservar_posicion)
     
     def _pre_crear_formulario(self):
         """Pre-crea el formulario de producto oculto para evitar parpadeo."""
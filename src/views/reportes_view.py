@@ -10,17 +10,16 @@ import os
 from tkinter import filedialog
 from pathlib import Path
 
-try:
-    from openpyxl import Workbook
-    from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-    from openpyxl.utils import get_column_letter
-    OPENPYXL_AVAILABLE = True
-except ImportError:
-    OPENPYXL_AVAILABLE = False
+import importlib.util
+
+# openpyxl se importa al exportar: tarda en cargar y la vista no lo necesita para abrir
+OPENPYXL_AVAILABLE = importlib.util.find_spec("openpyxl") is not None
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from database import get_connection, get_tasa_actual, get_productos
+from database import (get_connection_lectura, get_tasa_actual, get_stock_a_fecha,
+                      get_resumen_ventas)
+from utils.catalogo import get_catalogo
 from utils.currency import formato_usd, formato_bs
 from utils.theme import BG_PRINCIPAL, BG_SECUNDARIO, BORDER_COLOR, TEXT_PRIMARY, TEXT_SECONDARY, ACCENT_PRIMARY, BG_HOVER, ACCENT_HOVER
 
@@ -109,6 +108,22 @@ class ReportesView(ctk.CTkFrame):
             command=self.generar_reporte
         ).pack(side="left", padx=20)
         
+        # Stock a una fecha (por defecto, el cierre del mes anterior)
+        ctk.CTkButton(
+            frame_filtros,
+            text="📥 Exportar Stock",
+            fg_color="#6c757d",
+            hover_color="#545b62",
+            width=130,
+            command=self.exportar_stock_a_fecha
+        ).pack(side="right", padx=5)
+        
+        self.entry_fecha_stock = ctk.CTkEntry(frame_filtros, width=110, placeholder_text="AAAA-MM-DD")
+        self.entry_fecha_stock.pack(side="right", padx=5)
+        self.entry_fecha_stock.insert(0, (datetime.now().date().replace(day=1) - timedelta(days=1)).isoformat())
+        
+        ctk.CTkLabel(frame_filtros, text="Stock al:").pack(side="right", padx=5)
+        
         # === TARJETAS DE RESUMEN ===
         frame_resumen = ctk.CTkFrame(frame_contenido, fg_color="transparent")
         frame_resumen.grid(row=1, column=0, columnspan=2, sticky="nsew", padx=10, pady=10)
@@ -138,6 +153,10 @@ class ReportesView(ctk.CTkFrame):
         )
         self.tarjeta_productos.grid(row=0, column=3, padx=5, pady=5, sticky="ew")
         
+        # Desglose por forma de pago
+        self.lbl_formas_pago = ctk.CTkLabel(frame_resumen, text="", text_color=TEXT_SECONDARY)
+        self.lbl_formas_pago.grid(row=1, column=0, columnspan=4, padx=5, pady=(0, 5), sticky="w")
+        
         # === TABLA DE VENTAS ===
         frame_tabla = ctk.CTkFrame(frame_contenido, fg_color="transparent")
         frame_tabla.grid(row=2, column=0, columnspan=2, sticky="nsew", padx=10, pady=10)
@@ -244,41 +263,28 @@ class ReportesView(ctk.CTkFrame):
         
         self.tarjeta_productos.lbl_valor1.configure(text=str(productos))
         
+        self.lbl_formas_pago.configure(text="   ·   ".join(
+            f"{forma or 'Sin especificar'}: {formato_usd(pago['total_usd'])} ({pago['cantidad']})"
+            for forma, pago in sorted(datos['por_forma_pago'].items(), key=lambda p: -p[1]['total_usd'])
+        ))
+        
         # Actualizar tabla
         self.mostrar_ventas(datos['ventas'])
     
     def obtener_datos_ventas(self, fecha_inicio, fecha_fin):
-        """Obtiene datos de ventas del período."""
-        conn = get_connection()
+        """Obtiene datos de ventas del período (una sola instantánea de lectura)."""
+        # Totales y productos vendidos desde el resumen diario (suma días, no ventas;
+        # incluye todas las ventas, sin filtro de estado por ahora)
+        resumen = get_resumen_ventas(fecha_inicio, fecha_fin)
+        
+        conn = get_connection_lectura(instantanea=True, historico=True,
+                                      desde=fecha_inicio, hasta=fecha_fin)
         cursor = conn.cursor()
         
         # Formatear fechas para SQLite
         fecha_ini_str = f"{fecha_inicio.isoformat()} 00:00:00"
         fecha_fin_str = f"{fecha_fin.isoformat()} 23:59:59"
         
-        # Totales (incluir todas las ventas, sin filtro de estado por ahora)
-        cursor.execute('''
-            SELECT 
-                COUNT(*) as cantidad,
-                COALESCE(SUM(total_usd), 0) as total_usd
-            FROM ventas
-            WHERE fecha BETWEEN ? AND ?
-        ''', (fecha_ini_str, fecha_fin_str))
-        
-        row = cursor.fetchone()
-        cantidad = row['cantidad']
-        total_usd = row['total_usd']
-        
-        # Productos vendidos
-        cursor.execute('''
-            SELECT COALESCE(SUM(dv.cantidad), 0) as total_productos
-            FROM detalle_ventas dv
-            JOIN ventas v ON dv.venta_id = v.id
-            WHERE v.fecha BETWEEN ? AND ?
-        ''', (fecha_ini_str, fecha_fin_str))
-        
-        productos = cursor.fetchone()['total_productos']
-        
         # Lista de ventas
         cursor.execute('''
             SELECT numero_factura, fecha, total_usd, total_bs, forma_pago, 
@@ -294,9 +300,10 @@ class ReportesView(ctk.CTkFrame):
         conn.close()
         
         return {
-            'cantidad': cantidad,
-            'total_usd': total_usd,
-            'productos_vendidos': productos,
+            'cantidad': resumen['cantidad'],
+            'total_usd': resumen['total_usd'],
+            'productos_vendidos': resumen['unidades'],
+            'por_forma_pago': resumen['por_forma_pago'],
             'ventas': ventas
         }
     
@@ -394,6 +401,8 @@ class ReportesView(ctk.CTkFrame):
     
     def _crear_estilo_excel(self):
         """Crea estilos reutilizables para Excel."""
+        from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+        
         return {
             'header_font': Font(bold=True, color="FFFFFF", size=11),
             'header_fill': PatternFill(start_color="2E7D32", end_color="2E7D32", fill_type="solid"),
@@ -417,7 +426,7 @@ class ReportesView(ctk.CTkFrame):
             return
         
         # Obtener datos
-        conn = get_connection()
+        conn = get_connection_lectura(historico=True)
         cursor = conn.cursor()
         cursor.execute('''
             SELECT 
@@ -452,6 +461,9 @@ class ReportesView(ctk.CTkFrame):
             return
         
         try:
+            from openpyxl import Workbook
+            from openpyxl.utils import get_column_letter
+            
             wb = Workbook()
             ws = wb.active
             ws.title = "Ventas"
@@ -501,7 +513,7 @@ class ReportesView(ctk.CTkFrame):
             return
         
         # Obtener datos
-        conn = get_connection()
+        conn = get_connection_lectura()
         cursor = conn.cursor()
         cursor.execute('''
             SELECT 
@@ -538,6 +550,10 @@ class ReportesView(ctk.CTkFrame):
             return
         
         try:
+            from openpyxl import Workbook
+            from openpyxl.styles import PatternFill
+            from openpyxl.utils import get_column_letter
+            
             wb = Workbook()
             ws = wb.active
             ws.title = "Compras"
@@ -589,7 +605,7 @@ class ReportesView(ctk.CTkFrame):
             return
         
         # Obtener datos
-        productos = get_productos()
+        productos = get_catalogo().get_productos()
         
         if not productos:
             CTkMessagebox(title="Aviso", message="No hay productos en inventario.", icon="info")
@@ -608,6 +624,10 @@ class ReportesView(ctk.CTkFrame):
             return
         
         try:
+            from openpyxl import Workbook
+            from openpyxl.styles import PatternFill
+            from openpyxl.utils import get_column_letter
+            
             wb = Workbook()
             ws = wb.active
             ws.title = "Inventario"
@@ -651,3 +671,90 @@ class ReportesView(ctk.CTkFrame):
             )
         except Exception as e:
             CTkMessagebox(title="Error", message=f"Error al exportar:\n{str(e)}", icon="cancel")
+    
+    def exportar_stock_a_fecha(self):
+        """Exporta a Excel el stock y su valoración al cierre de la fecha indicada."""
+        if not OPENPYXL_AVAILABLE:
+            CTkMessagebox(
+                title="Error",
+                message="La librería openpyxl no está instalada.\nInstálela con: pip install openpyxl",
+                icon="cancel"
+            )
+            return
+        
+        try:
+            fecha = datetime.strptime(self.entry_fecha_stock.get().strip(), "%Y-%m-%d").date()
+        except ValueError:
+            CTkMessagebox(title="Error", message="Ingrese la fecha como AAAA-MM-DD.", icon="cancel")
+            return
+        
+        # Obtener datos (corte mensual más cercano + movimientos posteriores)
+        productos = get_stock_a_fecha(fecha)
+        
+        if not productos:
+            CTkMessagebox(title="Aviso", message="No hay productos registrados a esa fecha.", icon="info")
+            return
+        
+        # Seleccionar ubicación
+        ruta = filedialog.asksaveasfilename(
+            title="Guardar Stock a Fecha",
+            defaultextension=".xlsx",
+            initialfile=f"Stock_al_{fecha.strftime('%Y%m%d')}.xlsx",
+            filetypes=[("Archivo Excel", "*.xlsx")]
+        )
+        
+        if not ruta:
+            return
+        
+        try:
+            from openpyxl import Workbook
+            from openpyxl.styles import Font, PatternFill
+            from openpyxl.utils import get_column_letter
+            
+            wb = Workbook()
+            ws = wb.active
+            ws.title = f"Stock al {fecha.isoformat()}"
+            estilos = self._crear_estilo_excel()
+            estilos['header_fill'] = PatternFill(start_color="6c757d", end_color="6c757d", fill_type="solid")
+            
+            # Headers
+            headers = ["Código", "Nombre", "Categoría", "Stock", "Costo USD", "Valor USD", "Estado"]
+            for col, header in enumerate(headers, 1):
+                cell = ws.cell(row=1, column=col, value=header)
+                cell.font = estilos['header_font']
+                cell.fill = estilos['header_fill']
+                cell.alignment = estilos['header_alignment']
+                cell.border = estilos['border']
+            
+            # Datos
+            total_valor = 0
+            for row, prod in enumerate(productos, 2):
+                ws.cell(row=row, column=1, value=prod.get('codigo', ''))
+                ws.cell(row=row, column=2, value=prod.get('nombre', ''))
+                ws.cell(row=row, column=3, value=prod.get('categoria_nombre', ''))
+                ws.cell(row=row, column=4, value=prod.get('stock', 0))
+                ws.cell(row=row, column=5, value=prod.get('costo_usd', 0))
+                ws.cell(row=row, column=6, value=round(prod.get('valor_usd', 0), 2))
+                ws.cell(row=row, column=7, value="Activo" if prod.get('activo', 1) else "Inactivo")
+                total_valor += prod.get('valor_usd', 0)
+            
+            # Total de la valoración (a costo actual)
+            fila_total = len(productos) + 2
+            ws.cell(row=fila_total, column=5, value="TOTAL").font = Font(bold=True)
+            ws.cell(row=fila_total, column=6, value=round(total_valor, 2)).font = Font(bold=True)
+            
+            # Ajustar anchos
+            anchos = [12, 30, 15, 10, 12, 14, 10]
+            for col, ancho in enumerate(anchos, 1):
+                ws.column_dimensions[get_column_letter(col)].width = ancho
+            
+            wb.save(ruta)
+            CTkMessagebox(
+                title="Exportación Exitosa",
+                message=f"Se exportaron {len(productos)} productos.\n"
+                        f"Valor del inventario al {fecha.strftime('%d/%m/%Y')}: {formato_usd(total_valor)}\n\n"
+                        f"Archivo: {Path(ruta).name}",
+                icon="check"
+            )
+        except Exception as e:
+            CTkMessagebox(title="Error", message=f"Error al exportar:\n{str(e)}", icon="cancel")
@@ -0,0 +1,144 @@
+"""
+Sugerencias de Productos Mientras se Escribe - Diseño Minimalista
+Espera a que el usuario haga una pausa al escribir, busca en un hilo aparte
+y descarta los resultados de términos que ya fueron reemplazados. Los botones
+de sugerencia se crean una sola vez y se reutilizan en cada búsqueda.
+"""
+import sys
+import os
+import threading
+from typing import Callable, List, Optional
+
+import customtkinter as ctk
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from utils.search_index import buscar_sugerencias
+
+
+class SugerenciasProductos:
+    """
+    Lista fija de `limite` botones dentro de `frame`, alimentada en segundo plano.
+
+    Cada llamada a programar() reinicia la espera de `espera_ms`; al vencer,
+    el término pasa al hilo buscador, que sólo atiende el más reciente. Cada
+    término lleva un número de generación: un resultado cuya generación ya no
+    es la actual se descarta sin tocar la interfaz. texto(producto) arma la
+    etiqueta de cada botón y al_elegir(producto) se llama al hacer clic.
+    """
+
+    def __init__(self, frame, texto: Callable, al_elegir: Callable, limite: int = 5,
+                 espera_ms: int = 150, min_caracteres: int = 2, **estilo_boton):
+        self.frame = frame
+        self.texto = texto
+        self.al_elegir = al_elegir
+        self.limite = limite
+        self.espera_ms = espera_ms
+        self.min_caracteres = min_caracteres
+
+        self._generacion = 0
+        self._termino = ""                    # Último término pedido
+        self._espera = None                   # id del after() de la espera pendiente
+        self._productos: List[dict] = []      # Productos mostrados, uno por botón visible
+        self._pendiente: Optional[tuple] = None  # (generación, término) para el hilo buscador
+        self._condicion = threading.Condition()
+        self._hilo: Optional[threading.Thread] = None
+
+        estilo_boton.setdefault('anchor', "w")
+        self._botones = [
+            ctk.CTkButton(frame, text="", command=lambda i=i: self._elegir(i), **estilo_boton)
+            for i in range(limite)
+        ]
+
+    # ---------- Hilo de la interfaz ----------
+
+    def programar(self, termino: str):
+        """Pide sugerencias para `termino` cuando el usuario deje de escribir."""
+        termino = termino.strip()
+        if termino == self._termino:
+            return  # Teclas que no cambian el texto (flechas, Shift...)
+        self._termino = termino
+        self._generacion += 1
+        self._cancelar_espera()
+
+        if len(termino) < self.min_caracteres:
+            self._ocultar()
+            return
+        generacion = self._generacion
+        self._espera = self.frame.after(self.espera_ms, lambda: self._buscar(generacion, termino))
+
+    def cancelar(self):
+        """Descarta la búsqueda en curso y oculta las sugerencias."""
+        self._termino = ""
+        self._generacion += 1
+        self._cancelar_espera()
+        self._ocultar()
+
+    def _cancelar_espera(self):
+        if self._espera is not None:
+            self.frame.after_cancel(self._espera)
+            self._espera = None
+
+    def _buscar(self, generacion: int, termino: str):
+        """Pasa el término al hilo buscador (reemplaza al que no llegó a empezar)."""
+        self._espera = None
+        with self._condicion:
+            self._pendiente = (generacion, termino)
+            if self._hilo is None or not self._hilo.is_alive():
+                self._hilo = threading.Thread(target=self._bucle, name="Sugerencias", daemon=True)
+                self._hilo.start()
+            self._condicion.notify()
+
+    def _mostrar(self, generacion: int, productos: List[dict]):
+        """Actualiza los botones existentes con los productos encontrados."""
+        if generacion != self._generacion:
+            return  # Llegó tarde: el usuario siguió escribiendo
+        if not productos:
+            self._ocultar()
+            return
+
+        for i, boton in enumerate(self._botones):
+            if i < len(productos):
+                boton.configure(text=self.texto(productos[i]))
+                if i >= len(self._productos):
+                    boton.pack(fill="x", padx=5, pady=2)
+            elif i < len(self._productos):
+                boton.pack_forget()
+        self._productos = productos
+        self.frame.grid()
+
+    def _ocultar(self):
+        self.frame.grid_remove()
+        for boton in self._botones[:len(self._productos)]:
+            boton.pack_forget()
+        self._productos = []
+
+    def _elegir(self, indice: int):
+        if indice >= len(self._productos):
+            return
+        producto = self._productos[indice]
+        self.cancelar()
+        self.al_elegir(producto)
+
+    # ---------- Hilo buscador ----------
+
+    def _bucle(self):
+        """Atiende el término pendiente más reciente; los intermedios se saltan."""
+        while True:
+            with self._condicion:
+                while self._pendiente is None:
+                    self._condicion.wait()
+                generacion, termino = self._pendiente
+                self._pendiente = None
+
+            if generacion != self._generacion:
+                continue
+            try:
+                productos = buscar_sugerencias(termino, limite=self.limite)
+            except Exception as e:
+                print(f"Error buscando sugerencias: {e}")
+                productos = []
+            try:
+                self.frame.after(0, lambda g=generacion, p=productos: self._mostrar(g, p))
+            except Exception:
+                return  # La ventana se cerró
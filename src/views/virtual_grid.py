@@ -0,0 +1,346 @@
+"""
+Tabla Virtual Reutilizable - Diseño Minimalista
+Muestra listas grandes creando widgets sólo para las filas visibles (más un
+pequeño margen). Al desplazarse, las filas que salen de la vista se reutilizan
+para las que entran: la cantidad de widgets no depende del largo de la lista.
+"""
+import sys
+import os
+from typing import Callable, List, Optional
+
+import customtkinter as ctk
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from utils.theme import BG_SECUNDARIO, BG_HOVER, TEXT_PRIMARY, TEXT_SECONDARY
+
+# Ancho aproximado de un carácter de la fuente por defecto (para recortar textos)
+_ANCHO_CARACTER = 7
+_COLOR_FILA_PAR = "gray20"
+_EVENTOS_RUEDA = ("<MouseWheel>", "<Button-4>", "<Button-5>")
+
+
+class Columna:
+    """
+    Definición de una columna de VirtualGrid.
+
+    texto(fila) -> str da el contenido de la celda y color(fila) su color de
+    texto (None = color normal). orden(fila) da la clave para ordenar al
+    hacer clic en el encabezado; si falta se ordena por el texto. Una
+    columna con acciones muestra botones: cada acción es un dict con
+    'texto', 'comando' (recibe la fila) y opcionalmente 'fg_color' y
+    'hover_color'.
+    """
+
+    def __init__(self, titulo: str, texto: Callable = None, ancho: int = 100, peso: int = 1,
+                 color: Callable = None, orden: Callable = None, ordenable: bool = True,
+                 alinear: str = "center", acciones: List[dict] = None):
+        self.titulo = titulo
+        self.texto = texto or (lambda fila: '')
+        self.ancho = ancho
+        self.peso = peso
+        self.color = color
+        self.orden = orden
+        self.acciones = acciones
+        self.ordenable = ordenable and not acciones
+        self.alinear = alinear
+
+
+class _FilaVisible:
+    """Widgets de una fila reutilizable y el índice de la fila que muestra."""
+
+    def __init__(self, frame, item: int, celdas: list):
+        self.frame = frame
+        self.item = item          # Ventana del canvas que contiene el frame
+        self.celdas = celdas      # Un widget por columna (label o frame de botones)
+        self.indice: Optional[int] = None
+        self.par: Optional[bool] = None
+
+
+class VirtualGrid(ctk.CTkFrame):
+    """
+    Tabla con encabezados ordenables y filas virtualizadas.
+
+    Las filas se dibujan en un canvas cuyo alto es el de la lista completa;
+    sólo existen widgets para las filas visibles más `margen` filas arriba y
+    abajo. Todas las filas tienen el mismo alto (alto_fila).
+    """
+
+    def __init__(self, master, columnas: List[Columna], alto_fila: int = 34, margen: int = 4,
+                 texto_vacio: str = "No hay datos para mostrar", **kwargs):
+        kwargs.setdefault('fg_color', BG_SECUNDARIO)
+        super().__init__(master, **kwargs)
+        self.columnas = columnas
+        self.alto_fila = alto_fila
+        self.margen = margen
+        self.texto_vacio = texto_vacio
+
+        self._filas: list = []                # Filas en el orden mostrado
+        self._visibles: List[_FilaVisible] = []
+        self._posiciones: List[tuple] = []    # (x, ancho) de cada columna
+        self._ancho = 0
+        self._orden_columna: Optional[int] = None
+        self._orden_descendente = False
+
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(1, weight=1)
+
+        # Encabezados
+        self._frame_encabezado = ctk.CTkFrame(self, fg_color="transparent", height=alto_fila + 6)
+        self._frame_encabezado.grid(row=0, column=0, sticky="ew", pady=(2, 4))
+        self._encabezados = []
+        for i, columna in enumerate(columnas):
+            if columna.ordenable:
+                celda = ctk.CTkButton(
+                    self._frame_encabezado, text=columna.titulo, height=alto_fila,
+                    font=ctk.CTkFont(weight="bold"), fg_color=BG_HOVER, hover_color="gray25",
+                    text_color=TEXT_SECONDARY, corner_radius=5,
+                    command=lambda i=i: self.ordenar_por(i)
+                )
+            else:
+                celda = ctk.CTkLabel(
+                    self._frame_encabezado, text=columna.titulo, height=alto_fila,
+                    font=ctk.CTkFont(weight="bold"), fg_color=BG_HOVER,
+                    text_color=TEXT_SECONDARY, corner_radius=5
+                )
+            self._encabezados.append(celda)
+
+        # Cuerpo: canvas con las filas y barra de desplazamiento
+        self._canvas = ctk.CTkCanvas(self, bg=BG_SECUNDARIO, highlightthickness=0,
+                                     yscrollincrement=alto_fila)
+        self._canvas.grid(row=1, column=0, sticky="nsew")
+        self._scrollbar = ctk.CTkScrollbar(self, command=self._canvas.yview)
+        self._scrollbar.grid(row=1, column=1, sticky="ns")
+        self._canvas.configure(yscrollcommand=self._al_desplazar)
+        self._item_vacio = self._canvas.create_text(0, 0, text="", fill="gray", anchor="n")
+
+        self._canvas.bind("<Configure>", self._al_redimensionar)
+
+        # La rueda se enlaza a una etiqueta propia que llevan el canvas y los
+        # widgets de cada fila, y se quita al destruir la tabla
+        self._etiqueta_rueda = f"VirtualGridRueda{id(self)}"
+        for secuencia in _EVENTOS_RUEDA:
+            self.bind_class(self._etiqueta_rueda, secuencia, self._al_rueda)
+        self._etiquetar_rueda(self._canvas)
+        self._canvas.bind("<Destroy>", self._al_destruir_canvas, add="+")
+
+    # ---------- API ----------
+
+    def set_filas(self, filas: list, conservar_posicion: bool = False):
+        """
+        Reemplaza las filas mostradas (aplicando el orden elegido).
+
+        Con conservar_posicion la vista no vuelve al inicio: útil al
+        refrescar datos sin que el usuario pierda su lugar.
+        """
+        self._filas = list(filas)
+        self._aplicar_orden()
+        self._canvas.configure(scrollregion=(0, 0, self._ancho, len(self._filas) * self.alto_fila))
+        if not conservar_posicion:
+            self._canvas.yview_moveto(0)
+        self._canvas.itemconfigure(
+            self._item_vacio, text="" if self._filas else self.texto_vacio
+        )
+        self.refrescar_visibles()
+
+    def get_filas(self) -> list:
+        """Obtiene las filas en el orden en que se muestran."""
+        return list(self._filas)
+
+    def refrescar_visibles(self):
+        """Vuelve a dibujar las filas visibles (p. ej. si cambió la tasa)."""
+        for visible in self._visibles:
+            visible.indice = None
+        self._actualizar_ventana()
+
+    def ordenar_por(self, columna: int, descendente: bool = None):
+        """Ordena por una columna; sin `descendente`, repetir el clic invierte el orden."""
+        if descendente is None:
+            descendente = self._orden_columna == columna and not self._orden_descendente
+        self._orden_columna = columna
+        self._orden_descendente = descendente
+        for i, (celda, col) in enumerate(zip(self._encabezados, self.columnas)):
+            flecha = (" ▼" if descendente else " ▲") if i == columna else ""
+            celda.configure(text=f"{col.titulo}{flecha}")
+        self.set_filas(self._filas)
+
+    # ---------- Orden ----------
+
+    def _aplicar_orden(self):
+        """Ordena self._filas según la columna elegida (orden estable)."""
+        if self._orden_columna is None:
+            return
+        columna = self.columnas[self._orden_columna]
+        clave = columna.orden or columna.texto
+
+        def clave_segura(fila):
+            valor = clave(fila)
+            if isinstance(valor, str):
+                valor = valor.lower()
+            # Los vacíos siempre al final y sin comparar tipos distintos
+            return (valor is None, valor if valor is not None else 0)
+
+        self._filas.sort(key=clave_segura, reverse=self._orden_descendente)
+
+    # ---------- Ventana de filas visibles ----------
+
+    def _al_desplazar(self, primero, ultimo):
+        """yscrollcommand del canvas: mueve la barra y recicla filas."""
+        self._scrollbar.set(primero, ultimo)
+        self._actualizar_ventana()
+
+    def _actualizar_ventana(self):
+        """Asigna widgets a las filas visibles (más el margen), reutilizando los que salieron."""
+        total = len(self._filas)
+        alto = max(self._canvas.winfo_height(), 1)
+        arriba = self._canvas.canvasy(0)
+        primero = max(0, int(arriba // self.alto_fila) - self.margen)
+        ultimo = min(total, int((arriba + alto) // self.alto_fila) + 1 + self.margen)
+
+        libres = []
+        ocupados = set()
+        for visible in self._visibles:
+            if visible.indice is not None and primero <= visible.indice < ultimo:
+                ocupados.add(visible.indice)
+            else:
+                libres.append(visible)
+
+        for indice in range(primero, ultimo):
+            if indice in ocupados:
+                continue
+            visible = libres.pop() if libres else self._crear_fila()
+            self._enlazar(visible, indice)
+
+        for visible in libres:
+            if visible.indice is not None or self._canvas.itemcget(visible.item, 'state') != 'hidden':
+                self._canvas.itemconfigure(visible.item, state='hidden')
+                visible.indice = None
+
+    def _crear_fila(self) -> _FilaVisible:
+        """Crea los widgets de una fila reutilizable."""
+        frame = ctk.CTkFrame(self._canvas, fg_color=BG_SECUNDARIO, corner_radius=0,
+                             height=self.alto_fila)
+        celdas = []
+        for columna in self.columnas:
+            if columna.acciones:
+                celda = ctk.CTkFrame(frame, fg_color="transparent", height=self.alto_fila)
+                for accion in columna.acciones:
+                    ctk.CTkButton(
+                        celda, text=accion['texto'], width=30, height=25,
+                        fg_color=accion.get('fg_color', "#3a4a6b"),
+                        hover_color=accion.get('hover_color', "#4a5a7b"),
+                        text_color="#ffffff"
+                    ).pack(side="left", padx=2, pady=2)
+            else:
+                celda = ctk.CTkLabel(frame, text="", fg_color="transparent",
+                                     height=self.alto_fila, anchor=columna.alinear)
+            celdas.append(celda)
+
+        item = self._canvas.create_window(0, 0, window=frame, anchor="nw",
+                                          width=self._ancho, height=self.alto_fila)
+        visible = _FilaVisible(frame, item, celdas)
+        self._etiquetar_rueda(frame)
+
+        # Los botones actúan sobre la fila que la fila visible muestra en ese momento
+        for columna, celda in zip(self.columnas, celdas):
+            if columna.acciones:
+                for boton, accion in zip(celda.winfo_children(), columna.acciones):
+                    boton.configure(command=lambda v=visible, c=accion['comando']: self._ejecutar(v, c))
+
+        self._ubicar_celdas(visible)
+        self._visibles.append(visible)
+        return visible
+
+    def _ejecutar(self, visible: _FilaVisible, comando: Callable):
+        """Llama a la acción de un botón con la fila que muestra."""
+        if visible.indice is not None and visible.indice < len(self._filas):
+            comando(self._filas[visible.indice])
+
+    def _enlazar(self, visible: _FilaVisible, indice: int):
+        """Muestra la fila `indice` en una fila visible."""
+        fila = self._filas[indice]
+        visible.indice = indice
+        self._canvas.coords(visible.item, 0, indice * self.alto_fila)
+        self._canvas.itemconfigure(visible.item, state='normal')
+
+        par = indice % 2 == 1
+        if visible.par != par:
+            visible.frame.configure(fg_color=_COLOR_FILA_PAR if par else BG_SECUNDARIO)
+            visible.par = par
+
+        for (x, ancho), columna, celda in zip(self._posiciones, self.columnas, visible.celdas):
+            if columna.acciones:
+                continue
+            color = columna.color(fila) if columna.color else None
+            celda.configure(text=_recortar(str(columna.texto(fila)), ancho),
+                            text_color=color or TEXT_PRIMARY)
+
+    # ---------- Anchos de columna ----------
+
+    def _al_redimensionar(self, event):
+        """Recalcula las columnas con el ancho nuevo y redibuja."""
+        if event.width == self._ancho:
+            self._actualizar_ventana()
+            return
+        self._ancho = event.width
+        self._posiciones = self._calcular_posiciones(event.width)
+
+        for (x, ancho), celda in zip(self._posiciones, self._encabezados):
+            celda.configure(width=max(ancho - 4, 10))
+            celda.place(x=x + 2, y=2)
+        for visible in self._visibles:
+            self._canvas.itemconfigure(visible.item, width=event.width)
+            self._ubicar_celdas(visible)
+        self._canvas.coords(self._item_vacio, event.width // 2, 30)
+        self._canvas.configure(scrollregion=(0, 0, event.width, len(self._filas) * self.alto_fila))
+        self.refrescar_visibles()
+
+    def _calcular_posiciones(self, ancho_total: int) -> List[tuple]:
+        """Reparte el ancho: cada columna recibe su ancho mínimo más una parte según su peso."""
+        minimo = sum(c.ancho for c in self.columnas)
+        pesos = sum(c.peso for c in self.columnas) or 1
+        sobrante = max(0, ancho_total - minimo)
+        posiciones, x = [], 0
+        for columna in self.columnas:
+            ancho = columna.ancho + sobrante * columna.peso // pesos
+            posiciones.append((x, ancho))
+            x += ancho
+        return posiciones
+
+    def _ubicar_celdas(self, visible: _FilaVisible):
+        """Coloca las celdas de una fila según las posiciones de columna actuales."""
+        for (x, ancho), celda in zip(self._posiciones, visible.celdas):
+            celda.configure(width=max(ancho - 4, 10))
+            celda.place(x=x + 2, y=0)
+
+    # ---------- Rueda del mouse ----------
+
+    def _etiquetar_rueda(self, widget):
+        """Hace que la rueda sobre `widget` y sus descendientes desplace la tabla."""
+        widget.bindtags((self._etiqueta_rueda,) + widget.bindtags())
+        for hijo in widget.winfo_children():
+            self._etiquetar_rueda(hijo)
+
+    def _al_destruir_canvas(self, event):
+        """Quita los enlaces de la rueda (sólo existen para esta tabla)."""
+        if event.widget is self._canvas:
+            for secuencia in _EVENTOS_RUEDA:
+                self.unbind_class(self._etiqueta_rueda, secuencia)
+
+    def _al_rueda(self, event):
+        """Desplaza la tabla (el puntero está sobre el canvas o una de sus filas)."""
+        if getattr(event, 'num', None) == 4:
+            pasos = -1
+        elif getattr(event, 'num', None) == 5:
+            pasos = 1
+        elif abs(event.delta) >= 120:
+            pasos = -int(event.delta / 120)
+        else:
+            pasos = -1 if event.delta > 0 else 1
+        self._canvas.yview_scroll(pasos * 3, "units")
+
+
+def _recortar(texto: str, ancho: int) -> str:
+    """Recorta un texto para que quepa (aproximadamente) en `ancho` píxeles."""
+    maximo = max(3, (ancho - 16) // _ANCHO_CARACTER)
+    return texto if len(texto) <= maximo else texto[:maximo - 1] + "…"
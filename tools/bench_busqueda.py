@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+"""
+Benchmark de Búsqueda de Productos - HERRAMIENTA DE DESARROLLO
+Compara la búsqueda FTS5 de buscar_productos con el LIKE '%termino%' anterior
+sobre un catálogo sintético, en una base de datos temporal.
+
+Uso:
+    python bench_busqueda.py                 # 100.000 productos
+    python bench_busqueda.py -n 20000 -r 50
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+import database
+
+PALABRAS = [
+    "Azúcar", "Arroz", "Harina", "Aceite", "Café", "Leche", "Jabón", "Champú",
+    "Pasta", "Atún", "Sardina", "Galleta", "Refresco", "Agua", "Jugo", "Mantequilla",
+    "Queso", "Jamón", "Salsa", "Mayonesa", "Detergente", "Cloro", "Papel", "Vela",
+]
+VARIANTES = ["Refinada", "Integral", "Light", "Premium", "Familiar", "Clásico", "Extra", "Económico"]
+MARCAS = ["Polar", "Mavesa", "Nestlé", "Pampero", "Kraft", "Colgate", "Alpina", "Pantera"]
+
+# Términos tal como los escribe un cajero (sin acentos, incompletos)
+TERMINOS = ["az", "azuc", "azucar", "arroz int", "cafe", "jabon", "har pan", "mantequ", "P0012", "xyz"]
+
+
+def poblar_catalogo(n: int):
+    """Inserta n productos sintéticos en la base de datos temporal."""
+    rnd = random.Random(42)
+    conn = database.get_connection()
+    filas = (
+        (f"P{i:06d}", f"{rnd.choice(PALABRAS)} {rnd.choice(VARIANTES)} {rnd.randint(1, 5)}kg",
+         rnd.choice(MARCAS), round(rnd.uniform(0.5, 20), 2), rnd.randint(0, 200))
+        for i in range(n)
+    )
+    conn.executemany('''
+        INSERT INTO productos (codigo, nombre, marca, precio_usd, stock_actual)
+        VALUES (?, ?, ?, ?, ?)
+    ''', filas)
+    conn.commit()
+    conn.close()
+
+
+def buscar_like(termino: str, limite: int) -> list:
+    """Búsqueda anterior: LIKE con comodín inicial (recorre toda la tabla)."""
+    conn = database.get_connection()
+    rows = conn.execute('''
+        SELECT p.*, c.nombre as categoria_nombre
+        FROM productos p
+        LEFT JOIN categorias c ON p.categoria_id = c.id
+        WHERE p.activo = 1 AND (p.codigo LIKE ? OR p.nombre LIKE ?)
+        ORDER BY p.nombre
+    ''', (f'%{termino}%', f'%{termino}%')).fetchall()
+    conn.close()
+    return [dict(row) for row in rows][:limite]
+
+
+def medir(funcion, termino: str, repeticiones: int, limite: int) -> tuple:
+    """Retorna (p50_ms, p99_ms, resultados) de una función de búsqueda."""
+    tiempos = []
+    resultados = 0
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultados = len(funcion(termino, limite))
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    tiempos.sort()
+    p99 = tiempos[min(len(tiempos) - 1, int(len(tiempos) * 0.99))]
+    return statistics.median(tiempos), p99, resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de búsqueda de productos")
+    parser.add_argument('-n', '--productos', type=int, default=100_000, help="Tamaño del catálogo")
+    parser.add_argument('-r', '--repeticiones', type=int, default=30, help="Repeticiones por término")
+    parser.add_argument('-l', '--limite', type=int, default=5, help="Sugerencias por búsqueda")
+    args = parser.parse_args()
+
+    database.DB_PATH = os.path.join(tempfile.mkdtemp(prefix='bench_busqueda_'), 'ventas.db')
+    database.init_database()
+
+    inicio = time.perf_counter()
+    poblar_catalogo(args.productos)
+    print(f"📦 {args.productos:,} productos insertados en {time.perf_counter() - inicio:.1f}s")
+
+    print(f"\n{'Término':<12} {'LIKE p50':>9} {'LIKE p99':>9} {'FTS p50':>9} {'FTS p99':>9} {'Res.':>5}")
+    print("-" * 58)
+    for termino in TERMINOS:
+        like_p50, like_p99, _ = medir(buscar_like, termino, args.repeticiones, args.limite)
+        fts_p50, fts_p99, n = medir(database.buscar_productos, termino, args.repeticiones, args.limite)
+        print(f"{termino:<12} {like_p50:>8.2f}ms {like_p99:>8.2f}ms {fts_p50:>8.2f}ms {fts_p99:>8.2f}ms {n:>5}")
+
+    database.cerrar_pool()
+
+
+if __name__ == "__main__":
+    main()
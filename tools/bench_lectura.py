@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+"""
+Benchmark de Caja contra Reportes - HERRAMIENTA DE DESARROLLO
+Mide la latencia de crear_venta mientras otros hilos corren en bucle el
+reporte de ventas de un año, leyendo por el pool de la caja o por el pool
+de sólo lectura.
+
+Uso:
+    python bench_lectura.py
+    python bench_lectura.py --perfil safe --lectores 2 --ventas 300
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+import database
+from utils.latency import EstadisticasLatencia
+from index_advisor import poblar
+
+
+def reporte_anual(obtener_conexion):
+    """Mismas consultas que ReportesView.generar_reporte, para los últimos 365 días."""
+    hoy = datetime.now().date()
+    fecha_ini = f"{(hoy - timedelta(days=365)).isoformat()} 00:00:00"
+    fecha_fin = f"{hoy.isoformat()} 23:59:59"
+    conn = obtener_conexion()
+    try:
+        conn.execute('''
+            SELECT COUNT(*), COALESCE(SUM(total_usd), 0) FROM ventas WHERE fecha BETWEEN ? AND ?
+        ''', (fecha_ini, fecha_fin)).fetchone()
+        conn.execute('''
+            SELECT COALESCE(SUM(dv.cantidad), 0)
+            FROM detalle_ventas dv JOIN ventas v ON dv.venta_id = v.id
+            WHERE v.fecha BETWEEN ? AND ?
+        ''', (fecha_ini, fecha_fin)).fetchone()
+        # Ranking de productos: la parte cara (recorre todo el detalle del año)
+        conn.execute('''
+            SELECT dv.producto_id, SUM(dv.cantidad) as unidades, SUM(dv.total_linea_usd) as total
+            FROM detalle_ventas dv JOIN ventas v ON dv.venta_id = v.id
+            WHERE v.fecha BETWEEN ? AND ?
+            GROUP BY dv.producto_id ORDER BY total DESC
+        ''', (fecha_ini, fecha_fin)).fetchall()
+    finally:
+        conn.close()
+
+
+def correr_fase(nombre: str, obtener_conexion, lectores: int, ventas: int, productos: list) -> dict:
+    """Registra `ventas` ventas mientras `lectores` hilos repiten el reporte anual."""
+    detener = threading.Event()
+    reportes = [0]
+    lock = threading.Lock()
+
+    def lector():
+        while not detener.is_set():
+            reporte_anual(obtener_conexion)
+            with lock:
+                reportes[0] += 1
+
+    hilos = []
+    if obtener_conexion is not None:
+        hilos = [threading.Thread(target=lector, daemon=True) for _ in range(lectores)]
+        for hilo in hilos:
+            hilo.start()
+        time.sleep(0.2)  # que los reportes ya estén corriendo
+
+    latencia = EstadisticasLatencia(nombre, ventana=ventas)
+    rnd = random.Random(1)
+    for _ in range(ventas):
+        detalles = [{'producto_id': p['id'], 'nombre_producto': p['nombre'], 'cantidad': 1,
+                     'precio_unit_usd': p['precio_usd'], 'descuento': 0,
+                     'total_linea_usd': p['precio_usd']}
+                    for p in rnd.sample(productos, 3)]
+        total = sum(d['total_linea_usd'] for d in detalles)
+        with latencia.medir():
+            database.crear_venta(total, 0, total, 45, total * 45, 'Efectivo', detalles)
+
+    detener.set()
+    for hilo in hilos:
+        hilo.join()
+    return {**latencia.resumen(), 'reportes': reportes[0]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latencia de la caja con reportes en paralelo")
+    parser.add_argument('--escala', type=float, default=1.0, help="Tamaño del historial (1 = 40.000 ventas)")
+    parser.add_argument('--ventas', type=int, default=200, help="Ventas registradas por fase")
+    parser.add_argument('--lectores', type=int, default=4, help="Hilos corriendo el reporte")
+    parser.add_argument('--perfil', choices=sorted(database.PERFILES_RENDIMIENTO),
+                        default=database.PERFIL_POR_DEFECTO)
+    args = parser.parse_args()
+
+    database.DB_PATH = os.path.join(tempfile.mkdtemp(prefix='bench_lectura_'), 'ventas.db')
+    database.get_perfil_rendimiento = lambda: args.perfil
+    database.init_database()
+
+    inicio = time.perf_counter()
+    poblar(args.escala)
+    print(f"📦 Historial sintético generado en {time.perf_counter() - inicio:.1f}s (perfil '{args.perfil}')")
+
+    productos = database.get_productos()
+    inicio = time.perf_counter()
+    reporte_anual(database.get_connection_lectura)
+    print(f"📊 Un reporte anual tarda {(time.perf_counter() - inicio) * 1000:.0f} ms\n")
+
+    fases = [
+        ('sin reportes', None),
+        ('reportes por el pool de la caja', database.get_connection),
+        ('reportes por el pool de lectura', database.get_connection_lectura),
+    ]
+    print(f"{'Fase':<34} {'p50':>8} {'p99':>8} {'máx':>8} {'reportes':>9}")
+    print("-" * 71)
+    for nombre, obtener_conexion in fases:
+        r = correr_fase(nombre, obtener_conexion, args.lectores, args.ventas, productos)
+        print(f"{nombre:<34} {r['p50_ms']:>6.2f}ms {r['p99_ms']:>6.2f}ms {r['max_ms']:>6.1f}ms {r['reportes']:>9}")
+
+    database.cerrar_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,382 @@
+#!/usr/bin/env python
+"""
+Asesor de Índices - HERRAMIENTA DE DESARROLLO
+Ejecuta la carga real de consultas (funciones de database.py, SQL de las
+vistas y, opcionalmente, una captura del monitor de consultas) sobre un
+conjunto de datos sintético, revisa el EXPLAIN QUERY PLAN de cada una y
+mide índices candidatos antes/después.
+
+Uso:
+    python index_advisor.py
+    python index_advisor.py --captura Diagnostico_20260118.json
+    python index_advisor.py --escala 2 --salida migracion_indices.py
+"""
+import argparse
+import ast
+import glob
+import json
+import os
+import random
+import re
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+sys.path.insert(0, SRC)
+
+import database
+from utils.query_monitor import get_monitor, configurar_monitor
+
+# Tablas que siempre son pequeñas: recorrerlas completas no es un problema
+TABLAS_PEQUENAS = {'configuracion', 'categorias', 'secuencias', 'historial_tasas'}
+
+# Índices candidatos: (nombre, tabla, CREATE INDEX). El asesor sólo evalúa los
+# de tablas que aparecen en planes marcados y recomienda los que mejoran.
+CANDIDATOS = [
+    ('idx_detalle_ventas_venta', 'detalle_ventas',
+     'CREATE INDEX IF NOT EXISTS idx_detalle_ventas_venta ON detalle_ventas(venta_id)'),
+    ('idx_detalle_ventas_producto', 'detalle_ventas',
+     'CREATE INDEX IF NOT EXISTS idx_detalle_ventas_producto ON detalle_ventas(producto_id)'),
+    ('idx_detalle_compras_compra', 'detalle_compras',
+     'CREATE INDEX IF NOT EXISTS idx_detalle_compras_compra ON detalle_compras(compra_id)'),
+    ('idx_movimientos_producto_fecha', 'movimientos_inventario',
+     'CREATE INDEX IF NOT EXISTS idx_movimientos_producto_fecha ON movimientos_inventario(producto_id, fecha)'),
+    ('idx_movimientos_fecha', 'movimientos_inventario',
+     'CREATE INDEX IF NOT EXISTS idx_movimientos_fecha ON movimientos_inventario(fecha)'),
+    ('idx_productos_bajo_stock', 'productos',
+     'CREATE INDEX IF NOT EXISTS idx_productos_bajo_stock ON productos(stock_actual) '
+     'WHERE activo = 1 AND stock_actual <= stock_minimo'),
+    ('idx_productos_categoria', 'productos',
+     'CREATE INDEX IF NOT EXISTS idx_productos_categoria ON productos(categoria_id, nombre) WHERE activo = 1'),
+    ('idx_clientes_activos_nombre', 'clientes',
+     'CREATE INDEX IF NOT EXISTS idx_clientes_activos_nombre ON clientes(nombre) WHERE activo = 1'),
+    ('idx_ventas_cliente', 'ventas',
+     'CREATE INDEX IF NOT EXISTS idx_ventas_cliente ON ventas(cliente_id)'),
+]
+
+# Mejora mínima (en tiempo) para recomendar un índice
+MEJORA_MINIMA = 0.20
+
+
+# ============== DATOS SINTÉTICOS ==============
+
+def poblar(escala: float):
+    """Llena la base temporal con un volumen parecido al de una tienda con años de uso."""
+    rnd = random.Random(7)
+    n_productos = int(5_000 * escala)
+    n_clientes = int(2_000 * escala)
+    n_ventas = int(40_000 * escala)
+    n_compras = int(2_000 * escala)
+    inicio = datetime.now() - timedelta(days=730)
+
+    conn = database.get_connection()
+    conn.executemany('''
+        INSERT INTO productos (codigo, nombre, categoria_id, marca, precio_usd, costo_usd,
+                               stock_actual, stock_minimo, activo)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', [(f"P{i:06d}", f"Producto {i}", rnd.randint(1, 5), f"Marca {i % 50}",
+           round(rnd.uniform(1, 30), 2), round(rnd.uniform(0.5, 20), 2),
+           rnd.randint(0, 300), 5, int(rnd.random() > 0.05))
+          for i in range(n_productos)])
+
+    conn.executemany('''
+        INSERT INTO clientes (cedula_rif, nombre, telefono, activo) VALUES (?, ?, ?, ?)
+    ''', [(f"V{i:08d}", f"Cliente {rnd.randint(0, 10**6):07d}", "0414-0000000", int(rnd.random() > 0.1))
+          for i in range(n_clientes)])
+
+    ventas, detalles, movimientos = [], [], []
+    for v in range(1, n_ventas + 1):
+        fecha = (inicio + timedelta(minutes=v * 730 * 24 * 60 // n_ventas)).strftime('%Y-%m-%d %H:%M:%S')
+        ventas.append((v, f"FAC-{v:07d}", fecha, rnd.choice([None, rnd.randint(1, n_clientes)])))
+        for _ in range(rnd.randint(1, 5)):
+            producto = rnd.randint(1, n_productos)
+            cantidad = rnd.randint(1, 4)
+            detalles.append((v, producto, f"Producto {producto}", cantidad))
+            movimientos.append((fecha, producto, cantidad, f"FAC-{v:07d}"))
+    conn.executemany('''
+        INSERT INTO ventas (id, numero_factura, fecha, cliente_id, subtotal_usd, total_usd,
+                            tasa_cambio, total_bs, forma_pago)
+        VALUES (?, ?, ?, ?, 10, 11.6, 45, 522, 'Efectivo')
+    ''', ventas)
+    conn.executemany('''
+        INSERT INTO detalle_ventas (venta_id, producto_id, nombre_producto, cantidad,
+                                    precio_unit_usd, total_linea_usd)
+        VALUES (?, ?, ?, ?, 2.5, 2.5)
+    ''', detalles)
+    conn.executemany('''
+        INSERT INTO movimientos_inventario (fecha, producto_id, tipo, cantidad,
+                                            stock_anterior, stock_nuevo, referencia)
+        VALUES (?, ?, 'Salida', ?, 100, 99, ?)
+    ''', movimientos)
+
+    compras, detalles_compra = [], []
+    for c in range(1, n_compras + 1):
+        fecha = (inicio + timedelta(hours=c * 730 * 24 // n_compras)).strftime('%Y-%m-%d %H:%M:%S')
+        compras.append((c, f"COMP-{c:07d}", fecha))
+        for _ in range(rnd.randint(1, 10)):
+            producto = rnd.randint(1, n_productos)
+            detalles_compra.append((c, producto, f"Producto {producto}"))
+    conn.executemany('''
+        INSERT INTO compras (id, numero_compra, fecha, proveedor, total_usd) VALUES (?, ?, ?, 'Proveedor', 100)
+    ''', compras)
+    conn.executemany('''
+        INSERT INTO detalle_compras (compra_id, producto_id, nombre_producto, cantidad,
+                                     costo_unit_usd, total_linea_usd)
+        VALUES (?, ?, ?, 10, 1.5, 15)
+    ''', detalles_compra)
+    conn.commit()
+    conn.close()
+    return {'productos': n_productos, 'clientes': n_clientes, 'ventas': n_ventas,
+            'detalle_ventas': len(detalles), 'movimientos': len(movimientos), 'compras': n_compras}
+
+
+# ============== CAPTURA DE LA CARGA ==============
+
+def ejecutar_carga_database(n_productos: int):
+    """Ejecuta las funciones de lectura de database.py con el monitor activo."""
+    rnd = random.Random(11)
+    carga = [
+        (database.get_productos, ()),
+        (database.get_productos_bajo_stock, ()),
+        (database.get_clientes, ()),
+        (database.get_ventas_del_dia, ()),
+        (database.get_ventas_del_mes, ()),
+        (database.get_compras, ()),
+        (database.get_todos_movimientos, ()),
+        (database.get_configuracion, ()),
+        (database.get_categorias, ()),
+        (database.get_productos_por_categoria, (3,)),
+        (database.buscar_productos, ('producto 12', 5)),
+    ]
+    for _ in range(5):
+        producto = rnd.randint(1, n_productos)
+        carga.append((database.get_movimientos_producto, (producto,)))
+        carga.append((database.get_producto_por_id, (producto,)))
+        carga.append((database.get_producto_por_codigo, (f"P{producto:06d}",)))
+
+    for funcion, args in carga:
+        try:
+            funcion(*args)
+        except Exception as e:
+            print(f"⚠️ {funcion.__name__}: {e}")
+
+
+def extraer_sql_vistas() -> list:
+    """Obtiene las sentencias SELECT escritas literalmente en las vistas (análisis estático)."""
+    sentencias = []
+    for ruta in sorted(glob.glob(os.path.join(SRC, 'views', '*.py'))):
+        with open(ruta, 'r', encoding='utf-8') as f:
+            arbol = ast.parse(f.read())
+        for nodo in ast.walk(arbol):
+            if (isinstance(nodo, ast.Call) and isinstance(nodo.func, ast.Attribute)
+                    and nodo.func.attr == 'execute' and nodo.args
+                    and isinstance(nodo.args[0], ast.Constant) and isinstance(nodo.args[0].value, str)):
+                sql = ' '.join(nodo.args[0].value.split())
+                if sql.upper().startswith(('SELECT', 'WITH')):
+                    origen = f"{os.path.splitext(os.path.basename(ruta))[0]}:{nodo.lineno}"
+                    sentencias.append((sql, None, origen))
+    return sentencias
+
+
+def parametros_de_ejemplo(sql: str) -> list:
+    """
+    Inventa parámetros para una sentencia sin captura, según lo que la precede.
+
+    Fechas -> rango de los últimos 30 días; LIMIT -> 100; columnas *id -> 1;
+    el resto -> NULL.
+    """
+    ahora = datetime.now()
+    fechas = [(ahora - timedelta(days=30)).strftime('%Y-%m-%d 00:00:00'), ahora.strftime('%Y-%m-%d 23:59:59')]
+    valores = []
+    prefijo = ''
+    n_fechas = 0
+    for parte in sql.split('?')[:-1]:
+        prefijo += parte
+        contexto = prefijo.rstrip()[-40:].lower()
+        if re.search(r'limit$', contexto):
+            valores.append(100)
+        elif 'fecha' in contexto:
+            valores.append(fechas[n_fechas % 2])
+            n_fechas += 1
+        elif re.search(r'id\s*=$', contexto):
+            valores.append(1)
+        else:
+            valores.append(None)
+        prefijo += '?'
+    return valores
+
+
+def leer_captura(ruta: str) -> list:
+    """Lee las sentencias de un JSON exportado desde ConfigView > Diagnóstico."""
+    with open(ruta, 'r', encoding='utf-8') as f:
+        datos = json.load(f)
+    return [(s['sql'], s.get('parametros'), next(iter(s.get('llamadores') or {}), 'captura'))
+            for s in datos.get('sentencias', [])
+            if s['sql'].upper().startswith(('SELECT', 'WITH'))]
+
+
+# ============== ANÁLISIS ==============
+
+def problemas_del_plan(plan: list) -> list:
+    """Detecta recorridos completos, ordenamientos temporales e índices automáticos."""
+    problemas = []
+    for paso in plan:
+        m = re.match(r'SCAN (\w+)(?: AS (\w+))?$', paso)
+        if m and not paso.startswith('SCAN CONSTANT'):
+            problemas.append(f"recorrido completo: {paso}")
+        elif 'USE TEMP B-TREE' in paso:
+            problemas.append(f"ordenamiento temporal: {paso}")
+        elif 'AUTOMATIC' in paso:
+            problemas.append(f"índice automático: {paso}")
+    return problemas
+
+
+def explicar(conn: sqlite3.Connection, sql: str, parametros: list) -> list:
+    return [fila[3] for fila in conn.execute(f"EXPLAIN QUERY PLAN {sql}", parametros)]
+
+
+def medir(conn: sqlite3.Connection, sql: str, parametros: list, repeticiones: int) -> float:
+    """Mediana en ms de ejecutar la consulta y leer todas sus filas."""
+    conn.execute(sql, parametros).fetchall()  # calentar caché
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        conn.execute(sql, parametros).fetchall()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tiempos)
+
+
+def tablas_de(conn: sqlite3.Connection, sql: str, parametros: list) -> set:
+    """Tablas reales que aparecen en el plan de una consulta."""
+    alias = {}
+    for m in re.finditer(r'\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?', sql, re.IGNORECASE):
+        alias[m.group(1).lower()] = m.group(1).lower()
+        if m.group(2) and m.group(2).upper() not in ('WHERE', 'ON', 'JOIN', 'LEFT', 'INNER', 'ORDER', 'GROUP', 'LIMIT'):
+            alias[m.group(2).lower()] = m.group(1).lower()
+    tablas = set()
+    for paso in explicar(conn, sql, parametros):
+        m = re.match(r'(?:SCAN|SEARCH) (\w+)', paso)
+        if m:
+            tablas.add(alias.get(m.group(1).lower(), m.group(1).lower()))
+    return tablas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Asesor de índices para la base de datos del punto de venta")
+    parser.add_argument('--escala', type=float, default=1.0, help="Multiplicador del volumen de datos sintéticos")
+    parser.add_argument('--captura', type=str, help="JSON exportado del monitor de consultas")
+    parser.add_argument('--repeticiones', type=int, default=7, help="Ejecuciones por medición")
+    parser.add_argument('--salida', type=str, help="Archivo donde escribir la migración sugerida")
+    args = parser.parse_args()
+
+    database.DB_PATH = os.path.join(tempfile.mkdtemp(prefix='index_advisor_'), 'ventas.db')
+    database.init_database()
+    volumen = poblar(args.escala)
+    print("📦 Datos sintéticos: " + ", ".join(f"{k}={v:,}" for k, v in volumen.items()))
+
+    # 1. Capturar la carga real con el monitor de consultas
+    configurar_monitor(True, umbral_lento_ms=float('inf'))
+    ejecutar_carga_database(volumen['productos'])
+    configurar_monitor(False)
+    sentencias = [(s['sql'], s['parametros'], next(iter(s['llamadores']), '?'))
+                  for s in get_monitor().get_estadisticas()
+                  if s['sql'].upper().startswith(('SELECT', 'WITH'))]
+    sentencias += extraer_sql_vistas()
+    if args.captura:
+        sentencias += leer_captura(args.captura)
+
+    conn = sqlite3.connect(database.DB_PATH)
+    vistas = set()
+    consultas = []
+    for sql, parametros, origen in sentencias:
+        if sql in vistas:
+            continue
+        vistas.add(sql)
+        if parametros is None:
+            parametros = parametros_de_ejemplo(sql)
+        try:
+            plan = explicar(conn, sql, parametros)
+        except sqlite3.Error as e:
+            print(f"⚠️ {origen}: no se puede analizar ({e})")
+            continue
+        problemas = [p for p in problemas_del_plan(plan)
+                     if not any(f" {t}" in p for t in TABLAS_PEQUENAS)]
+        consultas.append({'sql': sql, 'parametros': parametros, 'origen': origen,
+                          'plan': plan, 'problemas': problemas,
+                          'tablas': tablas_de(conn, sql, parametros)})
+
+    marcadas = [c for c in consultas if c['problemas']]
+    print(f"\n🔎 {len(consultas)} consultas analizadas, {len(marcadas)} con problemas en el plan:\n")
+    for c in marcadas:
+        print(f"  • {c['origen']}: {c['sql'][:100]}")
+        for p in c['problemas']:
+            print(f"      ↳ {p}")
+
+    # 2. Medir cada candidato sobre los ya aceptados (evaluación acumulativa):
+    #    se recomienda si alguna consulta mejora y ninguna empeora
+    for c in marcadas:
+        c['actual_ms'] = c['antes_ms'] = medir(conn, c['sql'], c['parametros'], args.repeticiones)
+
+    recomendados = []
+    print("\n⏱️ Candidatos (mediana con los índices aceptados → con el candidato):\n")
+    for nombre, tabla, ddl in CANDIDATOS:
+        afectadas = [c for c in marcadas if tabla in c['tablas']]
+        if not afectadas:
+            continue
+        conn.execute(ddl)
+        mediciones = []
+        for c in afectadas:
+            despues = medir(conn, c['sql'], c['parametros'], args.repeticiones)
+            usa = any(nombre in paso for paso in explicar(conn, c['sql'], c['parametros']))
+            mediciones.append((c, despues, usa))
+
+        mejoran = [(c, d) for c, d, usa in mediciones if usa and d <= c['actual_ms'] * (1 - MEJORA_MINIMA)]
+        empeoran = [c for c, d, usa in mediciones if d > c['actual_ms'] * (1 + MEJORA_MINIMA) and d - c['actual_ms'] > 0.5]
+        aceptado = bool(mejoran) and not empeoran
+        if aceptado:
+            recomendados.append((nombre, ddl, mejoran))
+        else:
+            conn.execute(f"DROP INDEX {nombre}")
+
+        print(f"  {nombre}: {'✅ recomendado' if aceptado else '— descartado'}")
+        for c, despues, usa in mediciones:
+            marca = "usa el índice" if usa else "no lo usa"
+            print(f"      {c['actual_ms']:8.2f} ms → {despues:8.2f} ms  ({marca})  {c['origen']}")
+            if aceptado:
+                c['actual_ms'] = despues
+
+    if marcadas:
+        print("\n📊 Resultado con todos los índices recomendados:\n")
+        for c in marcadas:
+            print(f"      {c['antes_ms']:8.2f} ms → {c['actual_ms']:8.2f} ms  {c['origen']}")
+
+    # 3. Emitir la migración
+    lineas = [
+        "def _migracion_indices_recomendados(cursor):",
+        '    """Índices sugeridos por tools/index_advisor.py."""',
+    ]
+    for nombre, ddl, utiles in recomendados:
+        for c, despues in utiles:
+            lineas.append(f"    # {c['origen']}: {despues:.2f} ms con el índice")
+        lineas.append(f"    cursor.execute('{ddl}')")
+    if not recomendados:
+        lineas.append("    pass  # Ningún índice mejora la carga medida")
+    migracion = "\n".join(lineas) + "\n"
+
+    print("\n🧩 Migración sugerida:\n")
+    print(migracion)
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            f.write(migracion)
+        print(f"💾 Guardada en: {args.salida}")
+
+    conn.close()
+    database.cerrar_pool()
+
+
+if __name__ == "__main__":
+    main()